@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark da comparação de rostos com a galeria
+
+Compara o caminho antigo (compare_faces + face_distance por rosto, sobre
+uma lista de arrays) com o FaceMatcher vetorizado e, opcionalmente, com o
+índice aproximado IVF, para galerias de tamanhos crescentes.
+
+Uso:
+    python -m benchmarks.bench_matcher [--faces 4] [--sizes 10 100 1000 10000] [--ann]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.ann_index import IVFIndex
+from core.face_matcher import FaceMatcher
+
+
+def legacy_match(known_faces, known_names, face_encodings, tolerance=0.6):
+    """Reproduz o laço original de FaceDetector.detect_faces"""
+    names = []
+    for face_encoding in face_encodings:
+        # face_recognition.compare_faces -> face_distance sobre a lista
+        distances = np.linalg.norm(np.array(known_faces) - face_encoding, axis=1)
+        matches = list(distances <= tolerance)
+        name = "Desconhecido"
+        if True in matches:
+            # Segunda chamada de face_distance no código original
+            distances = np.linalg.norm(np.array(known_faces) - face_encoding, axis=1)
+            best_match_index = np.argmin(distances)
+            if matches[best_match_index]:
+                name = known_names[best_match_index]
+        names.append(name)
+    return names
+
+
+def time_per_call(func, repeat):
+    """Tempo médio por chamada em milissegundos"""
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run(sizes, faces, repeat, ann=False):
+    rng = np.random.default_rng(0)
+    header = f"{'N':>8} {'legado (ms)':>14} {'matriz (ms)':>14} {'ganho':>8}"
+    if ann:
+        header += f" {'IVF (ms)':>10} {'recall':>7}"
+    print(header)
+
+    for size in sizes:
+        known_faces = list(rng.normal(0, 0.1, (size, 128)))
+        known_names = [f"pessoa_{i}" for i in range(size)]
+        # Rostos do frame próximos de entradas da galeria (caso com match)
+        picks = rng.integers(0, size, faces)
+        face_encodings = [known_faces[i] + rng.normal(0, 0.01, 128) for i in picks]
+
+        matcher = FaceMatcher()
+        matcher.set_gallery(known_faces, known_names)
+
+        legacy_ms = time_per_call(lambda: legacy_match(known_faces, known_names, face_encodings), repeat)
+        matrix_ms = time_per_call(lambda: matcher.match(face_encodings), repeat)
+        line = f"{size:>8} {legacy_ms:>14.3f} {matrix_ms:>14.3f} {legacy_ms / matrix_ms:>7.1f}x"
+
+        if ann:
+            exact = matcher.match(face_encodings)
+            matcher.attach_index(IVFIndex(min_size=0))
+            matcher.train_index(force=True)
+            ann_ms = time_per_call(lambda: matcher.match(face_encodings), repeat)
+            approx = matcher.match(face_encodings)
+            recall = np.mean([a.index == e.index for a, e in zip(approx, exact)])
+            line += f" {ann_ms:>10.3f} {recall:>7.2f}"
+
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de comparação com a galeria")
+    parser.add_argument("--faces", type=int, default=4, help="Rostos por frame")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="Tamanhos da galeria")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetições por caso")
+    parser.add_argument("--ann", action="store_true", help="Incluir o índice aproximado IVF")
+    args = parser.parse_args()
+    run(args.sizes, args.faces, args.repeat, args.ann)
+
+
+if __name__ == "__main__":
+    main()
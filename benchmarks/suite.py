@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suíte de benchmarks dos caminhos críticos com baseline e verificação de regressão
+
+Casos:
+    detect_faces / locate_faces   detector completo (HOG e CNN) e do RPi (Haar + LBPH)
+    match_<N>                     comparação com galerias de N modelos
+    draw_face_rectangles          anotação do frame
+    display_convert_<WxH>         conversão BGR -> imagem PIL feita na exibição
+    load_known_faces              carga da galeria (sem cache e com cache)
+    train_model                   treino LBPH do RPi
+
+Usa imagens sintéticas determinísticas ou uma galeria real (--images). Os
+resultados são gravados em JSON e comparados com benchmarks/baseline.json:
+um caso cuja mediana piorar mais que a tolerância faz o processo sair com
+código 1. Casos cujas dependências não estão instaladas são ignorados.
+
+Uso:
+    python -m benchmarks.suite [--cases match detect] [--repeat 20] [--tolerance 0.25]
+                               [--images data/faces] [--output resultados.json]
+                               [--update-baseline]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.face_matcher import FaceMatcher
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+class SkipCase(Exception):
+    """O caso não pode rodar neste ambiente (dependência ou modelo ausente)"""
+
+
+def synthetic_frame(width: int = 640, height: int = 480, seed: int = 0) -> np.ndarray:
+    """Frame BGR determinístico com gradiente, ruído e formas"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = (0.5 * x + 0.5 * y).astype(np.uint8)
+    frame = np.dstack([base, base[::-1], base[:, ::-1]])
+    frame = cv2.add(frame, rng.integers(0, 40, frame.shape, dtype=np.uint8))
+    for _ in range(6):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(frame, center, int(rng.integers(20, 80)), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return frame
+
+
+def synthetic_gallery(faces_dir: str, identities: int = 8, per_identity: int = 3):
+    """Galeria sintética (uma pasta por identidade) para os casos de carga e treino"""
+    for i in range(identities):
+        identity_dir = os.path.join(faces_dir, f"pessoa_{i}")
+        os.makedirs(identity_dir, exist_ok=True)
+        for j in range(per_identity):
+            image = synthetic_frame(200, 200, seed=100 * i + j)
+            cv2.imwrite(os.path.join(identity_dir, f"{j}.jpg"), image)
+
+
+def measure(func: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Tempo por chamada em milissegundos (mediana, mínimo e máximo)"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "repeat": repeat
+    }
+
+
+class Suite:
+    """
+    Registro e execução dos casos
+
+    Cada caso é preparado por uma função que devolve o callable medido (ou
+    levanta SkipCase); detectores e diretórios temporários são compartilhados.
+    """
+
+    def __init__(self, images_dir: Optional[str] = None):
+        self.images_dir = images_dir
+        self.work_dir = tempfile.mkdtemp(prefix="bench_")
+        self._detectors = {}
+        self._gallery_dir = None
+        self.cases: Dict[str, Callable[[], Callable[[], object]]] = {}
+        self._register()
+
+    def close(self):
+        for detector in self._detectors.values():
+            detector.cleanup()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def detector(self, kind: str):
+        """Detector compartilhado ("desktop" ou "rpi"); SkipCase se não puder ser criado"""
+        if kind not in self._detectors:
+            try:
+                if kind == "rpi":
+                    from core.face_detector_rpi import FaceDetectorRPi
+                    detector = FaceDetectorRPi()
+                else:
+                    from core.face_detector import FaceDetector
+                    detector = FaceDetector()
+            except ImportError as e:
+                raise SkipCase(f"dependência ausente: {e.name}")
+            self._detectors[kind] = detector
+
+        detector = self._detectors[kind]
+        detector.encoding_workers = 1
+        return detector
+
+    def gallery_dir(self) -> str:
+        """Cópia da galeria usada nos casos de carga (real com --images, senão sintética)"""
+        if self._gallery_dir is None:
+            self._gallery_dir = os.path.join(self.work_dir, "faces")
+            if self.images_dir:
+                shutil.copytree(self.images_dir, self._gallery_dir,
+                                ignore=shutil.ignore_patterns("*.npz", "*.yml", "*.pkl"))
+            else:
+                synthetic_gallery(self._gallery_dir)
+        return self._gallery_dir
+
+    def _register(self):
+        for model in ("hog", "cnn"):
+            self.cases[f"locate_faces_{model}"] = lambda model=model: self._locate_desktop(model)
+            self.cases[f"detect_faces_{model}"] = lambda model=model: self._detect("desktop", model)
+        self.cases["locate_faces_rpi"] = self._locate_rpi
+        self.cases["detect_faces_rpi"] = lambda: self._detect("rpi")
+
+        for size in (100, 1000, 10000):
+            self.cases[f"match_{size}"] = lambda size=size: self._match(size)
+
+        self.cases["draw_face_rectangles"] = self._draw
+        for width, height in ((640, 480), (1280, 720)):
+            self.cases[f"display_convert_{width}x{height}"] = lambda w=width, h=height: self._display_convert(w, h)
+
+        self.cases["load_known_faces_cold"] = lambda: self._load_known_faces(cached=False)
+        self.cases["load_known_faces_cached"] = lambda: self._load_known_faces(cached=True)
+        self.cases["train_model_rpi"] = self._train_model
+
+    # Casos
+
+    def _locate_desktop(self, model: str):
+        detector = self.detector("desktop")
+        rgb = cv2.cvtColor(cv2.resize(synthetic_frame(), (0, 0), fx=0.5, fy=0.5), cv2.COLOR_BGR2RGB)
+
+        def run():
+            detector.detection_model = model
+            return detector.locate_faces(rgb)
+        return run
+
+    def _locate_rpi(self):
+        detector = self.detector("rpi")
+        if detector.face_cascade is None or detector.face_cascade.empty():
+            raise SkipCase("classificador Haar indisponível")
+        gray = cv2.cvtColor(synthetic_frame(), cv2.COLOR_BGR2GRAY)
+        return lambda: detector.locate_faces(gray)
+
+    def _detect(self, kind: str, model: str = "hog"):
+        detector = self.detector(kind)
+        if kind == "rpi" and (detector.face_cascade is None or detector.face_cascade.empty()):
+            raise SkipCase("classificador Haar indisponível")
+        frames = [synthetic_frame(seed=i) for i in range(4)]
+        counter = [0]
+
+        def run():
+            # Custo por frame na configuração padrão (rastreamento ativo), sem o filtro de movimento
+            detector.detection_model = model
+            detector.motion_gating = False
+            counter[0] += 1
+            return detector.detect_faces(frames[counter[0] % len(frames)])
+        return run
+
+    def _match(self, size: int, faces: int = 4):
+        rng = np.random.default_rng(size)
+        known_faces = list(rng.normal(0, 0.1, (size, 128)))
+        matcher = FaceMatcher()
+        matcher.set_gallery(known_faces, [f"pessoa_{i}" for i in range(size)])
+        picks = rng.integers(0, size, faces)
+        encodings = [known_faces[i] + rng.normal(0, 0.01, 128) for i in picks]
+        return lambda: matcher.match(encodings)
+
+    def _draw(self):
+        try:
+            detector = self.detector("desktop")
+        except SkipCase:
+            detector = self.detector("rpi")
+        frame = synthetic_frame()
+        locations = [(60, 200, 200, 60), (100, 420, 260, 280), (220, 600, 400, 440)]
+        names = ["pessoa_1", "Desconhecido", "pessoa_2"]
+        return lambda: detector.draw_face_rectangles(frame.copy(), locations, names)
+
+    def _display_convert(self, width: int, height: int):
+        from PIL import Image
+        frame = synthetic_frame(width, height)
+
+        def run():
+            # Mesmo caminho de MainWindow.update_video_display, sem o PhotoImage (exige Tk)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            h, w = rgb_frame.shape[:2]
+            if w > 640 or h > 480:
+                scale = min(640 / w, 480 / h)
+                rgb_frame = cv2.resize(rgb_frame, (int(w * scale), int(h * scale)))
+            return Image.fromarray(rgb_frame)
+        return run
+
+    def _load_known_faces(self, cached: bool):
+        detector = self.detector("desktop")
+        faces_dir = self.gallery_dir()
+        cache_file = os.path.join(faces_dir, "encodings_cache.npz")
+
+        def run():
+            if not cached and os.path.exists(cache_file):
+                os.remove(cache_file)
+            return detector.load_known_faces(faces_dir)
+        return run
+
+    def _train_model(self):
+        detector = self.detector("rpi")
+        if detector.face_cascade is None or detector.face_cascade.empty():
+            raise SkipCase("classificador Haar indisponível")
+        faces_dir = self.gallery_dir()
+        return lambda: detector.train_model(faces_dir)
+
+    def run(self, selected: Optional[List[str]] = None, repeat: int = 20) -> Dict[str, Dict]:
+        """
+        Executa os casos selecionados (por prefixo do nome)
+
+        Returns:
+            Dict: Resultado de cada caso ou {"skipped": motivo}
+        """
+        results = {}
+        for name, prepare in self.cases.items():
+            if selected and not any(name.startswith(prefix) for prefix in selected):
+                continue
+            try:
+                func = prepare()
+                # Casos lentos (detecção, carga) usam menos repetições
+                case_repeat = repeat if name.startswith(("match", "draw", "display")) else max(3, repeat // 4)
+                results[name] = measure(func, case_repeat)
+                print(f"{name:<28} {results[name]['median_ms']:>10.3f} ms")
+            except SkipCase as e:
+                results[name] = {"skipped": str(e)}
+                print(f"{name:<28} {'ignorado':>10}  ({e})")
+        return results
+
+
+def environment() -> Dict[str, object]:
+    """Descrição da máquina (baselines só são comparáveis na mesma máquina)"""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float,
+            min_delta_ms: float = 0.05, strict: bool = False) -> List[str]:
+    """
+    Compara medianas com a baseline
+
+    Args:
+        results: Casos medidos agora
+        baseline: Casos da baseline
+        tolerance: Piora relativa aceita (0.25 = 25%)
+        min_delta_ms: Diferenças absolutas menores que isso são ruído
+        strict: Contar como falha os casos medidos sem valor na baseline
+
+    Returns:
+        List[str]: Descrição de cada regressão
+    """
+    regressions = []
+    for name, current in results.items():
+        if "median_ms" not in current:
+            print(f"{name:<28} {'-':>10} {'-':>10} {'':>8}  ignorado")
+            continue
+        base = baseline.get(name)
+        if not base or "median_ms" not in base:
+            # Medido agora, mas sem referência: visível na saída, nunca aprovado em silêncio
+            print(f"{name:<28} {'-':>10} {current['median_ms']:>10.3f} {'':>8}  sem baseline")
+            if strict:
+                regressions.append(f"{name}: sem baseline")
+            continue
+        before, now = base["median_ms"], current["median_ms"]
+        ratio = now / before if before > 0 else float("inf")
+        status = "ok"
+        if ratio > 1 + tolerance and now - before > min_delta_ms:
+            status = "REGRESSÃO"
+            regressions.append(f"{name}: {before:.3f} -> {now:.3f} ms ({ratio:.2f}x)")
+        print(f"{name:<28} {before:>10.3f} {now:>10.3f} {ratio:>7.2f}x  {status}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks com verificação de regressão")
+    parser.add_argument("--cases", nargs="+", default=None, help="Prefixos dos casos a executar")
+    parser.add_argument("--repeat", type=int, default=20, help="Repetições dos casos rápidos")
+    parser.add_argument("--images", default=None, help="Galeria real para os casos de carga e treino")
+    parser.add_argument("--output", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline para comparação")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Piora relativa aceita")
+    parser.add_argument("--update-baseline", action="store_true", help="Gravar os resultados como baseline")
+    parser.add_argument("--strict", action="store_true", help="Falhar também nos casos sem baseline")
+    args = parser.parse_args(argv)
+
+    # Erros esperados (ex.: classificador ausente) não poluem a saída
+    logging.basicConfig(level=logging.CRITICAL)
+
+    suite = Suite(args.images)
+    try:
+        results = suite.run(args.cases, args.repeat)
+    finally:
+        suite.close()
+
+    report = {"environment": environment(), "cases": results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"Baseline gravada em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Sem baseline para comparar (use --update-baseline)")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    base_env = baseline.get("environment", {})
+    if base_env.get("machine") != platform.machine() or base_env.get("cpu_count") != os.cpu_count():
+        print("Aviso: baseline gerada em outra máquina; diferenças podem não ser regressões")
+
+    print(f"\n{'caso':<28} {'baseline':>10} {'atual':>10} {'razão':>8}")
+    regressions = compare(results, baseline.get("cases", {}), args.tolerance, strict=args.strict)
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) acima de {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+
+    print("\nSem regressões")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
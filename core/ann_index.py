@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Índice aproximado de vizinhos mais próximos (IVF) sobre a galeria
+
+A galeria é particionada por k-means em `n_lists` listas. Uma consulta
+compara o rosto apenas com os `n_probe` centróides mais próximos e calcula
+distâncias exatas somente sobre as linhas dessas listas.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Índice do centróide mais próximo de cada linha de `data`"""
+    # ||x||² é constante por linha e não altera o argmin
+    scores = (centroids * centroids).sum(axis=1)[None, :] - 2.0 * (data @ centroids.T)
+    return np.argmin(scores, axis=1)
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    K-means (Lloyd) em NumPy
+
+    Args:
+        data: Matriz (N x D) float32
+        k: Número de centróides
+        iterations: Iterações de refinamento
+        seed: Semente aleatória
+
+    Returns:
+        np.ndarray: Centróides (k x D)
+    """
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = _nearest_centroids(data, centroids)
+        counts = np.bincount(assign, minlength=k)
+        nonempty = np.flatnonzero(counts)
+
+        order = np.argsort(assign, kind="stable")
+        starts = (np.cumsum(counts) - counts)[nonempty]
+        sums = np.add.reduceat(data[order], starts, axis=0)
+        centroids[nonempty] = sums / counts[nonempty, None]
+
+        # Listas vazias recebem pontos aleatórios
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Índice IVF (inverted file) incremental
+
+    Parâmetros de recall/latência:
+        n_lists: número de partições (None = 2·sqrt(N) no treino)
+        n_probe: partições visitadas por consulta (maior = mais recall)
+        min_size: abaixo deste tamanho a busca exata é usada
+    """
+
+    INDEX_FILENAME = "ann_index.npz"
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8,
+                 min_size: int = 2000, kmeans_iterations: int = 10,
+                 training_sample: int = 50000):
+        self.logger = get_logger(__name__)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_size = min_size
+        self.kmeans_iterations = kmeans_iterations
+        self.training_sample = training_sample
+
+        self.centroids: Optional[np.ndarray] = None
+        self.trained_size = 0
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._size = 0
+
+        # Listas invertidas compactadas sob demanda a partir das atribuições
+        self._order: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def is_active(self, size: int) -> bool:
+        """True se a busca aproximada deve ser usada para uma galeria deste tamanho"""
+        return self.is_trained and size >= self.min_size
+
+    def needs_training(self, size: int) -> bool:
+        """Treina ao atingir min_size e retreina quando a galeria dobra desde o último treino"""
+        if size < self.min_size:
+            return False
+        return not self.is_trained or size >= 2 * self.trained_size
+
+    def fit_centroids(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Calcula os centróides por k-means sem alterar o índice
+
+        Args:
+            matrix: Galeria (N x 128) float32
+
+        Returns:
+            np.ndarray: Centróides (n_lists x 128)
+        """
+        size = len(matrix)
+        n_lists = self.n_lists or max(1, int(2 * np.sqrt(size)))
+
+        sample = matrix
+        if size > self.training_sample:
+            rng = np.random.default_rng(0)
+            sample = matrix[rng.choice(size, self.training_sample, replace=False)]
+
+        return kmeans(np.ascontiguousarray(sample, dtype=np.float32), n_lists, self.kmeans_iterations)
+
+    def set_centroids(self, centroids: np.ndarray, trained_size: int, matrix: np.ndarray):
+        """Instala centróides e reatribui todas as linhas da galeria"""
+        self.centroids = centroids
+        self.trained_size = trained_size
+        self.assign_all(matrix)
+
+    def train(self, matrix: np.ndarray):
+        """
+        Treina os centróides e atribui todas as linhas
+
+        Args:
+            matrix: Galeria (N x 128) float32
+        """
+        self.set_centroids(self.fit_centroids(matrix), len(matrix), matrix)
+        self.logger.info(f"Índice IVF treinado: {len(matrix)} rostos em {len(self.centroids)} listas")
+
+    def assign_all(self, matrix: np.ndarray):
+        """Recalcula a lista de cada linha da galeria"""
+        self._size = len(matrix)
+        self._assignments = np.zeros(max(self._size, 16), dtype=np.int32)
+        if self._size and self.is_trained:
+            self._assignments[:self._size] = _nearest_centroids(matrix, self.centroids)
+        self._order = None
+
+    def set_row(self, index: int, vector: np.ndarray):
+        """Atribui (ou reatribui) a linha `index` após inclusão ou substituição"""
+        if not self.is_trained:
+            return
+
+        if index >= len(self._assignments):
+            grown = np.zeros(max(index + 1, 2 * len(self._assignments)), dtype=np.int32)
+            grown[:self._size] = self._assignments[:self._size]
+            self._assignments = grown
+
+        self._assignments[index] = _nearest_centroids(vector[None, :], self.centroids)[0]
+        self._size = max(self._size, index + 1)
+        self._order = None
+
+    def remove_row(self, index: int, last: int):
+        """Espelha a remoção por troca com a última linha feita pelo matcher"""
+        if not self.is_trained or self._size == 0:
+            return
+        self._assignments[index] = self._assignments[last]
+        self._size -= 1
+        self._order = None
+
+    def _compact(self):
+        assignments = self._assignments[:self._size]
+        self._order = np.argsort(assignments, kind="stable").astype(np.int64)
+        counts = np.bincount(assignments, minlength=len(self.centroids))
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def search(self, queries: np.ndarray, matrix: np.ndarray, sq_norms: np.ndarray,
+               label_ids: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Busca aproximada do vizinho mais próximo e do segundo colocado
+
+        Args:
+            queries: Codificações do frame (F x 128) float32
+            matrix: Galeria (N x 128)
+            sq_norms: Normas ao quadrado das linhas da galeria
+            label_ids: Identidade de cada linha; se informado, o segundo
+                colocado é o melhor candidato de outra identidade
+
+        Returns:
+            Tuple: (índice do melhor, distância do melhor, distância do segundo)
+        """
+        if self._order is None:
+            self._compact()
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        centroid_scores = (self.centroids * self.centroids).sum(axis=1)[None, :] - 2.0 * (queries @ self.centroids.T)
+        probes = np.argpartition(centroid_scores, n_probe - 1, axis=1)[:, :n_probe]
+
+        count = len(queries)
+        best = np.full(count, -1, dtype=np.int64)
+        best_dist = np.full(count, np.inf)
+        second_dist = np.full(count, np.inf)
+
+        for i in range(count):
+            candidates = np.concatenate([
+                self._order[self._offsets[p]:self._offsets[p + 1]] for p in probes[i]
+            ])
+            if len(candidates) == 0:
+                continue
+
+            query = queries[i]
+            sq = sq_norms[candidates] - 2.0 * (matrix[candidates] @ query) + np.dot(query, query)
+            dist = np.sqrt(np.maximum(sq, 0.0))
+
+            top = int(np.argmin(dist))
+            best[i] = candidates[top]
+            best_dist[i] = dist[top]
+
+            if label_ids is not None:
+                others = dist[label_ids[candidates] != label_ids[candidates[top]]]
+            else:
+                others = np.delete(dist, top)
+            if len(others):
+                second_dist[i] = others.min()
+
+        return best, best_dist, second_dist
+
+    def save(self, path: str) -> bool:
+        """
+        Persiste os centróides (as atribuições são recalculadas ao carregar)
+
+        Args:
+            path: Caminho do arquivo .npz
+
+        Returns:
+            bool: True se salvo com sucesso
+        """
+        if not self.is_trained:
+            return False
+
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, centroids=self.centroids, trained_size=np.int64(self.trained_size))
+            os.replace(tmp_path, path)
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar índice IVF: {e}")
+            return False
+
+    def load(self, path: str) -> bool:
+        """
+        Carrega centróides salvos
+
+        Args:
+            path: Caminho do arquivo .npz
+
+        Returns:
+            bool: True se carregado com sucesso
+        """
+        if not os.path.exists(path):
+            return False
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                centroids = data["centroids"].astype(np.float32)
+                trained_size = int(data["trained_size"])
+
+            if self.n_lists and len(centroids) != self.n_lists:
+                self.logger.info("Número de listas do índice IVF mudou, será retreinado")
+                return False
+
+            self.centroids = centroids
+            self.trained_size = trained_size
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Índice IVF inválido, será retreinado: {e}")
+            return False
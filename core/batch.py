@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Processamento em lote de vídeos gravados (detecções em JSONL)
+
+Roda o detector sobre uma pasta de vídeos, um processo por arquivo ou por
+trecho (--segment-seconds), e grava uma linha JSON por frame com rostos:
+instante no vídeo, caixa, identidade e distância. Cada saída tem um ponto de
+controle ao lado (<saída>.checkpoint); um lote interrompido continua de onde
+parou ao ser executado de novo com os mesmos argumentos.
+
+Uso:
+    python -m core.batch videos/ --output deteccoes/ [--workers 4] [--stride 2]
+                         [--segment-seconds 600] [--rpi] [--json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.parallel_encoding import resolve_workers
+from core.run import EventWriter, create_detector
+from utils.logger import setup_logger
+from utils.settings import SETTINGS_FILE, apply_detector_settings, load_runtime_config
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mkv', '.mov', '.m4v', '.webm')
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+# Detector de cada processo do lote (criado uma vez por processo)
+_detector = None
+
+
+class BatchJob(NamedTuple):
+    """Trecho [start_frame, end_frame) de um vídeo e o arquivo JSONL de saída"""
+    video: str
+    output: str
+    start_frame: int
+    end_frame: Optional[int]
+
+
+def is_video_file(filename: str) -> bool:
+    """Verifica se o arquivo tem extensão de vídeo suportada"""
+    return filename.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def video_info(path: str) -> Tuple[int, float]:
+    """(número de frames, frames por segundo) informados pelo contêiner"""
+    capture = cv2.VideoCapture(path)
+    try:
+        return int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), capture.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        capture.release()
+
+
+def plan_jobs(videos_dir: str, output_dir: str, segment_seconds: float = 0.0) -> List[BatchJob]:
+    """
+    Divide os vídeos da pasta em tarefas
+
+    Args:
+        videos_dir: Pasta com os vídeos
+        output_dir: Pasta das saídas JSONL
+        segment_seconds: Duração de cada trecho (0 = um processo por arquivo)
+
+    Returns:
+        List[BatchJob]: Tarefas em ordem de arquivo e de trecho
+    """
+    jobs = []
+    for filename in sorted(os.listdir(videos_dir)):
+        if not is_video_file(filename):
+            continue
+        video = os.path.join(videos_dir, filename)
+
+        frame_count, fps = video_info(video)
+        segment_frames = int(segment_seconds * fps)
+        if segment_frames <= 0 or frame_count <= segment_frames:
+            jobs.append(BatchJob(video, os.path.join(output_dir, f"{filename}.jsonl"), 0, None))
+            continue
+
+        # Saídas dos trechos concatenadas em ordem formam a saída do arquivo
+        for index, start in enumerate(range(0, frame_count, segment_frames)):
+            output = os.path.join(output_dir, f"{filename}.{index:03d}.jsonl")
+            jobs.append(BatchJob(video, output, start, min(start + segment_frames, frame_count)))
+    return jobs
+
+
+def read_checkpoint(output: str) -> Optional[Dict]:
+    """Ponto de controle de uma saída (None se não houver ou estiver ilegível)"""
+    try:
+        with open(output + CHECKPOINT_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(output: str, checkpoint: Dict):
+    """Grava o ponto de controle de forma atômica"""
+    tmp_file = output + CHECKPOINT_SUFFIX + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, output + CHECKPOINT_SUFFIX)
+
+
+def detect_frames(face_detector, frames: List) -> List[List[Dict]]:
+    """
+    Rostos de cada frame: caixa no frame original, identidade e distância
+
+    O detector completo localiza em lote (CNN) na metade da resolução, como
+    no vídeo ao vivo; o do RPi usa Haar + LBPH e não informa distância.
+
+    Args:
+        face_detector: FaceDetector ou FaceDetectorRPi
+        frames: Frames BGR com as mesmas dimensões
+
+    Returns:
+        List: Lista de rostos de cada frame, na mesma ordem
+    """
+    results = []
+    if hasattr(face_detector, "locate_faces_batch"):
+        rgb_small_frames = [
+            cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.5, fy=0.5), cv2.COLOR_BGR2RGB)
+            for frame in frames
+        ]
+        for rgb_small_frame, locations in zip(rgb_small_frames, face_detector.locate_faces_batch(rgb_small_frames)):
+            matches = face_detector.identify_faces(rgb_small_frame, locations)
+            results.append([
+                {"box": [int(v) * 2 for v in location], "name": match.name, "distance": round(float(match.distance), 4)}
+                for location, match in zip(locations, matches)
+            ])
+        return results
+
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        locations = face_detector.locate_faces(gray)
+        names = face_detector.identify_faces(gray, locations)
+        results.append([
+            {"box": [int(v) for v in location], "name": name, "distance": None}
+            for location, name in zip(locations, names)
+        ])
+    return results
+
+
+def _init_worker(rpi: bool, faces_dir: str, settings_file: str, log_level: int, pooled: bool = True):
+    """Cria e carrega o detector uma vez em cada processo do lote"""
+    global _detector
+    if not logging.getLogger().handlers:
+        setup_logger(log_level)
+    config = load_runtime_config(settings_file)
+    if pooled:
+        # Um processo por núcleo já é o lote: nem a galeria nem o reconhecimento abrem outro pool aqui
+        config.encoding_workers = 1
+        config.recognition_workers = 0
+    _detector = create_detector(rpi)
+    apply_detector_settings(_detector, config)
+    # Frames de um lote não são consecutivos no tempo: sem rastreamento nem filtro de movimento
+    _detector.tracking = False
+    _detector.motion_gating = False
+    _detector.load_known_faces(faces_dir)
+
+
+def warm_gallery(rpi: bool, faces_dir: str, settings_file: str):
+    """
+    Carrega a galeria uma vez no processo principal, antes do pool
+
+    Com o cache de codificações (ou o modelo LBPH) já gravado em disco, cada
+    processo do lote só o lê, em vez de todos codificarem em paralelo e
+    disputarem o mesmo arquivo.
+    """
+    face_detector = create_detector(rpi)
+    config = load_runtime_config(settings_file)
+    config.recognition_workers = 0
+    apply_detector_settings(face_detector, config)
+    face_detector.load_known_faces(faces_dir)
+    face_detector.cleanup()
+
+
+def process_job(job: BatchJob, stride: int = 1, checkpoint_every: int = 100) -> Dict:
+    """
+    Processa um trecho de vídeo, retomando do ponto de controle se houver
+
+    Args:
+        job: Tarefa planejada por plan_jobs
+        stride: Processar um a cada N frames (os demais são pulados sem decodificar)
+        checkpoint_every: Frames processados entre pontos de controle
+
+    Returns:
+        Dict: Resumo (frames, rostos, segundos de vídeo e de processamento, erro)
+    """
+    logger = logging.getLogger(__name__)
+    started = time.monotonic()
+    summary = {"video": job.video, "output": job.output, "frames": 0, "faces": 0,
+               "video_seconds": 0.0, "seconds": 0.0, "resumed": False, "error": None}
+
+    checkpoint = read_checkpoint(job.output)
+    if checkpoint is not None and checkpoint.get("done"):
+        summary["skipped"] = True
+        return summary
+
+    capture = cv2.VideoCapture(job.video)
+    if not capture.isOpened():
+        summary["error"] = "vídeo ilegível"
+        return summary
+
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        position = job.start_frame
+        mode = 'w'
+        if checkpoint is not None and os.path.exists(job.output):
+            # Descartar o que foi escrito depois do último ponto de controle
+            position = checkpoint["next_frame"]
+            with open(job.output, 'r+b') as f:
+                f.truncate(checkpoint["bytes"])
+            mode = 'a'
+            summary["resumed"] = True
+            logger.info(f"Retomando {job.output} no frame {position}")
+        if position > 0:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, position)
+        first_frame = position
+
+        batch_size = getattr(_detector, "batch_size", 8)
+        with open(job.output, mode, encoding='utf-8') as out:
+            since_checkpoint = 0
+            finished = False
+            while not finished:
+                # Ler um lote de frames, pulando `stride - 1` entre eles
+                indexes, frames = [], []
+                while len(frames) < batch_size:
+                    if job.end_frame is not None and position >= job.end_frame:
+                        finished = True
+                        break
+                    if (position - job.start_frame) % stride:
+                        if not capture.grab():
+                            finished = True
+                            break
+                    else:
+                        ret, frame = capture.read()
+                        if not ret:
+                            finished = True
+                            break
+                        indexes.append(position)
+                        frames.append(frame)
+                    position += 1
+
+                if frames:
+                    for index, faces in zip(indexes, detect_frames(_detector, frames)):
+                        if faces:
+                            record = {"video": os.path.basename(job.video), "frame": index,
+                                      "timestamp": round(index / fps, 3), "faces": faces}
+                            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                            summary["faces"] += len(faces)
+                    summary["frames"] += len(frames)
+                    since_checkpoint += len(frames)
+
+                if since_checkpoint >= checkpoint_every or finished:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    write_checkpoint(job.output, {
+                        "video": job.video, "start_frame": job.start_frame, "end_frame": job.end_frame,
+                        "next_frame": position, "bytes": out.tell(), "done": finished
+                    })
+                    since_checkpoint = 0
+
+        summary["video_seconds"] = (position - first_frame) / fps
+
+    except Exception as e:
+        logger.error(f"Erro ao processar {job.video}: {e}")
+        summary["error"] = str(e)
+    finally:
+        capture.release()
+        summary["seconds"] = time.monotonic() - started
+
+    return summary
+
+
+def run_batch(jobs: List[BatchJob], workers: int, writer: EventWriter, stride: int = 1,
+              checkpoint_every: int = 100, rpi: bool = False, faces_dir: str = "data/faces",
+              settings_file: str = SETTINGS_FILE, log_level: int = logging.INFO) -> int:
+    """
+    Executa as tarefas em um pool de processos, emitindo um evento por tarefa
+
+    Returns:
+        int: Número de tarefas com erro
+    """
+    workers = min(resolve_workers(workers), len(jobs)) if jobs else 1
+    init_args = (rpi, faces_dir, settings_file, log_level)
+    errors = 0
+
+    def report(summary: Dict):
+        nonlocal errors
+        if summary.get("skipped"):
+            writer.emit("skipped", output=summary["output"])
+            return
+        if summary["error"] is not None:
+            errors += 1
+            writer.emit("error", video=summary["video"], output=summary["output"], message=summary["error"])
+            return
+        speed = summary["video_seconds"] / summary["seconds"] if summary["seconds"] > 0 else 0.0
+        writer.emit("done", output=summary["output"], frames=summary["frames"], faces=summary["faces"],
+                    resumed=summary["resumed"], seconds=round(summary["seconds"], 2), speed=round(speed, 2))
+
+    writer.emit("start", jobs=len(jobs), workers=workers)
+    if workers <= 1:
+        _init_worker(*init_args, pooled=False)
+        for job in jobs:
+            report(process_job(job, stride, checkpoint_every))
+    else:
+        warm_gallery(rpi, faces_dir, settings_file)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as executor:
+            futures = [executor.submit(process_job, job, stride, checkpoint_every) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    writer.emit("stop", jobs=len(jobs), errors=errors)
+    return errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Detecções de uma pasta de vídeos em JSONL")
+    parser.add_argument("videos_dir", help="pasta com os vídeos")
+    parser.add_argument("--output", default="deteccoes", help="pasta das saídas JSONL e pontos de controle")
+    parser.add_argument("--workers", type=int, default=0, help="processos (0 = um por núcleo)")
+    parser.add_argument("--segment-seconds", type=float, default=0.0,
+                        help="dividir cada vídeo em trechos desta duração (0 = um processo por arquivo)")
+    parser.add_argument("--stride", type=int, default=1, help="processar um a cada N frames")
+    parser.add_argument("--checkpoint-every", type=int, default=100, help="frames entre pontos de controle")
+    parser.add_argument("--rpi", action="store_true", help="usar o detector OpenCV/LBPH do Raspberry Pi")
+    parser.add_argument("--faces-dir", default="data/faces", help="diretório da galeria")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="arquivo de configurações")
+    parser.add_argument("--json", action="store_true", help="eventos em JSON, um por linha")
+    parser.add_argument("--log-level", default="INFO", help="nível de log (stderr e logs/)")
+    args = parser.parse_args(argv)
+
+    log_level = getattr(logging, args.log_level.upper(), logging.INFO)
+    logger = setup_logger(log_level, **load_runtime_config(args.settings).log_options)
+
+    if not os.path.isdir(args.videos_dir):
+        logger.error(f"Pasta de vídeos não encontrada: {args.videos_dir}")
+        return 1
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = plan_jobs(args.videos_dir, args.output, args.segment_seconds)
+    if not jobs:
+        logger.warning(f"Nenhum vídeo em {args.videos_dir}")
+        return 0
+
+    errors = run_batch(
+        jobs, args.workers, EventWriter(args.json), stride=max(1, args.stride),
+        checkpoint_every=max(1, args.checkpoint_every), rpi=args.rpi, faces_dir=args.faces_dir,
+        settings_file=args.settings, log_level=log_level
+    )
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente das codificações faciais (encodings de 128 dimensões)
+"""
+
+import hashlib
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+ENCODING_SIZE = 128
+
+
+class CacheEntry:
+    """Entrada do cache: assinatura do arquivo e sua codificação"""
+
+    __slots__ = ("size", "mtime_ns", "digest", "encoding")
+
+    def __init__(self, size: int, mtime_ns: int, digest: bytes, encoding: Optional[np.ndarray]):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.digest = digest
+        # None indica que a imagem foi processada mas não contém rosto
+        self.encoding = encoding
+
+
+def file_digest(path: str) -> bytes:
+    """
+    Calcula o hash SHA-1 do conteúdo de um arquivo
+
+    Args:
+        path: Caminho do arquivo
+
+    Returns:
+        bytes: Digest de 20 bytes
+    """
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(65536), b''):
+            sha1.update(block)
+    return sha1.digest()
+
+
+class EncodingCache:
+    """
+    Cache em disco das codificações faciais
+
+    Cada imagem é identificada pelo caminho, tamanho, mtime e hash do
+    conteúdo. Se tamanho e mtime coincidem a entrada é usada diretamente;
+    caso contrário o hash é conferido, de modo que arquivos apenas tocados,
+    copiados ou renomeados não precisam ser codificados novamente.
+    """
+
+    CACHE_FILENAME = "encodings_cache.npz"
+
+    def __init__(self, cache_path: str):
+        self.logger = get_logger(__name__)
+        self.cache_path = cache_path
+        self.base_dir = os.path.dirname(cache_path) or "."
+        self.entries: Dict[str, CacheEntry] = {}
+        self.by_digest: Dict[bytes, CacheEntry] = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def for_directory(cls, faces_dir: str) -> "EncodingCache":
+        """Cria o cache padrão de um diretório de rostos"""
+        return cls(os.path.join(faces_dir, cls.CACHE_FILENAME))
+
+    def _key(self, image_path: str) -> str:
+        """Chave relativa ao diretório do cache (portável se o diretório mudar)"""
+        return os.path.normpath(os.path.relpath(image_path, self.base_dir))
+
+    def _index(self, key: str, entry: CacheEntry):
+        self.entries[key] = entry
+        self.by_digest[entry.digest] = entry
+
+    def load(self) -> int:
+        """
+        Carrega o cache do disco com uma única leitura
+
+        Returns:
+            int: Número de entradas carregadas
+        """
+        self.entries.clear()
+        self.by_digest.clear()
+        self.dirty = False
+
+        if not os.path.exists(self.cache_path):
+            return 0
+
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                keys = data["paths"]
+                sizes = data["sizes"]
+                mtimes = data["mtimes"]
+                digests = data["digests"]
+                has_face = data["has_face"]
+                encodings = data["encodings"].astype(np.float64)
+
+            for i, key in enumerate(keys):
+                encoding = encodings[i] if has_face[i] else None
+                self._index(str(key), CacheEntry(int(sizes[i]), int(mtimes[i]), bytes(digests[i]), encoding))
+
+            self.logger.debug(f"Cache de codificações carregado: {len(self.entries)} entradas")
+            return len(self.entries)
+
+        except Exception as e:
+            self.logger.warning(f"Cache de codificações inválido, será recriado: {e}")
+            self.entries.clear()
+            self.by_digest.clear()
+            self.dirty = True
+            return 0
+
+    def save(self) -> bool:
+        """
+        Grava o cache em disco de forma atômica, se houver alterações
+
+        Returns:
+            bool: True se o cache está persistido
+        """
+        if not self.dirty:
+            return True
+
+        try:
+            keys = list(self.entries.keys())
+            count = len(keys)
+            encodings = np.zeros((count, ENCODING_SIZE), dtype=np.float32)
+            has_face = np.zeros(count, dtype=bool)
+
+            for i, key in enumerate(keys):
+                encoding = self.entries[key].encoding
+                if encoding is not None:
+                    encodings[i] = encoding
+                    has_face[i] = True
+
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(
+                    f,
+                    paths=np.array(keys, dtype=str),
+                    sizes=np.array([self.entries[k].size for k in keys], dtype=np.int64),
+                    mtimes=np.array([self.entries[k].mtime_ns for k in keys], dtype=np.int64),
+                    digests=np.array([self.entries[k].digest for k in keys], dtype="S20"),
+                    has_face=has_face,
+                    encodings=encodings
+                )
+            os.replace(tmp_path, self.cache_path)
+
+            self.dirty = False
+            self.logger.debug(f"Cache de codificações salvo: {count} entradas")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Erro ao salvar cache de codificações: {e}")
+            return False
+
+    def get(self, image_path: str) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Procura a codificação de uma imagem
+
+        Args:
+            image_path: Caminho da imagem
+
+        Returns:
+            Tuple: (encontrado, codificação ou None se a imagem não tem rosto)
+        """
+        key = self._key(image_path)
+        stat = os.stat(image_path)
+        entry = self.entries.get(key)
+
+        if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            self.hits += 1
+            return True, entry.encoding
+
+        # Assinatura mudou (ou caminho novo): conferir pelo conteúdo
+        digest = file_digest(image_path)
+        match = self.by_digest.get(digest)
+        if match is not None:
+            self._index(key, CacheEntry(stat.st_size, stat.st_mtime_ns, digest, match.encoding))
+            self.dirty = True
+            self.hits += 1
+            return True, match.encoding
+
+        self.misses += 1
+        return False, None
+
+    def put(self, image_path: str, encoding: Optional[np.ndarray]):
+        """
+        Armazena a codificação de uma imagem
+
+        Args:
+            image_path: Caminho da imagem
+            encoding: Codificação de 128 dimensões ou None se não há rosto
+        """
+        stat = os.stat(image_path)
+        digest = file_digest(image_path)
+        if encoding is not None:
+            encoding = np.asarray(encoding, dtype=np.float64)
+        self._index(self._key(image_path), CacheEntry(stat.st_size, stat.st_mtime_ns, digest, encoding))
+        self.dirty = True
+
+    def remove(self, image_path: str) -> bool:
+        """
+        Remove a entrada de uma imagem
+
+        Args:
+            image_path: Caminho da imagem
+
+        Returns:
+            bool: True se a entrada existia
+        """
+        entry = self.entries.pop(self._key(image_path), None)
+        if entry is None:
+            return False
+
+        if self.by_digest.get(entry.digest) is entry:
+            del self.by_digest[entry.digest]
+            # Outra imagem com o mesmo conteúdo continua indexada
+            for other in self.entries.values():
+                if other.digest == entry.digest:
+                    self.by_digest[entry.digest] = other
+                    break
+
+        self.dirty = True
+        return True
+
+    def rename(self, old_path: str, new_path: str) -> bool:
+        """
+        Move a entrada de uma imagem renomeada (o conteúdo não muda)
+
+        Args:
+            old_path: Caminho anterior
+            new_path: Novo caminho, já existente no disco
+
+        Returns:
+            bool: True se a entrada existia
+        """
+        entry = self.entries.pop(self._key(old_path), None)
+        if entry is None:
+            return False
+
+        stat = os.stat(new_path)
+        entry.size = stat.st_size
+        entry.mtime_ns = stat.st_mtime_ns
+        self.entries[self._key(new_path)] = entry
+        self.dirty = True
+        return True
+
+    def prune(self, valid_paths: Iterable[str]) -> int:
+        """
+        Remove entradas de arquivos que não existem mais
+
+        Args:
+            valid_paths: Caminhos das imagens atualmente no diretório
+
+        Returns:
+            int: Número de entradas removidas
+        """
+        valid_keys = {self._key(path) for path in valid_paths}
+        stale = [key for key in self.entries if key not in valid_keys]
+
+        for key in stale:
+            del self.entries[key]
+
+        if stale:
+            self.by_digest = {entry.digest: entry for entry in self.entries.values()}
+            self.dirty = True
+
+        return len(stale)
+
+    def clear(self):
+        """Apaga o cache em memória e em disco"""
+        self.entries.clear()
+        self.by_digest.clear()
+        self.dirty = False
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Registro consultável de detecções em SQLite
+
+Cada reconhecimento vira uma linha (instante, câmera, identidade, distância
+e caixa) em um banco só de inserção, em modo WAL. O laço de vídeo apenas
+coloca o evento em uma fila em memória; uma thread gravadora insere em lotes
+e aplica as políticas de retenção (apagar o que passou de N dias) e de
+compactação (detecções antigas reduzidas a uma por identidade e minuto).
+Com a fila cheia o evento é descartado e contado, nunca bloqueando o vídeo.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.logger import get_logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    camera TEXT NOT NULL,
+    identity TEXT NOT NULL,
+    distance REAL,
+    box_top INTEGER,
+    box_right INTEGER,
+    box_bottom INTEGER,
+    box_left INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_detections_identity_time ON detections (identity, timestamp);
+CREATE INDEX IF NOT EXISTS idx_detections_time ON detections (timestamp);
+"""
+
+DAY = 86400.0
+
+
+class DetectionEvent(NamedTuple):
+    """Um reconhecimento gravado"""
+    timestamp: float
+    camera: str
+    identity: str
+    distance: Optional[float]
+    box: Tuple[int, int, int, int]
+
+
+class EventStore:
+    """
+    Banco de detecções com gravação em segundo plano
+
+    Parâmetros:
+        path: arquivo SQLite (criado se não existir)
+        batch_size: eventos por transação
+        flush_interval: segundos máximos que um evento espera na fila
+        max_queue: eventos em memória antes de começar a descartar
+        retention_days: apagar detecções mais antigas (0 = manter tudo)
+        compact_after_days: reduzir detecções mais antigas a uma por
+            câmera, identidade e minuto (0 = não compactar)
+        maintenance_interval: segundos entre aplicações das políticas
+    """
+
+    def __init__(self, path: str = "data/events.db", batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue: int = 10000, retention_days: float = 30.0, compact_after_days: float = 7.0,
+                 maintenance_interval: float = 3600.0):
+        self.logger = get_logger(__name__)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.compact_after_days = compact_after_days
+        self.maintenance_interval = maintenance_interval
+
+        self._queue: "queue.Queue[Optional[DetectionEvent]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+        self.written = 0
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Com WAL, NORMAL só arrisca as últimas transações em queda de energia
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> "EventStore":
+        """Cria o banco, se preciso, e inicia a thread gravadora"""
+        if self._running:
+            return self
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Conexão simples: o modo WAL já inicializa o arquivo e auto_vacuum
+        # precisa ser definido antes disso
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            if connection.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Banco criado sem auto_vacuum: o novo modo só vale após um VACUUM
+                self.logger.info(f"Ativando auto_vacuum em {self.path}")
+                connection.execute("VACUUM")
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+        self._running = True
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Registro de detecções em {self.path}")
+        return self
+
+    def stop(self):
+        """Grava os eventos pendentes e encerra a thread gravadora"""
+        if not self._running:
+            return
+        self._running = False
+        # Sinal de parada: cabe assim que o gravador consumir o próximo lote
+        try:
+            self._queue.put(None, timeout=10.0)
+        except queue.Full:
+            self.logger.error("Registro de detecções não respondeu ao encerramento")
+        self._thread.join(timeout=10.0)
+        self._thread = None
+
+    def record(self, camera: str, identity: str, distance: Optional[float],
+               box: Sequence[int], timestamp: Optional[float] = None) -> bool:
+        """
+        Enfileira uma detecção sem bloquear
+
+        Args:
+            camera: Fonte do frame (ex.: VideoSource.name)
+            identity: Nome reconhecido (ou UNKNOWN_NAME)
+            distance: Distância à galeria (None no LBPH)
+            box: Caixa (top, right, bottom, left) no frame original
+            timestamp: Instante Unix (padrão: agora)
+
+        Returns:
+            bool: False se a fila estava cheia e o evento foi descartado
+        """
+        if not self._running:
+            return False
+        event = DetectionEvent(
+            time.time() if timestamp is None else timestamp, camera, identity,
+            None if distance is None else float(distance), tuple(int(v) for v in box)
+        )
+        with self._flushed:
+            self._pending += 1
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._flushed:
+                self._pending -= 1
+            self.dropped += 1
+            return False
+        return True
+
+    def record_recognitions(self, camera: str, locations: List, results: List,
+                            timestamp: Optional[float] = None):
+        """
+        Enfileira os resultados de um reconhecimento (MatchResult ou nome do RPi)
+
+        Args:
+            camera: Fonte do frame
+            locations: Caixas no frame original, na ordem de `results`
+            results: MatchResult (detector completo) ou str (LBPH)
+            timestamp: Instante Unix (padrão: agora)
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        for location, result in zip(locations, results):
+            if isinstance(result, str):
+                self.record(camera, result, None, location, timestamp)
+            else:
+                self.record(camera, result.name, result.distance, location, timestamp)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Espera a gravação dos eventos já enfileirados"""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._running:
+                    return self._pending == 0
+                self._flushed.wait(remaining)
+        return True
+
+    def _writer(self):
+        connection = self._connect()
+        last_maintenance = 0.0
+        try:
+            stopping = False
+            while not stopping:
+                batch: List[DetectionEvent] = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if event is None:
+                        stopping = True
+                        break
+                    batch.append(event)
+
+                if batch:
+                    self._insert(connection, batch)
+
+                if time.monotonic() - last_maintenance >= self.maintenance_interval or stopping:
+                    self._maintain(connection)
+                    last_maintenance = time.monotonic()
+        except Exception as e:
+            self.logger.error(f"Erro no registro de detecções: {e}")
+            self._running = False
+        finally:
+            connection.close()
+            with self._flushed:
+                self._flushed.notify_all()
+
+    def _insert(self, connection: sqlite3.Connection, batch: List[DetectionEvent]):
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT INTO detections (timestamp, camera, identity, distance, box_top, box_right, box_bottom, box_left) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(e.timestamp, e.camera, e.identity, e.distance) + tuple(e.box) for e in batch]
+                )
+            self.written += len(batch)
+        except sqlite3.Error as e:
+            # Disco cheio ou banco travado: o lote se perde, o vídeo continua
+            self.dropped += len(batch)
+            self.logger.error(f"Erro ao gravar {len(batch)} detecções: {e}")
+        finally:
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _maintain(self, connection: sqlite3.Connection):
+        """Aplica retenção e compactação e devolve as páginas livres ao disco"""
+        try:
+            now = time.time()
+            removed = 0
+            with connection:
+                if self.retention_days > 0:
+                    removed += connection.execute(
+                        "DELETE FROM detections WHERE timestamp < ?", (now - self.retention_days * DAY,)
+                    ).rowcount
+                if self.compact_after_days > 0:
+                    # Manter a detecção mais próxima de cada (câmera, identidade, minuto)
+                    removed += connection.execute(
+                        """
+                        DELETE FROM detections WHERE timestamp < ? AND id NOT IN (
+                            SELECT id FROM (
+                                SELECT id, ROW_NUMBER() OVER (
+                                    PARTITION BY camera, identity, CAST(timestamp / 60 AS INTEGER)
+                                    ORDER BY distance IS NULL, distance, timestamp
+                                ) AS rank
+                                FROM detections WHERE timestamp < ?
+                            ) WHERE rank = 1
+                        )
+                        """,
+                        (now - self.compact_after_days * DAY,) * 2
+                    ).rowcount
+            if removed:
+                # O pragma libera uma página por passo; executescript roda até o fim
+                connection.executescript("PRAGMA incremental_vacuum;")
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self.logger.info(f"Registro de detecções: {removed} linhas removidas por retenção/compactação")
+        except sqlite3.Error as e:
+            self.logger.error(f"Erro na manutenção do registro de detecções: {e}")
+
+    def query(self, identity: Optional[str] = None, start: Optional[float] = None,
+              end: Optional[float] = None, camera: Optional[str] = None,
+              limit: int = 1000) -> List[DetectionEvent]:
+        """
+        Consulta detecções (leitura concorrente com a gravação, graças ao WAL)
+
+        Args:
+            identity: Filtrar por identidade
+            start: Instante Unix inicial (inclusivo)
+            end: Instante Unix final (exclusivo)
+            camera: Filtrar por câmera
+            limit: Máximo de linhas
+
+        Returns:
+            List[DetectionEvent]: Detecções em ordem cronológica
+        """
+        clauses, params = [], []
+        for clause, value in (("identity = ?", identity), ("timestamp >= ?", start),
+                              ("timestamp < ?", end), ("camera = ?", camera)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        try:
+            rows = connection.execute(
+                "SELECT timestamp, camera, identity, distance, box_top, box_right, box_bottom, box_left "
+                f"FROM detections {where} ORDER BY timestamp LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            connection.close()
+        return [DetectionEvent(row[0], row[1], row[2], row[3], tuple(row[4:8])) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Eventos gravados, descartados e aguardando na fila"""
+        return {"written": self.written, "dropped": self.dropped, "queued": self._queue.qsize()}
+
+
+def open_event_store(path: str, retention_days: float = 30.0,
+                     compact_after_days: float = 7.0) -> Optional[EventStore]:
+    """Abre o registro se o caminho estiver configurado; None se desativado ou indisponível"""
+    if not path:
+        return None
+    try:
+        return EventStore(path, retention_days=retention_days, compact_after_days=compact_after_days).start()
+    except (OSError, sqlite3.Error) as e:
+        get_logger(__name__).error(f"Não foi possível abrir o registro de detecções {path}: {e}")
+        return None
@@ -7,116 +7,749 @@ Módulo de detecção e reconhecimento facial
 import cv2
 import face_recognition
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional, Union
 import os
+import threading
+import time
+from collections import Counter
+from core.ann_index import IVFIndex
+from core.encoding_cache import EncodingCache
+from core.face_matcher import FaceMatcher, MatchResult, UNKNOWN_NAME, select_medoids
+from core.gallery import (
+    iter_gallery_images, identity_image_paths, primary_image_path, new_template_path,
+    template_key, remove_identity_files, remove_template_files, rename_identity_files
+)
+from core.frame_reader import FrameReader, FrameSubscription
+from core.video_source import VideoSource, create_source
+from core.motion_gate import MotionGate
+from core.parallel_encoding import encode_face_file, parallel_map
+from core.recognition_cache import RecognitionCache
+from core.recognition_pool import RecognitionPool
+from core.tracker import FaceTracker, Track, TrackingStep
 from utils.logger import get_logger
+from utils.timing import Timings
 
 class FaceDetector:
     """Classe responsável pela detecção e reconhecimento facial"""
     
     def __init__(self):
         self.logger = get_logger(__name__)
-        self.video_capture = None
-        self.known_faces = []
-        self.known_names = []
+        self.video_source = None
+        self.source_name = None
+        # Thread de captura compartilhada pelos consumidores de frames
+        self.frame_reader = None
         self.face_locations = []
         self.face_names = []
+        self.face_matches = []
         self.process_frame = True
+        self.encoding_cache = None
+        self.faces_dir = "data/faces"
+        self.tolerance = 0.6
         
-    def initialize_camera(self, camera_index: int = 0) -> bool:
+        # Localizador: "hog" (CPU, rápido) ou "cnn" (mais preciso); lote usado em vídeos gravados
+        self.detection_model = "hog"
+        self.upsample = 1
+        self.batch_size = 8
+        
+        # Identidades com vários modelos: "best" (modelo mais próximo) ou "centroid"
+        self.match_mode = "best"
+        self.max_templates = 10
+        
+        # Processos usados para codificar a galeria (0 = um por núcleo)
+        self.encoding_workers = 0
+        
+        # Galeria como matriz contígua; mutações incrementais sob a trava do matcher
+        self.matcher = FaceMatcher()
+        # Um treino do índice IVF por vez (carregamento e configuração podem coincidir)
+        self._ann_lock = threading.Lock()
+        
+        # Detecção completa a cada N frames; caixas rastreadas por fluxo óptico entre elas
+        self.tracking = True
+        self.tracker = FaceTracker(detection_interval=10)
+        
+        # Frames sem movimento pulam a detecção e reaproveitam o último resultado
+        self.motion_gating = True
+        self.motion_gate = MotionGate()
+        self.last_result = ([], [])
+        self.full_detection = False
+        
+        # Recortes quase idênticos reaproveitam o reconhecimento anterior
+        self.recognition_cache = RecognitionCache()
+        
+        # Latência por etapa (captura, localização, reconhecimento, desenho...)
+        self.timings = Timings()
+        
+        # Contadores acumulados desde a criação (expostos em /metrics)
+        self.counters = Counter()
+        self.model_load_seconds = 0.0
+        
+        # Processos que localizam e codificam fora do GIL (None = no próprio processo)
+        self.recognition_pool = None
+    
+    @property
+    def known_names(self) -> List[str]:
+        """Nomes das identidades da galeria"""
+        return self.matcher.names
+    
+    @property
+    def known_faces(self) -> np.ndarray:
+        """Codificações da galeria (N x 128)"""
+        return self.matcher.matrix
+        
+    def initialize_camera(self, source: Union[int, str, VideoSource] = 0, **source_options) -> bool:
         """
-        Inicializa a câmera
+        Inicializa a fonte de vídeo
         
         Args:
-            camera_index: Índice da câmera (padrão 0)
+            source: Índice da câmera, arquivo de vídeo, pasta de imagens,
+                gravação (FrameRecorder) ou VideoSource (padrão: câmera 0)
+            source_options: mode/speed/loop para fontes gravadas
             
         Returns:
-            bool: True se a câmera foi inicializada com sucesso
+            bool: True se a fonte foi inicializada com sucesso
         """
         try:
-            if self.video_capture is not None:
-                self.video_capture.release()
-                
-            self.video_capture = cv2.VideoCapture(camera_index)
+            self._stop_frame_reader()
+            if self.video_source is not None:
+                self.video_source.release()
             
-            if not self.video_capture.isOpened():
-                self.logger.error(f"Não foi possível abrir a câmera {camera_index}")
-                return False
-                
             # Configurar resolução
-            self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            self.video_source = create_source(source, width=640, height=480, **source_options)
+            self.source_name = self.video_source.name
+            self.tracker.reset()
+            self.motion_gate.reset()
+            self.last_result = ([], [])
             
-            self.logger.info(f"Câmera {camera_index} inicializada com sucesso")
+            if not self.video_source.isOpened() and not self.video_source.open():
+                self.logger.error(f"Não foi possível abrir a fonte de vídeo {self.source_name}")
+                return False
+            
+            self.logger.info(f"Fonte de vídeo {self.source_name} inicializada com sucesso")
             return True
             
         except Exception as e:
             self.logger.error(f"Erro ao inicializar câmera: {e}")
             return False
     
-    def load_known_faces(self, faces_dir: str = "data/faces") -> int:
+    def load_known_faces(self, faces_dir: str = "data/faces",
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
         """
         Carrega rostos conhecidos do diretório
         
         Args:
             faces_dir: Diretório contendo as imagens dos rostos
+            progress_callback: Chamado com (codificadas, total) durante a codificação
             
         Returns:
-            int: Número de rostos carregados
+            int: Número de identidades carregadas
         """
+        started = time.perf_counter()
         try:
-            self.known_faces.clear()
-            self.known_names.clear()
+            self.faces_dir = faces_dir
             
             if not os.path.exists(faces_dir):
                 os.makedirs(faces_dir)
                 self.logger.info(f"Diretório {faces_dir} criado")
+                self._replace_gallery([], [], [])
                 return 0
             
-            loaded_count = 0
-            for filename in os.listdir(faces_dir):
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    try:
-                        image_path = os.path.join(faces_dir, filename)
-                        image = face_recognition.load_image_file(image_path)
-                        encodings = face_recognition.face_encodings(image)
-                        
-                        if encodings:
-                            self.known_faces.append(encodings[0])
-                            name = os.path.splitext(filename)[0]
-                            self.known_names.append(name)
-                            loaded_count += 1
-                            self.logger.debug(f"Rosto carregado: {name}")
-                        else:
-                            self.logger.warning(f"Nenhum rosto encontrado em {filename}")
-                            
-                    except Exception as e:
-                        self.logger.error(f"Erro ao carregar {filename}: {e}")
-            
-            self.logger.info(f"{loaded_count} rostos carregados com sucesso")
+            # Cache persistente: só imagens novas ou alteradas são codificadas
+            self.encoding_cache = EncodingCache.for_directory(faces_dir)
+            self.encoding_cache.load()
+            
+            gallery_images = iter_gallery_images(faces_dir)
+            image_paths = [image_path for _, image_path in gallery_images]
+            
+            # Consultar o cache e codificar só as imagens novas, em paralelo
+            encodings = {}
+            missing = []
+            for image_path in image_paths:
+                try:
+                    found, encoding = self.encoding_cache.get(image_path)
+                    if found:
+                        encodings[image_path] = encoding
+                    else:
+                        missing.append(image_path)
+                except Exception as e:
+                    self.logger.error(f"Erro ao carregar {image_path}: {e}")
+            
+            if missing:
+                results = parallel_map(
+                    encode_face_file, missing, self.encoding_workers,
+                    progress_callback=progress_callback
+                )
+                for image_path, encoding, error in results:
+                    if error is not None:
+                        self.logger.error(f"Erro ao carregar {image_path}: {error}")
+                        continue
+                    self.encoding_cache.put(image_path, encoding)
+                    encodings[image_path] = encoding
+            
+            known_faces = []
+            known_names = []
+            known_keys = []
+            for name, image_path in gallery_images:
+                if image_path not in encodings:
+                    continue
+                encoding = encodings[image_path]
+                if encoding is not None:
+                    known_faces.append(encoding)
+                    known_names.append(name)
+                    known_keys.append(template_key(faces_dir, image_path))
+                    self.logger.debug(f"Rosto carregado: {name}")
+                else:
+                    self.logger.warning(f"Nenhum rosto encontrado em {image_path}")
+            
+            self.encoding_cache.prune(image_paths)
+            self.encoding_cache.save()
+            self.logger.debug(
+                f"Cache de codificações: {self.encoding_cache.hits} acertos, "
+                f"{self.encoding_cache.misses} novas codificações"
+            )
+            
+            # Trocar a galeria de uma vez para não interromper o reconhecimento
+            self._replace_gallery(known_faces, known_names, known_keys)
+            self._refresh_ann_index(faces_dir, load=True)
+            loaded_count = len(self.matcher.identities)
+            self.model_load_seconds = time.perf_counter() - started
+            
+            self.logger.info(f"{loaded_count} rostos carregados com sucesso ({len(known_keys)} modelos)")
             return loaded_count
             
         except Exception as e:
             self.logger.error(f"Erro ao carregar rostos conhecidos: {e}")
             return 0
     
+    def _replace_gallery(self, known_faces: List, known_names: List, known_keys: List):
+        """Substitui a galeria inteira de uma vez"""
+        self.matcher.set_gallery(known_faces, known_names, known_keys)
+    
+    def enable_ann_index(self, n_lists: Optional[int] = None, n_probe: int = 8,
+                         min_size: int = 2000, faces_dir: str = "data/faces", background: bool = False):
+        """
+        Ativa a busca aproximada (IVF) para galerias grandes
+        
+        Args:
+            n_lists: Número de partições (None = automático, 2·sqrt(N))
+            n_probe: Partições visitadas por consulta (maior = mais recall, mais lento)
+            min_size: Abaixo deste tamanho a busca exata é usada
+            faces_dir: Diretório onde o índice é persistido
+            background: Treinar em outra thread (a busca exata vale até o fim do treino)
+        """
+        self.matcher.attach_index(IVFIndex(n_lists=n_lists, n_probe=n_probe, min_size=min_size))
+        if background:
+            # k-means sobre a galeria inteira: fora da thread que chamou (ex.: a da interface)
+            threading.Thread(target=self._refresh_ann_index, args=(faces_dir, True), daemon=True).start()
+        else:
+            self._refresh_ann_index(faces_dir, load=True)
+    
+    def disable_ann_index(self):
+        """Desativa a busca aproximada (volta à busca exata)"""
+        self.matcher.attach_index(None)
+    
+    def _refresh_ann_index(self, faces_dir: str, load: bool = False):
+        """Carrega, treina (se necessário) e persiste o índice IVF ao lado da galeria"""
+        with self._ann_lock:
+            index = self.matcher.index
+            if index is None:
+                return
+            
+            try:
+                index_path = os.path.join(faces_dir, IVFIndex.INDEX_FILENAME)
+                if load and not index.is_trained and index.load(index_path):
+                    self.matcher.attach_index(index)
+                    self.logger.debug("Índice IVF carregado do disco")
+                
+                if self.matcher.train_index():
+                    index.save(index_path)
+                    
+            except Exception as e:
+                self.logger.error(f"Erro ao atualizar índice IVF: {e}")
+    
+    def _get_encoding_cache(self, faces_dir: str) -> EncodingCache:
+        """Retorna o cache de codificações do diretório, carregando se necessário"""
+        if self.encoding_cache is None or self.faces_dir != faces_dir:
+            self.faces_dir = faces_dir
+            self.encoding_cache = EncodingCache.for_directory(faces_dir)
+            self.encoding_cache.load()
+        return self.encoding_cache
+    
+    def add_face(self, name: str, image_path: str, faces_dir: str = "data/faces") -> bool:
+        """
+        Adiciona um modelo de uma identidade à galeria sem recarregar as demais
+        
+        Args:
+            name: Nome da pessoa
+            image_path: Caminho da imagem já salva em faces_dir
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            bool: True se o rosto foi codificado e adicionado
+        """
+        try:
+            cache = self._get_encoding_cache(faces_dir)
+            
+            # Codificar fora da trava: o reconhecimento continua enquanto isso
+            found, encoding = cache.get(image_path)
+            if not found:
+                image = face_recognition.load_image_file(image_path)
+                encodings = face_recognition.face_encodings(image)
+                encoding = encodings[0] if encodings else None
+                cache.put(image_path, encoding)
+            cache.save()
+            
+            if encoding is None:
+                self.logger.warning(f"Nenhum rosto encontrado em {image_path}")
+                return False
+            
+            self.matcher.add(name, encoding, template_key(faces_dir, image_path))
+            self._refresh_ann_index(faces_dir)
+            
+            self.logger.info(f"Rosto de '{name}' adicionado à galeria")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao adicionar rosto de '{name}': {e}")
+            return False
+    
+    def add_faces(self, faces: List[Tuple[str, str]], faces_dir: str = "data/faces",
+                  progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Cadastra várias imagens de uma vez, codificando em paralelo
+        
+        Args:
+            faces: Lista de tuplas (nome, caminho_da_imagem)
+            faces_dir: Diretório das imagens
+            progress_callback: Chamado com (codificadas, total)
+            
+        Returns:
+            int: Número de imagens adicionadas
+        """
+        try:
+            cache = self._get_encoding_cache(faces_dir)
+            names = {image_path: name for name, image_path in faces}
+            
+            encodings = {}
+            missing = []
+            for name, image_path in faces:
+                found, encoding = cache.get(image_path)
+                if found:
+                    encodings[image_path] = encoding
+                else:
+                    missing.append(image_path)
+            
+            for image_path, encoding, error in parallel_map(
+                encode_face_file, missing, self.encoding_workers, progress_callback=progress_callback
+            ):
+                if error is not None:
+                    self.logger.error(f"Erro ao codificar {image_path}: {error}")
+                    continue
+                cache.put(image_path, encoding)
+                encodings[image_path] = encoding
+            cache.save()
+            
+            added = 0
+            for image_path, encoding in encodings.items():
+                if encoding is None:
+                    self.logger.warning(f"Nenhum rosto encontrado em {image_path}")
+                    continue
+                self.matcher.add(names[image_path], encoding, template_key(faces_dir, image_path))
+                added += 1
+            self._refresh_ann_index(faces_dir)
+            
+            self.logger.info(f"{added} imagens adicionadas à galeria")
+            return added
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao adicionar rostos: {e}")
+            return 0
+    
+    def remove_face(self, name: str) -> bool:
+        """
+        Remove uma identidade (todos os modelos) da galeria em memória
+        
+        Args:
+            name: Nome da pessoa
+            
+        Returns:
+            bool: True se o nome estava na galeria
+        """
+        return self.matcher.remove(name)
+    
+    def get_template_paths(self, name: str, faces_dir: str = "data/faces") -> List[str]:
+        """
+        Retorna as imagens (modelos) de uma identidade
+        
+        Args:
+            name: Nome da pessoa
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            List: Caminhos das imagens
+        """
+        return identity_image_paths(faces_dir, name)
+    
+    def prune_templates(self, name: str, max_templates: Optional[int] = None,
+                        faces_dir: str = "data/faces") -> int:
+        """
+        Limita uma identidade a k modelos representativos (medoides)
+        
+        Args:
+            name: Nome da pessoa
+            max_templates: Número máximo de modelos (padrão: self.max_templates)
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            int: Número de modelos removidos
+        """
+        k = max_templates or self.max_templates
+        try:
+            keys = self.matcher.template_keys(name)
+            if len(keys) <= k:
+                return 0
+            
+            vectors = np.stack([self.matcher.get_encoding(key) for key in keys])
+            keep = set(select_medoids(vectors, k))
+            
+            cache = self._get_encoding_cache(faces_dir)
+            removed = 0
+            for i, key in enumerate(keys):
+                if i in keep:
+                    continue
+                image_path = os.path.join(faces_dir, key)
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                cache.remove(image_path)
+                self.matcher.remove_template(key)
+                removed += 1
+            cache.save()
+            
+            self.logger.info(f"'{name}': {removed} modelos podados, {len(keep)} mantidos")
+            return removed
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao podar modelos de '{name}': {e}")
+            return 0
+    
+    def _remove_templates(self, name: str, paths: List[str], faces_dir: str):
+        """Apaga imagens de uma identidade e tira os modelos da galeria e do cache"""
+        cache = self._get_encoding_cache(faces_dir)
+        for image_path in remove_template_files(faces_dir, name, paths):
+            cache.remove(image_path)
+            self.matcher.remove_template(template_key(faces_dir, image_path))
+        cache.save()
+    
+    def prune_all_templates(self, max_templates: Optional[int] = None,
+                            faces_dir: str = "data/faces") -> int:
+        """
+        Executa a poda de modelos em todas as identidades
+        
+        Args:
+            max_templates: Número máximo de modelos por identidade
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            int: Total de modelos removidos
+        """
+        return sum(self.prune_templates(name, max_templates, faces_dir) for name in self.known_names)
+    
+    def rename_face(self, old_name: str, new_name: str, faces_dir: str = "data/faces") -> bool:
+        """
+        Renomeia uma identidade no disco, no cache e na galeria
+        
+        Args:
+            old_name: Nome atual
+            new_name: Novo nome (um perfil existente com esse nome é substituído)
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            bool: True se renomeado com sucesso
+        """
+        try:
+            if not identity_image_paths(faces_dir, old_name):
+                self.logger.warning(f"Arquivo de '{old_name}' não encontrado")
+                return False
+            
+            cache = self._get_encoding_cache(faces_dir)
+            for path in remove_identity_files(faces_dir, new_name):
+                cache.remove(path)
+            self.remove_face(new_name)
+            
+            moved = rename_identity_files(faces_dir, old_name, new_name)
+            for old_path, new_path in moved.items():
+                cache.rename(old_path, new_path)
+            cache.save()
+            
+            key_map = {
+                template_key(faces_dir, old_path): template_key(faces_dir, new_path)
+                for old_path, new_path in moved.items()
+            }
+            self.matcher.rename(old_name, new_name, key_map)
+            
+            self.logger.info(f"Rosto renomeado de '{old_name}' para '{new_name}'")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao renomear rosto de '{old_name}': {e}")
+            return False
+    
+    def _ensure_frame_reader(self) -> Optional[FrameReader]:
+        """Inicia a thread de captura na primeira leitura"""
+        if self.video_source is None or not self.video_source.isOpened():
+            return None
+        if self.frame_reader is None or not self.frame_reader.is_running:
+            self.frame_reader = FrameReader(self.video_source, timings=self.timings).start()
+        return self.frame_reader
+    
+    def _stop_frame_reader(self):
+        if self.frame_reader is not None:
+            self.frame_reader.stop()
+            self.frame_reader = None
+    
+    def subscribe_frames(self, name: str) -> Optional[FrameSubscription]:
+        """
+        Inscreve um consumidor na thread de captura
+        
+        Args:
+            name: Identificação do consumidor
+            
+        Returns:
+            FrameSubscription ou None se a câmera não estiver aberta
+        """
+        reader = self._ensure_frame_reader()
+        return reader.subscribe(name) if reader is not None else None
+    
     def get_frame(self) -> Optional[np.ndarray]:
         """
-        Captura um frame da câmera
+        Retorna uma cópia do frame mais recente da câmera
         
         Returns:
             np.ndarray ou None: Frame capturado ou None se houver erro
         """
-        if self.video_capture is None or not self.video_capture.isOpened():
+        reader = self._ensure_frame_reader()
+        if reader is None:
             return None
+        
+        frame = reader.latest(timeout=1.0)
+        return frame.image.copy() if frame is not None else None
+    
+    def set_recognition_workers(self, workers: int):
+        """
+        Ativa, redimensiona ou desativa o pool de processos de reconhecimento
+        
+        Args:
+            workers: Número de processos (0 = localizar e codificar no próprio processo)
+        """
+        current = self.recognition_pool.worker_count if self.recognition_pool is not None else 0
+        if workers == current:
+            return
+        
+        if self.recognition_pool is not None:
+            self.recognition_pool.stop()
+            self.recognition_pool = None
+        
+        if workers > 0:
+            try:
+                self.recognition_pool = RecognitionPool(workers).start()
+            except Exception as e:
+                self.logger.error(f"Erro ao iniciar pool de reconhecimento: {e}")
+                self.recognition_pool = None
+    
+    def _pool_call(self, method: str, *args, **kwargs):
+        """Executa no pool; None se o pool estiver inativo ou falhar (fallback local)"""
+        pool = self.recognition_pool
+        if pool is None or not pool.is_running:
+            return None
+        
+        try:
+            if method == "identify" and pool.gallery_version != self.matcher.version:
+                with self.matcher.lock:
+                    pool.set_gallery(
+                        self.matcher.version, self.matcher.matrix,
+                        list(self.matcher.labels), list(self.matcher.keys)
+                    )
+            return getattr(pool, method)(*args, **kwargs)
+        except Exception as e:
+            self.logger.warning(f"Pool de reconhecimento indisponível, processando localmente: {e}")
+            return None
+    
+    def locate_faces(self, rgb_frame: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Localiza rostos em um frame RGB
+        
+        Args:
+            rgb_frame: Frame RGB
             
-        ret, frame = self.video_capture.read()
-        return frame if ret else None
+        Returns:
+            List: Caixas (top, right, bottom, left)
+        """
+        with self.timings.measure("locate"):
+            locations = self._pool_call("locate", rgb_frame, self.detection_model, self.upsample)
+            if locations is None:
+                locations = face_recognition.face_locations(
+                    rgb_frame, number_of_times_to_upsample=self.upsample, model=self.detection_model
+                )
+        
+        self.counters["faces_detected"] += len(locations)
+        return locations
+    
+    def locate_faces_batch(self, rgb_frames: List[np.ndarray]) -> List[List[Tuple[int, int, int, int]]]:
+        """
+        Localiza rostos em vários frames de uma vez
+        
+        Com o modelo CNN, os frames são enviados em lotes de `batch_size` a
+        batch_face_locations, diluindo o custo fixo de cada chamada. Com HOG
+        cada frame é processado individualmente.
+        
+        Args:
+            rgb_frames: Frames RGB, todos com as mesmas dimensões
+            
+        Returns:
+            List: Caixas de cada frame, na mesma ordem
+        """
+        if self.detection_model != "cnn":
+            return [self.locate_faces(rgb_frame) for rgb_frame in rgb_frames]
+        
+        batch_locations = face_recognition.batch_face_locations(
+            list(rgb_frames), number_of_times_to_upsample=self.upsample, batch_size=self.batch_size
+        )
+        self.counters["faces_detected"] += sum(len(locations) for locations in batch_locations)
+        return batch_locations
+    
+    def identify_faces(self, rgb_frame: np.ndarray, face_locations: List) -> List[MatchResult]:
+        """
+        Codifica e reconhece os rostos já localizados
+        
+        Args:
+            rgb_frame: Frame RGB
+            face_locations: Caixas retornadas por locate_faces
+            
+        Returns:
+            List[MatchResult]: Resultado da comparação de cada rosto com a galeria
+        """
+        if not face_locations:
+            return []
+        
+        # Resultados mudam com a galeria e com os parâmetros de comparação
+        generation = (self.matcher.version, self.tolerance, self.match_mode)
+        
+        matches: List[Optional[MatchResult]] = [None] * len(face_locations)
+        keys = [None] * len(face_locations)
+        if self.recognition_cache.enabled:
+            for i, (top, right, bottom, left) in enumerate(face_locations):
+                keys[i] = self.recognition_cache.key(
+                    rgb_frame[max(0, top):bottom, max(0, left):right], face_locations[i]
+                )
+                matches[i] = self.recognition_cache.get(keys[i], generation)
+        
+        missing = [i for i, match in enumerate(matches) if match is None]
+        if missing:
+            missing_locations = [face_locations[i] for i in missing]
+            with self.timings.measure("encode"):
+                results = self._pool_call(
+                    "identify", rgb_frame, missing_locations, self.tolerance, self.match_mode
+                )
+                if results is None:
+                    face_encodings = face_recognition.face_encodings(rgb_frame, missing_locations)
+                    
+                    # Comparar todos os rostos com toda a galeria em uma operação
+                    results = self.matcher.match(face_encodings, self.tolerance, self.match_mode)
+            
+            for i, match in zip(missing, results):
+                matches[i] = match
+                self.recognition_cache.put(keys[i], match, generation)
+        
+        known = sum(1 for match in matches if match.name != UNKNOWN_NAME)
+        self.counters["identified_known"] += known
+        self.counters["identified_unknown"] += len(matches) - known
+        return matches
+    
+    def track_faces(self, frame: np.ndarray) -> Optional[TrackingStep]:
+        """
+        Etapa de localização: filtro de movimento, detecção completa ou propagação
+        
+        Não reconhece ninguém: os rastros que precisam de reconhecimento são
+        marcados como em andamento e devolvidos para recognize_tracks, que
+        pode rodar agora ou em outra thread.
+        
+        Args:
+            frame: Frame BGR
+            
+        Returns:
+            TrackingStep ou None se o frame foi descartado pelo filtro de movimento
+        """
+        self.full_detection = False
+        self.counters["frames_processed"] += 1
+        
+        # Sem movimento relevante: nada mudou desde o último resultado
+        if self.motion_gating:
+            with self.timings.measure("motion_gate"):
+                moving = self.motion_gate.update(frame)
+            if not moving:
+                return None
+        
+        # Redimensionar frame para processamento mais rápido
+        small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+        gray_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
+        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        
+        pending = []
+        if not self.tracking or self.tracker.needs_detection():
+            locations = self.locate_faces(rgb_small_frame)
+            self.full_detection = True
+            tracks = self.tracker.update_detections(gray_small_frame, locations)
+            
+            # Codificar só rastros novos, desconhecidos ou com reverificação vencida
+            pending = self.tracker.pending_recognition()
+            for track in pending:
+                track.in_flight = True
+        else:
+            with self.timings.measure("propagate"):
+                tracks = self.tracker.propagate(gray_small_frame)
+        
+        return TrackingStep(list(tracks), pending, [track.box for track in pending], rgb_small_frame)
+    
+    def recognize_tracks(self, step: TrackingStep) -> List[MatchResult]:
+        """
+        Etapa de reconhecimento: codifica os rastros pendentes e registra os votos
+        
+        Args:
+            step: Resultado de track_faces
+            
+        Returns:
+            List[MatchResult]: Resultado de cada rastro pendente
+        """
+        try:
+            matches = self.identify_faces(step.image, step.boxes)
+            for track, match in zip(step.pending, matches):
+                track.add_vote(match.name, match)
+            self.face_matches = matches
+            return matches
+        finally:
+            for track in step.pending:
+                track.in_flight = False
+    
+    def tracks_result(self, tracks: List[Track]) -> Tuple[List, List]:
+        """
+        Converte rastros em (localizações no frame original, nomes)
+        
+        Args:
+            tracks: Rastros na escala reduzida
+            
+        Returns:
+            Tuple: (localizações dos rostos, nomes identificados)
+        """
+        locations = [(top * 2, right * 2, bottom * 2, left * 2) for (top, right, bottom, left) in
+                     (track.box for track in tracks)]
+        return locations, [track.name for track in tracks]
     
     def detect_faces(self, frame: np.ndarray) -> Tuple[List, List]:
         """
         Detecta e reconhece rostos em um frame
         
+        Com o rastreamento ativo, a detecção completa roda apenas quando o
+        rastreador pede; nos demais frames as caixas são propagadas.
+        
         Args:
             frame: Frame da imagem
             
@@ -124,31 +757,34 @@ class FaceDetector:
             Tuple: (localizações dos rostos, nomes identificados)
         """
         try:
-            # Redimensionar frame para processamento mais rápido
-            small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
-            rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+            if self.tracking:
+                step = self.track_faces(frame)
+                if step is None:
+                    return self.last_result
+                
+                self.recognize_tracks(step)
+                self.face_locations = [track.box for track in step.tracks]
+                self.face_names = [track.name for track in step.tracks]
+                self.last_result = self.tracks_result(step.tracks)
+                return self.last_result
+            
+            self.full_detection = False
+            self.counters["frames_processed"] += 1
+            
+            # Sem movimento relevante: nada mudou desde o último resultado
+            if self.motion_gating and not self.motion_gate.update(frame):
+                return self.last_result
             
             if self.process_frame:
-                # Detectar localizações dos rostos
-                self.face_locations = face_recognition.face_locations(rgb_small_frame)
-                face_encodings = face_recognition.face_encodings(rgb_small_frame, self.face_locations)
-                
-                self.face_names = []
-                
-                for face_encoding in face_encodings:
-                    matches = face_recognition.compare_faces(self.known_faces, face_encoding)
-                    name = "Desconhecido"
-                    
-                    # Usar distância para encontrar melhor match
-                    if True in matches:
-                        face_distances = face_recognition.face_distance(self.known_faces, face_encoding)
-                        best_match_index = np.argmin(face_distances)
-                        if matches[best_match_index]:
-                            name = self.known_names[best_match_index]
-                    
-                    self.face_names.append(name)
+                # Redimensionar frame para processamento mais rápido
+                small_frame = cv2.resize(frame, (0, 0), fx=0.5, fy=0.5)
+                rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+                self.face_locations = self.locate_faces(rgb_small_frame)
+                self.full_detection = True
+                self.face_matches = self.identify_faces(rgb_small_frame, self.face_locations)
+                self.face_names = [match.name for match in self.face_matches]
             
-            # Alternar processamento para melhorar performance
+            # Alternar processamento para melhorar performance (modo sem rastreamento)
             self.process_frame = not self.process_frame
             
             # Ajustar coordenadas para o frame original
@@ -156,12 +792,47 @@ class FaceDetector:
             for (top, right, bottom, left) in self.face_locations:
                 adjusted_locations.append((top * 2, right * 2, bottom * 2, left * 2))
             
-            return adjusted_locations, self.face_names
+            self.last_result = (adjusted_locations, self.face_names)
+            return self.last_result
             
         except Exception as e:
             self.logger.error(f"Erro na detecção de rostos: {e}")
             return [], []
     
+    def detect_faces_batch(self, frames: List[np.ndarray]) -> List[Tuple[List, List]]:
+        """
+        Detecta e reconhece rostos em vários frames independentes (vídeo gravado)
+        
+        Sem rastreamento nem filtro de movimento: cada frame passa pela
+        detecção completa, com localização em lote quando o modelo é CNN.
+        
+        Args:
+            frames: Frames BGR com as mesmas dimensões
+            
+        Returns:
+            List: (localizações, nomes) de cada frame, na mesma ordem
+        """
+        try:
+            self.counters["frames_processed"] += len(frames)
+            rgb_small_frames = [
+                cv2.cvtColor(cv2.resize(frame, (0, 0), fx=0.5, fy=0.5), cv2.COLOR_BGR2RGB)
+                for frame in frames
+            ]
+            
+            results = []
+            for rgb_small_frame, locations in zip(rgb_small_frames, self.locate_faces_batch(rgb_small_frames)):
+                matches = self.identify_faces(rgb_small_frame, locations)
+                adjusted_locations = [
+                    (top * 2, right * 2, bottom * 2, left * 2) for (top, right, bottom, left) in locations
+                ]
+                results.append((adjusted_locations, [match.name for match in matches]))
+            
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Erro na detecção em lote: {e}")
+            return [([], []) for _ in frames]
+    
     def draw_face_rectangles(self, frame: np.ndarray, face_locations: List, face_names: List) -> np.ndarray:
         """
         Desenha retângulos e nomes nos rostos detectados
@@ -175,19 +846,20 @@ class FaceDetector:
             np.ndarray: Frame com retângulos desenhados
         """
         try:
-            for (top, right, bottom, left), name in zip(face_locations, face_names):
-                # Cor verde para conhecidos, vermelha para desconhecidos
-                color = (0, 255, 0) if name != "Desconhecido" else (0, 0, 255)
+            with self.timings.measure("draw"):
+                for (top, right, bottom, left), name in zip(face_locations, face_names):
+                    # Cor verde para conhecidos, vermelha para desconhecidos
+                    color = (0, 255, 0) if name != UNKNOWN_NAME else (0, 0, 255)
                 
-                # Desenhar retângulo
-                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                    # Desenhar retângulo
+                    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
                 
-                # Desenhar fundo para o texto
-                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+                    # Desenhar fundo para o texto
+                    cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
                 
-                # Desenhar texto
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.6, (255, 255, 255), 1)
+                    # Desenhar texto
+                    font = cv2.FONT_HERSHEY_DUPLEX
+                    cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.6, (255, 255, 255), 1)
             
             return frame
             
@@ -195,13 +867,15 @@ class FaceDetector:
             self.logger.error(f"Erro ao desenhar retângulos: {e}")
             return frame
     
-    def capture_face(self, name: str, faces_dir: str = "data/faces") -> bool:
+    def capture_face(self, name: str, faces_dir: str = "data/faces", append: bool = False) -> bool:
         """
         Captura e salva um rosto
         
         Args:
             name: Nome da pessoa
             faces_dir: Diretório para salvar a imagem
+            append: True para adicionar um novo modelo à identidade,
+                False para substituir os modelos existentes
             
         Returns:
             bool: True se o rosto foi capturado com sucesso
@@ -214,7 +888,7 @@ class FaceDetector:
             
             # Converter para RGB para face_recognition
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_frame)
+            face_locations = self.locate_faces(rgb_frame)
             
             if not face_locations:
                 self.logger.warning("Nenhum rosto detectado para captura")
@@ -237,14 +911,22 @@ class FaceDetector:
             if not os.path.exists(faces_dir):
                 os.makedirs(faces_dir)
             
-            # Salvar imagem
-            filename = os.path.join(faces_dir, f"{name}.jpg")
+            # Salvar como novo modelo: numa substituição os antigos só saem
+            # depois que o novo for codificado (um recorte ruim não apaga o cadastro)
+            old_paths = [] if append else identity_image_paths(faces_dir, name)
+            filename = new_template_path(faces_dir, name)
             success = cv2.imwrite(filename, face_image)
             
             if success:
                 self.logger.info(f"Rosto de '{name}' salvo em {filename}")
-                # Recarregar rostos conhecidos
-                self.load_known_faces(faces_dir)
+                # Atualizar apenas este rosto na galeria
+                if not self.add_face(name, filename, faces_dir):
+                    self._remove_templates(name, [filename], faces_dir)
+                    return False
+                if old_paths:
+                    self._remove_templates(name, old_paths, faces_dir)
+                if self.matcher.template_count(name) > self.max_templates:
+                    self.prune_templates(name, self.max_templates, faces_dir)
                 return True
             else:
                 self.logger.error(f"Erro ao salvar imagem de '{name}'")
@@ -259,21 +941,21 @@ class FaceDetector:
         Retorna informações dos rostos conhecidos
         
         Returns:
-            List: Lista de tuplas (nome, caminho_da_imagem)
+            List: Lista de tuplas (nome, caminho_da_imagem principal)
         """
         faces_info = []
         faces_dir = "data/faces"
         
         for name in self.known_names:
-            image_path = os.path.join(faces_dir, f"{name}.jpg")
-            if os.path.exists(image_path):
+            image_path = primary_image_path(faces_dir, name)
+            if image_path is not None:
                 faces_info.append((name, image_path))
         
         return faces_info
     
     def delete_face(self, name: str, faces_dir: str = "data/faces") -> bool:
         """
-        Remove um rosto conhecido
+        Remove um rosto conhecido (todos os modelos da identidade)
         
         Args:
             name: Nome da pessoa a ser removida
@@ -283,13 +965,16 @@ class FaceDetector:
             bool: True se removido com sucesso
         """
         try:
-            image_path = os.path.join(faces_dir, f"{name}.jpg")
+            removed = remove_identity_files(faces_dir, name)
             
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                self.logger.info(f"Rosto de '{name}' removido")
-                # Recarregar rostos conhecidos
-                self.load_known_faces(faces_dir)
+            if removed:
+                self.logger.info(f"Rosto de '{name}' removido ({len(removed)} imagens)")
+                # Atualizar apenas esta identidade na galeria e no cache
+                self.remove_face(name)
+                cache = self._get_encoding_cache(faces_dir)
+                for image_path in removed:
+                    cache.remove(image_path)
+                cache.save()
                 return True
             else:
                 self.logger.warning(f"Arquivo de '{name}' não encontrado")
@@ -300,11 +985,13 @@ class FaceDetector:
             return False
     
     def cleanup(self):
-        """Libera recursos da câmera"""
+        """Libera recursos da câmera e do pool de reconhecimento"""
         try:
-            if self.video_capture is not None:
-                self.video_capture.release()
-                self.video_capture = None
+            self._stop_frame_reader()
+            self.set_recognition_workers(0)
+            if self.video_source is not None:
+                self.video_source.release()
+                self.video_source = None
                 self.logger.info("Câmera liberada")
         except Exception as e:
             self.logger.error(f"Erro ao liberar câmera: {e}") 
\ No newline at end of file
@@ -7,21 +7,116 @@ Versão simplificada usando apenas OpenCV (sem dlib/face_recognition)
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Callable, List, Tuple, Optional, Union
 import os
+import time
+from collections import Counter
 import pickle
+from core.face_matcher import select_medoids
+from core.gallery import (
+    iter_gallery_images, identity_image_paths, primary_image_path, new_template_path,
+    remove_identity_files, remove_template_files, rename_identity_files
+)
+from core.frame_reader import FrameReader, FrameSubscription
+from core.video_source import VideoSource, create_source
+from core.motion_gate import MotionGate
+from core.parallel_encoding import parallel_map, resolve_workers
+from core.recognition_cache import RecognitionCache
+from core.tracker import FaceTracker, Track, TrackingStep
 from utils.logger import get_logger
+from utils.timing import Timings
+
+# Classificador usado pelos processos do pool de extração
+_worker_cascade = None
+
+def extract_face_roi(image_path: str, face_cascade) -> Optional[np.ndarray]:
+    """
+    Extrai a região do rosto normalizada (100x100, escala de cinza) de uma imagem
+    
+    Args:
+        image_path: Caminho da imagem
+        face_cascade: Classificador Haar Cascade
+        
+    Returns:
+        np.ndarray ou None: Região do rosto ou None se nenhum rosto for detectado
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    
+    detected_faces = face_cascade.detectMultiScale(
+        image, 
+        scaleFactor=1.1, 
+        minNeighbors=5,
+        minSize=(30, 30)
+    )
+    
+    if len(detected_faces) == 0:
+        return None
+    
+    # Usar o primeiro rosto detectado
+    (x, y, w, h) = detected_faces[0]
+    return cv2.resize(image[y:y+h, x:x+w], (100, 100))
+
+def _init_roi_worker():
+    """Carrega o classificador uma vez em cada processo do pool"""
+    global _worker_cascade
+    _worker_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+def _extract_roi_worker(image_path: str):
+    """Extração de rosto executada nos processos do pool (erro isolado por arquivo)"""
+    try:
+        return image_path, extract_face_roi(image_path, _worker_cascade), None
+    except Exception as e:
+        return image_path, None, str(e)
 
 class FaceDetectorRPi:
     """Classe responsável pela detecção facial no Raspberry Pi usando OpenCV"""
     
     def __init__(self):
         self.logger = get_logger(__name__)
-        self.video_capture = None
+        self.video_source = None
+        self.source_name = None
+        # Thread de captura compartilhada pelos consumidores de frames
+        self.frame_reader = None
         self.known_faces = []
         self.known_names = []
+        # Rótulo LBPH -> nome (None para rótulos removidos até o próximo treino)
+        self.label_names = []
         self.face_cascade = None
         self.face_recognizer = None
+        self.max_templates = 10
+        
+        # Configurações do detector completo, sem efeito aqui (sempre Haar + LBPH)
+        self.detection_model = "hog"
+        self.tolerance = 0.6
+        
+        # Distância LBPH máxima para aceitar uma identidade (menor = mais rigoroso)
+        self.lbph_threshold = 100.0
+        
+        # Processos para extrair rostos no treino (0 = automático, limitado a 2 no RPi)
+        self.encoding_workers = 0
+        
+        # Detecção completa a cada N frames; caixas rastreadas por fluxo óptico entre elas
+        self.tracking = True
+        self.tracker = FaceTracker(detection_interval=5)
+        
+        # Frames sem movimento pulam a detecção e reaproveitam o último resultado
+        self.motion_gating = True
+        self.motion_gate = MotionGate()
+        self.last_result = ([], [])
+        self.full_detection = False
+        
+        # Recortes quase idênticos reaproveitam o reconhecimento anterior
+        self.recognition_cache = RecognitionCache()
+        
+        # Latência por etapa (captura, localização, reconhecimento, desenho...)
+        self.timings = Timings()
+        
+        # Contadores acumulados desde a criação (expostos em /metrics)
+        self.counters = Counter()
+        self.model_load_seconds = 0.0
+        self.model_version = 0
         
         # Inicializar classificadores OpenCV
         self.initialize_opencv_classifiers()
@@ -47,50 +142,58 @@ class FaceDetectorRPi:
             self.logger.error(f"Erro ao inicializar classificadores OpenCV: {e}")
             return False
     
-    def initialize_camera(self, camera_index: int = 0) -> bool:
+    def initialize_camera(self, source: Union[int, str, VideoSource] = 0, **source_options) -> bool:
         """
-        Inicializa a câmera
+        Inicializa a fonte de vídeo
         
         Args:
-            camera_index: Índice da câmera (padrão 0)
+            source: Índice da câmera, arquivo de vídeo, pasta de imagens,
+                gravação (FrameRecorder) ou VideoSource (padrão: câmera 0)
+            source_options: mode/speed/loop para fontes gravadas
             
         Returns:
-            bool: True se a câmera foi inicializada com sucesso
+            bool: True se a fonte foi inicializada com sucesso
         """
         try:
-            if self.video_capture is not None:
-                self.video_capture.release()
-                
-            self.video_capture = cv2.VideoCapture(camera_index)
+            self._stop_frame_reader()
+            if self.video_source is not None:
+                self.video_source.release()
             
-            if not self.video_capture.isOpened():
-                self.logger.error(f"Não foi possível abrir a câmera {camera_index}")
-                return False
-                
             # Configurar resolução menor para melhor performance no RPi
-            self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, 320)
-            self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 240)
+            self.video_source = create_source(source, width=320, height=240, **source_options)
+            self.source_name = self.video_source.name
+            self.tracker.reset()
+            self.motion_gate.reset()
+            self.last_result = ([], [])
+            
+            if not self.video_source.isOpened() and not self.video_source.open():
+                self.logger.error(f"Não foi possível abrir a fonte de vídeo {self.source_name}")
+                return False
             
-            self.logger.info(f"Câmera {camera_index} inicializada com sucesso")
+            self.logger.info(f"Fonte de vídeo {self.source_name} inicializada com sucesso")
             return True
             
         except Exception as e:
             self.logger.error(f"Erro ao inicializar câmera: {e}")
             return False
     
-    def load_known_faces(self, faces_dir: str = "data/faces") -> int:
+    def load_known_faces(self, faces_dir: str = "data/faces",
+                         progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
         """
         Carrega rostos conhecidos do diretório
         
         Args:
             faces_dir: Diretório contendo as imagens dos rostos
+            progress_callback: Chamado com (processadas, total) se for preciso treinar
             
         Returns:
             int: Número de rostos carregados
         """
+        started = time.perf_counter()
         try:
             self.known_faces.clear()
             self.known_names.clear()
+            self.label_names = []
             
             if not os.path.exists(faces_dir):
                 os.makedirs(faces_dir)
@@ -106,89 +209,67 @@ class FaceDetectorRPi:
                 self.face_recognizer.read(model_path)
                 
                 with open(labels_path, 'rb') as f:
-                    self.known_names = pickle.load(f)
+                    self.label_names = pickle.load(f)
+                self._update_known_names()
                 
+                self.model_load_seconds = time.perf_counter() - started
                 self.logger.info(f"Modelo treinado carregado: {len(self.known_names)} rostos")
                 return len(self.known_names)
             else:
                 # Treinar novo modelo
-                return self.train_model(faces_dir)
+                trained = self.train_model(faces_dir, progress_callback)
+                self.model_load_seconds = time.perf_counter() - started
+                return trained
                 
         except Exception as e:
             self.logger.error(f"Erro ao carregar rostos conhecidos: {e}")
             return 0
     
-    def train_model(self, faces_dir: str) -> int:
+    def train_model(self, faces_dir: str,
+                    progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
         """
         Treina o modelo de reconhecimento com as imagens disponíveis
         
         Args:
             faces_dir: Diretório com as imagens
+            progress_callback: Chamado com (processadas, total) durante a extração
             
         Returns:
-            int: Número de faces treinadas
+            int: Número de identidades treinadas
         """
         try:
             faces = []
             labels = []
             names = []
-            label_id = 0
-            
-            for filename in os.listdir(faces_dir):
-                if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                    try:
-                        name = os.path.splitext(filename)[0]
-                        image_path = os.path.join(faces_dir, filename)
-                        
-                        # Carregar e processar imagem
-                        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-                        
-                        if image is None:
-                            continue
-                            
-                        # Detectar rosto na imagem
-                        detected_faces = self.face_cascade.detectMultiScale(
-                            image, 
-                            scaleFactor=1.1, 
-                            minNeighbors=5,
-                            minSize=(30, 30)
-                        )
-                        
-                        if len(detected_faces) > 0:
-                            # Usar o primeiro rosto detectado
-                            (x, y, w, h) = detected_faces[0]
-                            face_roi = image[y:y+h, x:x+w]
-                            
-                            # Redimensionar para tamanho padrão
-                            face_roi = cv2.resize(face_roi, (100, 100))
-                            
-                            faces.append(face_roi)
-                            labels.append(label_id)
-                            names.append(name)
-                            
-                            self.logger.debug(f"Rosto processado: {name}")
-                        
-                        label_id += 1
-                        
-                    except Exception as e:
-                        self.logger.error(f"Erro ao processar {filename}: {e}")
+            
+            gallery_images = iter_gallery_images(faces_dir)
+            results = self._extract_face_rois(
+                [image_path for _, image_path in gallery_images], progress_callback
+            )
+            
+            # Um rótulo por identidade; todos os modelos dela compartilham o rótulo
+            for (name, _), (image_path, face_roi, error) in zip(gallery_images, results):
+                if error is not None:
+                    self.logger.error(f"Erro ao processar {image_path}: {error}")
+                    continue
+                
+                if face_roi is not None:
+                    if name not in names:
+                        names.append(name)
+                    labels.append(names.index(name))
+                    faces.append(face_roi)
+                    
+                    self.logger.debug(f"Rosto processado: {name}")
             
             if len(faces) > 0:
                 # Treinar o reconhecedor
                 self.face_recognizer.train(faces, np.array(labels))
                 
-                # Salvar modelo treinado
-                model_path = os.path.join(faces_dir, "trained_model.yml")
-                labels_path = os.path.join(faces_dir, "labels.pkl")
-                
-                self.face_recognizer.save(model_path)
-                
-                with open(labels_path, 'wb') as f:
-                    pickle.dump(names, f)
-                
-                self.known_names = names
-                self.logger.info(f"Modelo treinado com {len(faces)} rostos")
-                return len(faces)
+                self.label_names = names
+                self._save_model(faces_dir)
+                self._update_known_names()
+                self.logger.info(f"Modelo treinado com {len(names)} rostos ({len(faces)} imagens)")
+                return len(names)
             else:
                 self.logger.warning("Nenhum rosto válido encontrado para treinamento")
                 return 0
@@ -197,70 +278,464 @@ class FaceDetectorRPi:
             self.logger.error(f"Erro ao treinar modelo: {e}")
             return 0
     
-    def get_frame(self) -> Optional[np.ndarray]:
+    def _extract_face_roi(self, image_path: str) -> Optional[np.ndarray]:
         """
-        Captura um frame da câmera
+        Extrai a região do rosto normalizada (100x100, escala de cinza) de uma imagem
         
+        Args:
+            image_path: Caminho da imagem
+            
         Returns:
-            np.ndarray ou None: Frame capturado ou None se houver erro
+            np.ndarray ou None: Região do rosto ou None se nenhum rosto for detectado
         """
-        if self.video_capture is None or not self.video_capture.isOpened():
-            return None
+        return extract_face_roi(image_path, self.face_cascade)
+    
+    def _extract_face_rois(self, image_paths: List[str],
+                           progress_callback: Optional[Callable[[int, int], None]] = None) -> List:
+        """Extrai as regiões de rosto de várias imagens em paralelo, na ordem recebida"""
+        workers = resolve_workers(self.encoding_workers, limit=2)
+        return parallel_map(
+            _extract_roi_worker, image_paths, workers,
+            progress_callback=progress_callback, initializer=_init_roi_worker
+        )
+    
+    def _update_known_names(self):
+        """Reconstrói a lista de nomes ativos a partir dos rótulos"""
+        self.known_names = list(dict.fromkeys(n for n in self.label_names if n is not None))
+        
+        # Modelo ou rótulos mudaram: resultados em cache deixam de valer
+        self.model_version += 1
+    
+    def _save_model(self, faces_dir: str, save_model: bool = True):
+        """Persiste o modelo LBPH e o mapeamento de rótulos"""
+        if save_model:
+            self.face_recognizer.save(os.path.join(faces_dir, "trained_model.yml"))
+        
+        with open(os.path.join(faces_dir, "labels.pkl"), 'wb') as f:
+            pickle.dump(self.label_names, f)
+    
+    def add_face(self, name: str, image_path: str, faces_dir: str = "data/faces",
+                 append: bool = False) -> bool:
+        """
+        Adiciona um rosto ao modelo LBPH sem retreinar os demais
+        
+        Args:
+            name: Nome da pessoa
+            image_path: Caminho da imagem já salva em faces_dir
+            faces_dir: Diretório das imagens
+            append: True para somar a imagem aos modelos existentes da identidade
+            
+        Returns:
+            bool: True se o rosto foi adicionado
+        """
+        try:
+            face_roi = self._extract_face_roi(image_path)
+            if face_roi is None:
+                self.logger.warning(f"Nenhum rosto encontrado em {image_path}")
+                return False
+            
+            if append and name in self.label_names:
+                # Novo modelo com o rótulo já existente da identidade
+                label = self.label_names.index(name)
+            else:
+                # Uma substituição desativa os rótulos antigos do mesmo nome
+                self.label_names = [None if n == name else n for n in self.label_names]
+                label = len(self.label_names)
+                self.label_names.append(name)
+            
+            self.face_recognizer.update([face_roi], np.array([label]))
+            
+            self._save_model(faces_dir)
+            self._update_known_names()
+            self.logger.info(f"Rosto de '{name}' adicionado ao modelo")
+            return True
             
-        ret, frame = self.video_capture.read()
-        return frame if ret else None
+        except Exception as e:
+            self.logger.error(f"Erro ao adicionar rosto de '{name}': {e}")
+            return False
     
-    def detect_faces(self, frame: np.ndarray) -> Tuple[List, List]:
+    def add_faces(self, faces: List[Tuple[str, str]], faces_dir: str = "data/faces",
+                  progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
         """
-        Detecta e reconhece rostos em um frame
+        Cadastra várias imagens de uma vez (extração em paralelo, uma atualização do LBPH)
         
         Args:
-            frame: Frame da imagem
+            faces: Lista de tuplas (nome, caminho_da_imagem)
+            faces_dir: Diretório das imagens
+            progress_callback: Chamado com (processadas, total)
             
         Returns:
-            Tuple: (localizações dos rostos, nomes identificados)
+            int: Número de imagens adicionadas
         """
         try:
-            # Converter para escala de cinza
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            results = self._extract_face_rois([path for _, path in faces], progress_callback)
             
-            # Detectar rostos
+            rois = []
+            labels = []
+            for (name, _), (image_path, face_roi, error) in zip(faces, results):
+                if error is not None or face_roi is None:
+                    self.logger.warning(f"Nenhum rosto encontrado em {image_path}")
+                    continue
+                if name not in self.label_names:
+                    self.label_names.append(name)
+                rois.append(face_roi)
+                labels.append(self.label_names.index(name))
+            
+            if rois:
+                self.face_recognizer.update(rois, np.array(labels))
+                self._save_model(faces_dir)
+                self._update_known_names()
+            
+            self.logger.info(f"{len(rois)} imagens adicionadas ao modelo")
+            return len(rois)
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao adicionar rostos: {e}")
+            return 0
+    
+    def remove_face(self, name: str, faces_dir: str = "data/faces") -> bool:
+        """
+        Desativa os rótulos de um nome (o LBPH não permite remover amostras;
+        o histograma é descartado no próximo retreino)
+        
+        Args:
+            name: Nome da pessoa
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            bool: True se o nome estava no modelo
+        """
+        if name not in self.label_names:
+            return False
+        
+        self.label_names = [None if n == name else n for n in self.label_names]
+        self._save_model(faces_dir, save_model=False)
+        self._update_known_names()
+        return True
+    
+    def rename_face(self, old_name: str, new_name: str, faces_dir: str = "data/faces") -> bool:
+        """
+        Renomeia uma identidade no disco e no mapeamento de rótulos
+        
+        Args:
+            old_name: Nome atual
+            new_name: Novo nome (um perfil existente com esse nome é substituído)
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            bool: True se renomeado com sucesso
+        """
+        try:
+            if not identity_image_paths(faces_dir, old_name):
+                self.logger.warning(f"Arquivo de '{old_name}' não encontrado")
+                return False
+            
+            remove_identity_files(faces_dir, new_name)
+            rename_identity_files(faces_dir, old_name, new_name)
+            
+            self.label_names = [
+                new_name if n == old_name else (None if n == new_name else n)
+                for n in self.label_names
+            ]
+            self._save_model(faces_dir, save_model=False)
+            self._update_known_names()
+            
+            self.logger.info(f"Rosto renomeado de '{old_name}' para '{new_name}'")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao renomear rosto de '{old_name}': {e}")
+            return False
+    
+    def get_template_paths(self, name: str, faces_dir: str = "data/faces") -> List[str]:
+        """
+        Retorna as imagens (modelos) de uma identidade
+        
+        Args:
+            name: Nome da pessoa
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            List: Caminhos das imagens
+        """
+        return identity_image_paths(faces_dir, name)
+    
+    def prune_templates(self, name: str, max_templates: Optional[int] = None,
+                        faces_dir: str = "data/faces", retrain: bool = True) -> int:
+        """
+        Limita uma identidade a k imagens representativas (medoides sobre as
+        regiões de rosto normalizadas) e retreina o modelo
+        
+        Args:
+            name: Nome da pessoa
+            max_templates: Número máximo de imagens (padrão: self.max_templates)
+            faces_dir: Diretório das imagens
+            retrain: Retreinar o modelo após a poda
+            
+        Returns:
+            int: Número de imagens removidas
+        """
+        k = max_templates or self.max_templates
+        try:
+            paths = identity_image_paths(faces_dir, name)
+            if len(paths) <= k:
+                return 0
+            
+            rois = []
+            valid_paths = []
+            for path in paths:
+                face_roi = self._extract_face_roi(path)
+                if face_roi is not None:
+                    rois.append(face_roi.reshape(-1).astype(np.float32) / 255.0)
+                    valid_paths.append(path)
+            
+            # Só as imagens avaliadas concorrem: onde o Haar não acha rosto, nada é apagado
+            if len(valid_paths) <= k:
+                return 0
+            
+            keep = {valid_paths[i] for i in select_medoids(np.stack(rois), k)}
+            removed = len(remove_template_files(faces_dir, name, [p for p in valid_paths if p not in keep]))
+            
+            self.logger.info(f"'{name}': {removed} imagens podadas, {len(paths) - removed} mantidas")
+            if removed and retrain:
+                self.train_model(faces_dir)
+            return removed
+            
+        except Exception as e:
+            self.logger.error(f"Erro ao podar modelos de '{name}': {e}")
+            return 0
+    
+    def prune_all_templates(self, max_templates: Optional[int] = None,
+                            faces_dir: str = "data/faces") -> int:
+        """
+        Executa a poda de imagens em todas as identidades (um único retreino)
+        
+        Args:
+            max_templates: Número máximo de imagens por identidade
+            faces_dir: Diretório das imagens
+            
+        Returns:
+            int: Total de imagens removidas
+        """
+        removed = sum(
+            self.prune_templates(name, max_templates, faces_dir, retrain=False)
+            for name in list(self.known_names)
+        )
+        if removed:
+            self.train_model(faces_dir)
+        return removed
+    
+    def _ensure_frame_reader(self) -> Optional[FrameReader]:
+        """Inicia a thread de captura na primeira leitura"""
+        if self.video_source is None or not self.video_source.isOpened():
+            return None
+        if self.frame_reader is None or not self.frame_reader.is_running:
+            self.frame_reader = FrameReader(self.video_source, timings=self.timings).start()
+        return self.frame_reader
+    
+    def _stop_frame_reader(self):
+        if self.frame_reader is not None:
+            self.frame_reader.stop()
+            self.frame_reader = None
+    
+    def subscribe_frames(self, name: str) -> Optional[FrameSubscription]:
+        """
+        Inscreve um consumidor na thread de captura
+        
+        Args:
+            name: Identificação do consumidor
+            
+        Returns:
+            FrameSubscription ou None se a câmera não estiver aberta
+        """
+        reader = self._ensure_frame_reader()
+        return reader.subscribe(name) if reader is not None else None
+    
+    def get_frame(self) -> Optional[np.ndarray]:
+        """
+        Retorna uma cópia do frame mais recente da câmera
+        
+        Returns:
+            np.ndarray ou None: Frame capturado ou None se houver erro
+        """
+        reader = self._ensure_frame_reader()
+        if reader is None:
+            return None
+        
+        frame = reader.latest(timeout=1.0)
+        return frame.image.copy() if frame is not None else None
+    
+    def locate_faces(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """
+        Localiza rostos com o classificador Haar
+        
+        Args:
+            gray: Frame em escala de cinza
+            
+        Returns:
+            List: Caixas (top, right, bottom, left)
+        """
+        with self.timings.measure("locate"):
             faces = self.face_cascade.detectMultiScale(
                 gray,
                 scaleFactor=1.1,
                 minNeighbors=5,
                 minSize=(30, 30)
             )
+        
+        self.counters["faces_detected"] += len(faces)
+        
+        # Converter coordenadas para formato compatível
+        return [(y, x + w, y + h, x) for (x, y, w, h) in faces]
+    
+    def identify_faces(self, gray: np.ndarray, face_locations: List) -> List[str]:
+        """
+        Reconhece os rostos já localizados com o modelo LBPH
+        
+        Args:
+            gray: Frame em escala de cinza
+            face_locations: Caixas retornadas por locate_faces
             
-            face_locations = []
-            face_names = []
+        Returns:
+            List[str]: Nome de cada rosto
+        """
+        face_names = []
+        
+        for (top, right, bottom, left) in face_locations:
+            name = "Desconhecido"
             
-            for (x, y, w, h) in faces:
-                # Converter coordenadas para formato compatível
-                face_locations.append((y, x + w, y + h, x))
+            # Reconhecer rosto se modelo estiver treinado
+            if self.face_recognizer is not None and len(self.known_names) > 0:
+                face_roi = gray[top:bottom, left:right]
+                face_roi = cv2.resize(face_roi, (100, 100))
                 
-                # Reconhecer rosto se modelo estiver treinado
-                if self.face_recognizer is not None and len(self.known_names) > 0:
-                    face_roi = gray[y:y+h, x:x+w]
-                    face_roi = cv2.resize(face_roi, (100, 100))
-                    
-                    # Predizer
+                key = self.recognition_cache.key(face_roi, (top, right, bottom, left))
+                generation = (self.model_version, self.lbph_threshold)
+                cached = self.recognition_cache.get(key, generation)
+                if cached is not None:
+                    face_names.append(cached)
+                    continue
+                
+                # Predizer
+                with self.timings.measure("predict"):
                     label, confidence = self.face_recognizer.predict(face_roi)
-                    
-                    # Verificar confiança (menor é melhor no LBPH)
-                    if confidence < 100:  # Threshold ajustável
-                        if label < len(self.known_names):
-                            name = self.known_names[label]
-                        else:
-                            name = "Desconhecido"
-                    else:
-                        name = "Desconhecido"
-                else:
-                    name = "Desconhecido"
                 
-                face_names.append(name)
+                # Verificar confiança (menor é melhor no LBPH)
+                if confidence < self.lbph_threshold:
+                    if 0 <= label < len(self.label_names) and self.label_names[label] is not None:
+                        name = self.label_names[label]
+                
+                self.recognition_cache.put(key, name, generation)
+            
+            face_names.append(name)
+        
+        known = sum(1 for name in face_names if name != "Desconhecido")
+        self.counters["identified_known"] += known
+        self.counters["identified_unknown"] += len(face_names) - known
+        return face_names
+    
+    def track_faces(self, frame: np.ndarray) -> Optional[TrackingStep]:
+        """
+        Etapa de localização: filtro de movimento, detecção completa ou propagação
+        
+        Não reconhece ninguém: os rastros que precisam de reconhecimento são
+        marcados como em andamento e devolvidos para recognize_tracks.
+        
+        Args:
+            frame: Frame BGR
             
-            return face_locations, face_names
+        Returns:
+            TrackingStep ou None se o frame foi descartado pelo filtro de movimento
+        """
+        self.full_detection = False
+        self.counters["frames_processed"] += 1
+        
+        # Converter para escala de cinza
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # Sem movimento relevante: nada mudou desde o último resultado
+        if self.motion_gating:
+            with self.timings.measure("motion_gate"):
+                moving = self.motion_gate.update(gray)
+            if not moving:
+                return None
+        
+        pending = []
+        if not self.tracking or self.tracker.needs_detection():
+            face_locations = self.locate_faces(gray)
+            self.full_detection = True
+            tracks = self.tracker.update_detections(gray, face_locations)
+            
+            # Reconhecer só rastros novos, desconhecidos ou com reverificação vencida
+            pending = self.tracker.pending_recognition()
+            for track in pending:
+                track.in_flight = True
+        else:
+            with self.timings.measure("propagate"):
+                tracks = self.tracker.propagate(gray)
+        
+        return TrackingStep(list(tracks), pending, [track.box for track in pending], gray)
+    
+    def recognize_tracks(self, step: TrackingStep) -> List[str]:
+        """
+        Etapa de reconhecimento: prediz os rastros pendentes e registra os votos
+        
+        Args:
+            step: Resultado de track_faces
+            
+        Returns:
+            List[str]: Nome de cada rastro pendente
+        """
+        try:
+            names = self.identify_faces(step.image, step.boxes)
+            for track, name in zip(step.pending, names):
+                track.add_vote(name)
+            return names
+        finally:
+            for track in step.pending:
+                track.in_flight = False
+    
+    def tracks_result(self, tracks: List[Track]) -> Tuple[List, List]:
+        """Converte rastros em (localizações, nomes)"""
+        return [track.box for track in tracks], [track.name for track in tracks]
+    
+    def detect_faces(self, frame: np.ndarray) -> Tuple[List, List]:
+        """
+        Detecta e reconhece rostos em um frame
+        
+        Com o rastreamento ativo, a detecção completa roda apenas quando o
+        rastreador pede; nos demais frames as caixas são propagadas.
+        
+        Args:
+            frame: Frame da imagem
+            
+        Returns:
+            Tuple: (localizações dos rostos, nomes identificados)
+        """
+        try:
+            if self.tracking:
+                step = self.track_faces(frame)
+                if step is None:
+                    return self.last_result
+                
+                self.recognize_tracks(step)
+                self.last_result = self.tracks_result(step.tracks)
+                return self.last_result
+            
+            self.full_detection = False
+            self.counters["frames_processed"] += 1
+            
+            # Converter para escala de cinza
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            
+            # Sem movimento relevante: nada mudou desde o último resultado
+            if self.motion_gating and not self.motion_gate.update(gray):
+                return self.last_result
+            
+            face_locations = self.locate_faces(gray)
+            self.full_detection = True
+            self.last_result = (face_locations, self.identify_faces(gray, face_locations))
+            return self.last_result
             
         except Exception as e:
             self.logger.error(f"Erro na detecção de rostos: {e}")
@@ -279,19 +754,20 @@ class FaceDetectorRPi:
             np.ndarray: Frame com retângulos desenhados
         """
         try:
-            for (top, right, bottom, left), name in zip(face_locations, face_names):
-                # Cor verde para conhecidos, vermelha para desconhecidos
-                color = (0, 255, 0) if name != "Desconhecido" else (0, 0, 255)
+            with self.timings.measure("draw"):
+                for (top, right, bottom, left), name in zip(face_locations, face_names):
+                    # Cor verde para conhecidos, vermelha para desconhecidos
+                    color = (0, 255, 0) if name != "Desconhecido" else (0, 0, 255)
                 
-                # Desenhar retângulo
-                cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
+                    # Desenhar retângulo
+                    cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
                 
-                # Desenhar fundo para o texto
-                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
+                    # Desenhar fundo para o texto
+                    cv2.rectangle(frame, (left, bottom - 35), (right, bottom), color, cv2.FILLED)
                 
-                # Desenhar texto
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.4, (255, 255, 255), 1)
+                    # Desenhar texto
+                    font = cv2.FONT_HERSHEY_DUPLEX
+                    cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.4, (255, 255, 255), 1)
             
             return frame
             
@@ -299,13 +775,15 @@ class FaceDetectorRPi:
             self.logger.error(f"Erro ao desenhar retângulos: {e}")
             return frame
     
-    def capture_face(self, name: str, faces_dir: str = "data/faces") -> bool:
+    def capture_face(self, name: str, faces_dir: str = "data/faces", append: bool = False) -> bool:
         """
         Captura e salva um rosto
         
         Args:
             name: Nome da pessoa
             faces_dir: Diretório para salvar a imagem
+            append: True para adicionar uma nova imagem à identidade,
+                False para substituir as imagens existentes
             
         Returns:
             bool: True se o rosto foi capturado com sucesso
@@ -348,15 +826,26 @@ class FaceDetectorRPi:
             if not os.path.exists(faces_dir):
                 os.makedirs(faces_dir)
             
-            # Salvar imagem
-            filename = os.path.join(faces_dir, f"{name}.jpg")
+            # Salvar como nova imagem: numa substituição as antigas só saem
+            # depois que a nova entrar no modelo (um recorte ruim não apaga o cadastro)
+            old_paths = [] if append else identity_image_paths(faces_dir, name)
+            filename = new_template_path(faces_dir, name)
             success = cv2.imwrite(filename, face_image)
             
             if success:
                 self.logger.info(f"Rosto de '{name}' salvo em {filename}")
-                # Retreinar modelo
-                self.train_model(faces_dir)
-                return True
+                if not append:
+                    if not self.add_face(name, filename, faces_dir, append):
+                        remove_template_files(faces_dir, name, [filename])
+                        return False
+                    remove_template_files(faces_dir, name, old_paths)
+                    return True
+                if len(identity_image_paths(faces_dir, name)) > self.max_templates:
+                    # A poda retreina o modelo com as imagens mantidas
+                    self.prune_templates(name, self.max_templates, faces_dir)
+                    return name in self.known_names
+                # Adicionar ao modelo sem retreinar os demais
+                return self.add_face(name, filename, faces_dir, append)
             else:
                 self.logger.error(f"Erro ao salvar imagem de '{name}'")
                 return False
@@ -370,21 +859,21 @@ class FaceDetectorRPi:
         Retorna informações dos rostos conhecidos
         
         Returns:
-            List: Lista de tuplas (nome, caminho_da_imagem)
+            List: Lista de tuplas (nome, caminho_da_imagem principal)
         """
         faces_info = []
         faces_dir = "data/faces"
         
         for name in self.known_names:
-            image_path = os.path.join(faces_dir, f"{name}.jpg")
-            if os.path.exists(image_path):
+            image_path = primary_image_path(faces_dir, name)
+            if image_path is not None:
                 faces_info.append((name, image_path))
         
         return faces_info
     
     def delete_face(self, name: str, faces_dir: str = "data/faces") -> bool:
         """
-        Remove um rosto conhecido
+        Remove um rosto conhecido (todas as imagens da identidade)
         
         Args:
             name: Nome da pessoa a ser removida
@@ -394,23 +883,13 @@ class FaceDetectorRPi:
             bool: True se removido com sucesso
         """
         try:
-            image_path = os.path.join(faces_dir, f"{name}.jpg")
+            removed = remove_identity_files(faces_dir, name)
             
-            if os.path.exists(image_path):
-                os.remove(image_path)
-                self.logger.info(f"Rosto de '{name}' removido")
+            if removed:
+                self.logger.info(f"Rosto de '{name}' removido ({len(removed)} imagens)")
                 
-                # Remover modelo antigo e retreinar
-                model_path = os.path.join(faces_dir, "trained_model.yml")
-                labels_path = os.path.join(faces_dir, "labels.pkl")
-                
-                if os.path.exists(model_path):
-                    os.remove(model_path)
-                if os.path.exists(labels_path):
-                    os.remove(labels_path)
-                
-                # Retreinar modelo
-                self.train_model(faces_dir)
+                # Desativar o rótulo sem retreinar ("Retreinar Modelo" compacta o modelo)
+                self.remove_face(name, faces_dir)
                 return True
             else:
                 self.logger.warning(f"Arquivo de '{name}' não encontrado")
@@ -423,9 +902,10 @@ class FaceDetectorRPi:
     def cleanup(self):
         """Libera recursos da câmera"""
         try:
-            if self.video_capture is not None:
-                self.video_capture.release()
-                self.video_capture = None
+            self._stop_frame_reader()
+            if self.video_source is not None:
+                self.video_source.release()
+                self.video_source = None
                 self.logger.info("Câmera liberada")
         except Exception as e:
             self.logger.error(f"Erro ao liberar câmera: {e}") 
\ No newline at end of file
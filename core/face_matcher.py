@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Comparador vetorizado de codificações faciais contra a galeria
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from core.ann_index import IVFIndex
+
+UNKNOWN_NAME = "Desconhecido"
+
+MATCH_MODES = ("best", "centroid")
+
+
+class MatchResult(NamedTuple):
+    """Resultado da comparação de um rosto com a galeria"""
+    name: str
+    index: int
+    distance: float
+    margin: float
+
+
+def select_medoids(vectors: np.ndarray, k: int) -> List[int]:
+    """
+    Escolhe k modelos representativos por seleção gulosa de medoides
+    (fase BUILD do PAM) sobre a matriz de distâncias par a par
+
+    Args:
+        vectors: Matriz (M x D) dos modelos de uma identidade
+        k: Número de modelos a manter
+
+    Returns:
+        List[int]: Índices dos modelos escolhidos
+    """
+    count = len(vectors)
+    if count <= k:
+        return list(range(count))
+
+    data = np.asarray(vectors, dtype=np.float64).reshape(count, -1)
+    sq = (data * data).sum(axis=1)
+    dist = np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2.0 * (data @ data.T), 0.0))
+
+    # Primeiro medoide: menor soma de distâncias a todos os outros
+    selected = [int(np.argmin(dist.sum(axis=1)))]
+    nearest = dist[selected[0]].copy()
+
+    while len(selected) < k:
+        # Ganho de cada candidato: redução total da distância ao medoide mais próximo
+        gains = np.maximum(nearest[None, :] - dist, 0.0).sum(axis=1)
+        gains[selected] = -1.0
+        choice = int(np.argmax(gains))
+        selected.append(choice)
+        nearest = np.minimum(nearest, dist[choice])
+
+    return sorted(selected)
+
+
+class FaceMatcher:
+    """
+    Mantém a galeria como uma matriz float32 contígua (N x 128) e compara
+    todos os rostos de um frame com todos os rostos conhecidos em uma única
+    multiplicação de matrizes:
+
+        ||a - b||² = ||a||² + ||b||² - 2 a·b
+
+    Cada linha é um modelo (template) identificado por uma chave única e
+    rotulado com o nome da identidade; uma identidade pode ter vários modelos.
+    """
+
+    def __init__(self, dim: int = 128, initial_capacity: int = 64):
+        self.dim = dim
+        self.lock = threading.RLock()
+        self._matrix = np.zeros((initial_capacity, dim), dtype=np.float32)
+        self._sq_norms = np.zeros(initial_capacity, dtype=np.float32)
+        self._label_ids = np.zeros(initial_capacity, dtype=np.int32)
+        self._size = 0
+
+        # Chave e identidade de cada linha
+        self.keys: List[str] = []
+        self.labels: List[str] = []
+        self.key_index: Dict[str, int] = {}
+        # Identidade -> chaves dos seus modelos (ordem de inclusão)
+        self.identities: Dict[str, Dict[str, None]] = {}
+        self._label_to_id: Dict[str, int] = {}
+        self._centroids = None
+
+        # Índice aproximado opcional (busca exata quando ausente ou galeria pequena)
+        self.index: Optional[IVFIndex] = None
+        
+        # Incrementada a cada alteração da galeria (invalida resultados em cache)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Visão (sem cópia) das linhas ocupadas da galeria"""
+        return self._matrix[:self._size]
+
+    @property
+    def names(self) -> List[str]:
+        """Nomes das identidades cadastradas"""
+        with self.lock:
+            return list(self.identities)
+
+    def template_count(self, name: str) -> int:
+        """Número de modelos de uma identidade"""
+        with self.lock:
+            return len(self.identities.get(name, ()))
+
+    def template_keys(self, name: str) -> List[str]:
+        """Chaves dos modelos de uma identidade"""
+        with self.lock:
+            return list(self.identities.get(name, ()))
+
+    def _reserve(self, size: int):
+        """Garante capacidade para `size` linhas (crescimento geométrico)"""
+        capacity = self._matrix.shape[0]
+        if size <= capacity:
+            return
+
+        new_capacity = max(size, capacity * 2)
+        matrix = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        sq_norms = np.zeros(new_capacity, dtype=np.float32)
+        sq_norms[:self._size] = self._sq_norms[:self._size]
+        label_ids = np.zeros(new_capacity, dtype=np.int32)
+        label_ids[:self._size] = self._label_ids[:self._size]
+        self._matrix = matrix
+        self._sq_norms = sq_norms
+        self._label_ids = label_ids
+
+    def _label_id(self, name: str) -> int:
+        label_id = self._label_to_id.get(name)
+        if label_id is None:
+            label_id = len(self._label_to_id)
+            self._label_to_id[name] = label_id
+        return label_id
+
+    def _write_row(self, index: int, encoding: np.ndarray):
+        row = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        self._matrix[index] = row
+        self._sq_norms[index] = np.dot(row, row)
+        self._centroids = None
+        self.version += 1
+        if self.index is not None:
+            self.index.set_row(index, row)
+
+    def _set_label(self, index: int, name: str):
+        self.labels[index] = name
+        self._label_ids[index] = self._label_id(name)
+        self.identities.setdefault(name, {})[self.keys[index]] = None
+
+    def set_gallery(self, encodings: List[np.ndarray], names: List[str], keys: Optional[List[str]] = None):
+        """
+        Substitui a galeria inteira
+
+        Args:
+            encodings: Lista de codificações
+            names: Identidade de cada codificação
+            keys: Chave única de cada modelo (padrão: o próprio nome)
+        """
+        keys = names if keys is None else keys
+        with self.lock:
+            self._size = 0
+            self.keys = []
+            self.labels = []
+            self.key_index = {}
+            self.identities = {}
+            self._label_to_id = {}
+            self._centroids = None
+            self.version += 1
+            self._reserve(len(names))
+            for encoding, name, key in zip(encodings, names, keys):
+                self._append(key, name, encoding)
+            if self.index is not None:
+                self.index.assign_all(self.matrix)
+
+    def _append(self, key: str, name: str, encoding: np.ndarray):
+        self._reserve(self._size + 1)
+        index = self._size
+        self.keys.append(key)
+        self.labels.append(name)
+        self.key_index[key] = index
+        self._size += 1
+        self._set_label(index, name)
+        self._write_row(index, encoding)
+
+    def add(self, name: str, encoding: np.ndarray, key: Optional[str] = None):
+        """
+        Adiciona um modelo ou substitui a codificação de uma chave existente
+
+        Args:
+            name: Nome da identidade
+            encoding: Codificação de 128 dimensões
+            key: Chave única do modelo (padrão: o próprio nome)
+        """
+        key = name if key is None else key
+        with self.lock:
+            index = self.key_index.get(key)
+            if index is None:
+                self._append(key, name, encoding)
+                return
+
+            old_name = self.labels[index]
+            if old_name != name:
+                self._discard_key(old_name, key)
+                self._set_label(index, name)
+            self._write_row(index, encoding)
+
+    def _discard_key(self, name: str, key: str):
+        keys = self.identities.get(name)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self.identities[name]
+
+    def remove_template(self, key: str) -> bool:
+        """
+        Remove um modelo trocando sua linha com a última (O(1))
+
+        Args:
+            key: Chave do modelo
+
+        Returns:
+            bool: True se a chave estava na galeria
+        """
+        with self.lock:
+            index = self.key_index.pop(key, None)
+            if index is None:
+                return False
+
+            self._discard_key(self.labels[index], key)
+            last = self._size - 1
+            if self.index is not None:
+                self.index.remove_row(index, last)
+            if index != last:
+                self._matrix[index] = self._matrix[last]
+                self._sq_norms[index] = self._sq_norms[last]
+                self._label_ids[index] = self._label_ids[last]
+                self.keys[index] = self.keys[last]
+                self.labels[index] = self.labels[last]
+                self.key_index[self.keys[index]] = index
+            self.keys.pop()
+            self.labels.pop()
+            self._size -= 1
+            self._centroids = None
+            self.version += 1
+            return True
+
+    def remove(self, name: str) -> bool:
+        """
+        Remove uma identidade e todos os seus modelos
+
+        Args:
+            name: Nome da identidade
+
+        Returns:
+            bool: True se a identidade estava na galeria
+        """
+        with self.lock:
+            keys = list(self.identities.get(name, ()))
+            for key in keys:
+                self.remove_template(key)
+            return bool(keys)
+
+    def rename(self, old_name: str, new_name: str, key_map: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Renomeia uma identidade
+
+        Args:
+            old_name: Nome atual
+            new_name: Novo nome (deve estar livre)
+            key_map: Novas chaves dos modelos, se elas mudarem com o nome
+
+        Returns:
+            bool: True se a identidade estava na galeria
+        """
+        with self.lock:
+            keys = self.identities.pop(old_name, None)
+            if keys is None:
+                return False
+
+            for key in keys:
+                index = self.key_index[key]
+                new_key = key_map.get(key, key) if key_map else key
+                if new_key != key:
+                    del self.key_index[key]
+                    self.key_index[new_key] = index
+                    self.keys[index] = new_key
+                self._set_label(index, new_name)
+            self._centroids = None
+            self.version += 1
+            return True
+
+    def attach_index(self, index: Optional[IVFIndex]):
+        """
+        Associa (ou remove, com None) um índice aproximado à galeria
+
+        Args:
+            index: Índice IVF, treinado ou não
+        """
+        with self.lock:
+            self.index = index
+            if index is not None and index.is_trained:
+                index.assign_all(self.matrix)
+
+    def train_index(self, force: bool = False) -> bool:
+        """
+        Treina o índice se a galeria cresceu o bastante (ou se `force`).
+        O k-means roda sobre uma cópia, fora da trava, para não bloquear a busca.
+
+        Returns:
+            bool: True se o índice foi (re)treinado
+        """
+        index = self.index
+        if index is None:
+            return False
+
+        with self.lock:
+            if self._size == 0 or not (force or index.needs_training(self._size)):
+                return False
+            snapshot = self.matrix.copy()
+
+        centroids = index.fit_centroids(snapshot)
+
+        with self.lock:
+            if self.index is not index:
+                return False
+            index.set_centroids(centroids, len(snapshot), self.matrix)
+        return True
+
+    def distances(self, encodings: np.ndarray) -> np.ndarray:
+        """
+        Calcula a matriz de distâncias euclidianas (rostos x galeria)
+
+        Args:
+            encodings: Matriz (F x 128) das codificações do frame
+
+        Returns:
+            np.ndarray: Matriz (F x N) de distâncias
+        """
+        queries = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        with self.lock:
+            gallery = self._matrix[:self._size]
+            sq_norms = self._sq_norms[:self._size]
+            sq = (queries * queries).sum(axis=1)[:, None] + sq_norms[None, :]
+            sq -= 2.0 * (queries @ gallery.T)
+        np.maximum(sq, 0.0, out=sq)
+        return np.sqrt(sq, out=sq)
+
+    def _identity_centroids(self):
+        """Centróide de cada identidade (recalculado só após mutações)"""
+        if self._centroids is None:
+            label_ids = self._label_ids[:self._size]
+            order = np.argsort(label_ids, kind="stable")
+            ids, starts, counts = np.unique(label_ids[order], return_index=True, return_counts=True)
+            sums = np.add.reduceat(self._matrix[:self._size][order], starts, axis=0)
+            centroids = (sums / counts[:, None]).astype(np.float32)
+            id_to_name = {label_id: name for name, label_id in self._label_to_id.items()}
+            self._centroids = (centroids, [id_to_name[i] for i in ids])
+        return self._centroids
+
+    def match(self, encodings: List[np.ndarray], tolerance: float = 0.6, mode: str = "best") -> List[MatchResult]:
+        """
+        Identifica todos os rostos de um frame de uma vez
+
+        Args:
+            encodings: Codificações dos rostos detectados
+            tolerance: Distância máxima para considerar um rosto conhecido
+            mode: "best" (modelo mais próximo) ou "centroid" (centróide da identidade)
+
+        Returns:
+            List[MatchResult]: Melhor nome, linha da galeria (-1 no modo centróide),
+            distância e margem para a melhor identidade diferente
+        """
+        if len(encodings) == 0:
+            return []
+
+        with self.lock:
+            if self._size == 0:
+                return [MatchResult(UNKNOWN_NAME, -1, float("inf"), float("inf")) for _ in encodings]
+
+            if mode == "centroid":
+                return self._match_centroids(encodings, tolerance)
+
+            if self.index is not None and self.index.is_active(self._size):
+                return self._match_approximate(encodings, tolerance)
+
+            dist = self.distances(np.stack(encodings))
+            labels = list(self.labels)
+            label_ids = self._label_ids[:self._size].copy()
+
+        rows = np.arange(dist.shape[0])
+        best = np.argmin(dist, axis=1)
+        best_dist = dist[rows, best]
+
+        # Margem: distância da melhor identidade diferente da vencedora
+        other = np.where(label_ids[None, :] == label_ids[best][:, None], np.inf, dist)
+        margins = other.min(axis=1) - best_dist
+
+        results = []
+        for i in range(dist.shape[0]):
+            distance = float(best_dist[i])
+            name = labels[best[i]] if distance <= tolerance else UNKNOWN_NAME
+            results.append(MatchResult(name, int(best[i]), distance, float(margins[i])))
+        return results
+
+    def _match_centroids(self, encodings: List[np.ndarray], tolerance: float) -> List[MatchResult]:
+        """Identificação pelo centróide de cada identidade (chamado com a trava adquirida)"""
+        centroids, names = self._identity_centroids()
+        queries = np.stack(encodings).astype(np.float32)
+        sq = (queries * queries).sum(axis=1)[:, None] + (centroids * centroids).sum(axis=1)[None, :]
+        sq -= 2.0 * (queries @ centroids.T)
+        dist = np.sqrt(np.maximum(sq, 0.0))
+
+        results = []
+        for i in range(len(queries)):
+            order = np.argsort(dist[i])[:2]
+            distance = float(dist[i, order[0]])
+            margin = float(dist[i, order[1]] - distance) if len(order) > 1 else float("inf")
+            name = names[order[0]] if distance <= tolerance else UNKNOWN_NAME
+            results.append(MatchResult(name, -1, distance, margin))
+        return results
+
+    def _match_approximate(self, encodings: List[np.ndarray], tolerance: float) -> List[MatchResult]:
+        """Identificação via índice IVF (chamado com a trava adquirida)"""
+        queries = np.stack(encodings).astype(np.float32)
+        best, best_dist, second_dist = self.index.search(
+            queries, self.matrix, self._sq_norms[:self._size], self._label_ids[:self._size]
+        )
+
+        results = []
+        for i in range(len(best)):
+            distance = float(best_dist[i])
+            if best[i] >= 0 and distance <= tolerance:
+                name = self.labels[best[i]]
+            else:
+                name = UNKNOWN_NAME
+            results.append(MatchResult(name, int(best[i]), distance, float(second_dist[i] - best_dist[i])))
+        return results
+
+    def get_encoding(self, key: str) -> Optional[np.ndarray]:
+        """Retorna uma cópia da codificação de um modelo, se existir"""
+        with self.lock:
+            index = self.key_index.get(key)
+            return None if index is None else self._matrix[index].copy()
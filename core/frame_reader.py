@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura da câmera em thread dedicada com distribuição para vários consumidores
+
+A thread de captura lê continuamente o dispositivo e guarda apenas os frames
+mais recentes (buffer circular pequeno), cada um com número de sequência e
+instante de captura. Assim o buffer do driver nunca enche quando o
+processamento atrasa, e vários consumidores (loop de vídeo, captura de
+cadastro, teste de câmera) compartilham o mesmo dispositivo sem disputá-lo.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.timing import Timings
+
+
+class Frame(NamedTuple):
+    """Frame capturado"""
+    image: np.ndarray
+    seq: int
+    timestamp: float
+
+
+class FrameSubscription:
+    """
+    Consumidor de frames: cada chamada a get() entrega um frame mais novo que
+    o anterior e contabiliza os frames que o consumidor não chegou a ver
+    """
+
+    def __init__(self, reader: "FrameReader", name: str):
+        self.reader = reader
+        self.name = name
+        self.last_seq = 0
+        self.received = 0
+        self.dropped = 0
+        self.closed = False
+
+    @property
+    def active(self) -> bool:
+        return not self.closed and self.reader.is_running
+
+    def get(self, timeout: Optional[float] = None, copy: bool = True) -> Optional[Frame]:
+        """
+        Aguarda um frame mais novo que o último recebido
+
+        Args:
+            timeout: Segundos de espera (None = indefinidamente)
+            copy: Copiar a imagem (o consumidor pode desenhar sobre ela)
+
+        Returns:
+            Frame ou None se o tempo esgotar ou a leitura parar
+        """
+        if self.closed:
+            return None
+
+        frame = self.reader.wait_newer(self.last_seq, timeout)
+        if frame is None:
+            return None
+
+        if self.last_seq:
+            self.dropped += frame.seq - self.last_seq - 1
+        self.last_seq = frame.seq
+        self.received += 1
+        self.reader.mark_consumed(frame.seq)
+
+        if copy:
+            frame = frame._replace(image=frame.image.copy())
+        return frame
+
+    def close(self):
+        """Cancela a inscrição"""
+        if not self.closed:
+            self.closed = True
+            self.reader.unsubscribe(self)
+
+
+class FrameReader:
+    """
+    Thread de captura que mantém apenas os frames mais recentes
+
+    Parâmetros:
+        capture: VideoSource ou cv2.VideoCapture já aberto (objeto com read())
+        buffer_size: frames mantidos no buffer circular
+        timings: registra a duração de cada leitura como "capture.read"
+    """
+
+    def __init__(self, capture, buffer_size: int = 1, timings: Optional[Timings] = None):
+        self.logger = get_logger(__name__)
+        self.capture = capture
+        self.buffer_size = max(1, buffer_size)
+
+        self._read_latency = timings.histogram("capture.read") if timings is not None else None
+
+        self._frames: deque = deque(maxlen=self.buffer_size)
+        self._condition = threading.Condition()
+        self._subscriptions: List[FrameSubscription] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        self.seq = 0
+        self.frames_read = 0
+        self.read_errors = 0
+        # Frames descartados do buffer sem que nenhum consumidor os tenha recebido
+        self.dropped = 0
+        self.fps = 0.0
+        self._consumed_seq = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> "FrameReader":
+        """Inicia a thread de captura"""
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Para a thread de captura (não libera o dispositivo)"""
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _run(self):
+        consecutive_errors = 0
+        last_time = None
+
+        while self._running:
+            try:
+                started = time.perf_counter()
+                ret, image = self.capture.read()
+                if ret and self._read_latency is not None:
+                    self._read_latency.record(time.perf_counter() - started)
+            except Exception as e:
+                self.logger.error(f"Erro na leitura da câmera: {e}")
+                ret, image = False, None
+
+            if not ret or image is None:
+                if getattr(self.capture, "finished", False):
+                    # Fonte gravada terminou: consumidores veem is_running = False
+                    self.logger.info("Leitura encerrada: fim da fonte de vídeo")
+                    break
+                if getattr(self.capture, "paused", False):
+                    # Modo quadro a quadro aguardando step(); read() já esperou
+                    continue
+                self.read_errors += 1
+                consecutive_errors += 1
+                # Dispositivo sem frames: evitar laço ocupado
+                time.sleep(min(0.5, 0.01 * consecutive_errors))
+                continue
+            consecutive_errors = 0
+
+            now = time.monotonic()
+            if last_time is not None and now > last_time:
+                instant = 1.0 / (now - last_time)
+                self.fps = instant if self.fps == 0.0 else 0.9 * self.fps + 0.1 * instant
+            last_time = now
+
+            with self._condition:
+                if len(self._frames) == self.buffer_size:
+                    evicted = self._frames[0]
+                    if evicted.seq > self._consumed_seq:
+                        self.dropped += 1
+                self.seq += 1
+                self.frames_read += 1
+                # Fontes gravadas trazem o instante original da captura
+                timestamp = getattr(self.capture, "timestamp", None)
+                self._frames.append(Frame(image, self.seq, time.time() if timestamp is None else timestamp))
+                self._condition.notify_all()
+
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def latest(self, timeout: float = 0.0) -> Optional[Frame]:
+        """
+        Frame mais recente (sem cópia)
+
+        Args:
+            timeout: Segundos de espera se ainda não houver frame
+
+        Returns:
+            Frame ou None
+        """
+        with self._condition:
+            if not self._frames and timeout > 0 and self._running:
+                self._condition.wait_for(lambda: self._frames or not self._running, timeout)
+            return self._frames[-1] if self._frames else None
+
+    def recent(self, count: Optional[int] = None) -> List[Frame]:
+        """Frames do buffer circular, do mais antigo ao mais novo"""
+        with self._condition:
+            frames = list(self._frames)
+        return frames if count is None else frames[-count:]
+
+    def wait_newer(self, seq: int, timeout: Optional[float] = None) -> Optional[Frame]:
+        """Aguarda um frame com sequência maior que `seq`"""
+        with self._condition:
+            ready = self._condition.wait_for(
+                lambda: (self._frames and self._frames[-1].seq > seq) or not self._running,
+                timeout
+            )
+            if not ready or not self._frames or self._frames[-1].seq <= seq:
+                return None
+            return self._frames[-1]
+
+    def mark_consumed(self, seq: int):
+        with self._condition:
+            self._consumed_seq = max(self._consumed_seq, seq)
+
+    def subscribe(self, name: str) -> FrameSubscription:
+        """
+        Cria um consumidor
+
+        Args:
+            name: Identificação do consumidor (estatísticas)
+
+        Returns:
+            FrameSubscription: Inscrição; chame close() ao terminar
+        """
+        subscription = FrameSubscription(self, name)
+        with self._condition:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FrameSubscription):
+        with self._condition:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def stats(self) -> Dict[str, object]:
+        """Contadores de captura e de cada consumidor"""
+        with self._condition:
+            subscribers = {
+                sub.name: {"received": sub.received, "dropped": sub.dropped}
+                for sub in self._subscriptions
+            }
+        return {
+            "frames_read": self.frames_read,
+            "dropped": self.dropped,
+            "read_errors": self.read_errors,
+            "fps": self.fps,
+            "subscribers": subscribers
+        }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Organização da galeria de rostos em disco
+
+Cada identidade pode ter vários modelos (imagens):
+    data/faces/<nome>.jpg          modelo principal (formato original)
+    data/faces/<nome>/<id>.jpg     modelos adicionais
+"""
+
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+def is_image_file(filename: str) -> bool:
+    """Verifica se o arquivo tem extensão de imagem suportada"""
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_gallery_images(faces_dir: str) -> List[Tuple[str, str]]:
+    """
+    Lista todas as imagens da galeria
+
+    Args:
+        faces_dir: Diretório dos rostos
+
+    Returns:
+        List: Lista ordenada de tuplas (nome, caminho_da_imagem)
+    """
+    images = []
+    if not os.path.isdir(faces_dir):
+        return images
+
+    for entry in sorted(os.listdir(faces_dir)):
+        path = os.path.join(faces_dir, entry)
+        if os.path.isdir(path):
+            for filename in sorted(os.listdir(path)):
+                if is_image_file(filename):
+                    images.append((entry, os.path.join(path, filename)))
+        elif is_image_file(entry):
+            images.append((os.path.splitext(entry)[0], path))
+
+    return images
+
+
+def identity_image_paths(faces_dir: str, name: str) -> List[str]:
+    """
+    Lista as imagens (modelos) de uma identidade
+
+    Args:
+        faces_dir: Diretório dos rostos
+        name: Nome da identidade
+
+    Returns:
+        List: Caminhos das imagens, modelo principal primeiro
+    """
+    paths = []
+    for ext in IMAGE_EXTENSIONS:
+        path = os.path.join(faces_dir, f"{name}{ext}")
+        if os.path.isfile(path):
+            paths.append(path)
+
+    identity_dir = os.path.join(faces_dir, name)
+    if os.path.isdir(identity_dir):
+        for filename in sorted(os.listdir(identity_dir)):
+            if is_image_file(filename):
+                paths.append(os.path.join(identity_dir, filename))
+
+    return paths
+
+
+def primary_image_path(faces_dir: str, name: str) -> Optional[str]:
+    """Retorna a primeira imagem de uma identidade, se houver"""
+    paths = identity_image_paths(faces_dir, name)
+    return paths[0] if paths else None
+
+
+def new_template_path(faces_dir: str, name: str) -> str:
+    """
+    Gera o caminho para um novo modelo de uma identidade
+
+    Args:
+        faces_dir: Diretório dos rostos
+        name: Nome da identidade
+
+    Returns:
+        str: Caminho em data/faces/<nome>/ (o diretório é criado)
+    """
+    identity_dir = os.path.join(faces_dir, name)
+    if not os.path.exists(identity_dir):
+        os.makedirs(identity_dir)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(identity_dir, f"{timestamp}.jpg")
+
+
+def template_key(faces_dir: str, image_path: str) -> str:
+    """Chave estável de um modelo: caminho relativo ao diretório dos rostos"""
+    return os.path.normpath(os.path.relpath(image_path, faces_dir))
+
+
+def remove_identity_files(faces_dir: str, name: str) -> List[str]:
+    """
+    Remove todas as imagens de uma identidade
+
+    Args:
+        faces_dir: Diretório dos rostos
+        name: Nome da identidade
+
+    Returns:
+        List: Caminhos removidos
+    """
+    return remove_template_files(faces_dir, name, identity_image_paths(faces_dir, name))
+
+
+def remove_template_files(faces_dir: str, name: str, paths: List[str]) -> List[str]:
+    """
+    Remove imagens de uma identidade (e o diretório dela, se ficar vazio)
+
+    Args:
+        faces_dir: Diretório dos rostos
+        name: Nome da identidade
+        paths: Imagens a remover
+
+    Returns:
+        List: Caminhos removidos
+    """
+    removed = []
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+            removed.append(path)
+
+    identity_dir = os.path.join(faces_dir, name)
+    if os.path.isdir(identity_dir) and not os.listdir(identity_dir):
+        os.rmdir(identity_dir)
+
+    return removed
+
+
+def rename_identity_files(faces_dir: str, old_name: str, new_name: str) -> Dict[str, str]:
+    """
+    Renomeia as imagens de uma identidade (o destino deve estar livre)
+
+    Args:
+        faces_dir: Diretório dos rostos
+        old_name: Nome atual
+        new_name: Novo nome
+
+    Returns:
+        Dict: Mapa caminho_antigo -> caminho_novo
+    """
+    moved = {}
+
+    for ext in IMAGE_EXTENSIONS:
+        old_path = os.path.join(faces_dir, f"{old_name}{ext}")
+        if os.path.isfile(old_path):
+            new_path = os.path.join(faces_dir, f"{new_name}{ext}")
+            os.replace(old_path, new_path)
+            moved[old_path] = new_path
+
+    old_dir = os.path.join(faces_dir, old_name)
+    if os.path.isdir(old_dir):
+        new_dir = os.path.join(faces_dir, new_name)
+        shutil.move(old_dir, new_dir)
+        for filename in os.listdir(new_dir):
+            if is_image_file(filename):
+                moved[os.path.join(old_dir, filename)] = os.path.join(new_dir, filename)
+
+    return moved
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Filtro de movimento na entrada da detecção
+
+Compara versões reduzidas de frames consecutivos. Sem mudança relevante a
+detecção é pulada e o último resultado é reaproveitado. A histerese (limiar
+de saída menor que o de entrada e alguns frames de espera) evita que o filtro
+oscile com ruído de sensor ou movimentos lentos.
+"""
+
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decide, frame a frame, se vale a pena rodar a detecção
+
+    Parâmetros:
+        threshold: fração de pixels alterados que abre o filtro
+        release_ratio: com o filtro aberto, fração de `threshold` que o mantém aberto
+        hold_frames: frames mantidos abertos após o fim do movimento
+        pixel_delta: diferença de intensidade (0-255) para um pixel contar como alterado
+        width: largura do frame reduzido usado na comparação
+    """
+
+    def __init__(self, threshold: float = 0.01, release_ratio: float = 0.5,
+                 hold_frames: int = 15, pixel_delta: int = 25, width: int = 64):
+        self.threshold = threshold
+        self.release_ratio = release_ratio
+        self.hold_frames = hold_frames
+        self.pixel_delta = pixel_delta
+        self.width = width
+
+        self.is_open = True
+        self.last_score = 0.0
+        self._reference: Optional[np.ndarray] = None
+        self._hold = 0
+
+        self.frames = 0
+        self.passed = 0
+        self.skipped = 0
+
+    def reset(self):
+        """Esquece o frame de referência (o próximo frame sempre passa)"""
+        self._reference = None
+        self._hold = 0
+        self.is_open = True
+
+    def reset_stats(self):
+        """Zera os contadores"""
+        self.frames = 0
+        self.passed = 0
+        self.skipped = 0
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def update(self, frame: np.ndarray) -> bool:
+        """
+        Avalia um frame
+
+        Args:
+            frame: Frame BGR ou em escala de cinza
+
+        Returns:
+            bool: True se a detecção deve rodar neste frame
+        """
+        small = self._downscale(frame)
+        reference, self._reference = self._reference, small
+        self.frames += 1
+
+        if reference is None or reference.shape != small.shape:
+            self.last_score = 1.0
+            self.is_open = True
+            self._hold = self.hold_frames
+        else:
+            diff = cv2.absdiff(small, reference)
+            self.last_score = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+
+            limit = self.threshold * self.release_ratio if self.is_open else self.threshold
+            if self.last_score >= limit:
+                self.is_open = True
+                self._hold = self.hold_frames
+            elif self._hold > 0:
+                self._hold -= 1
+            else:
+                self.is_open = False
+
+        if self.is_open:
+            self.passed += 1
+        else:
+            self.skipped += 1
+        return self.is_open
+
+    @property
+    def hit_rate(self) -> float:
+        """Fração dos frames em que a detecção foi pulada"""
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores do filtro para ajuste por instalação"""
+        return {
+            "frames": self.frames,
+            "passed": self.passed,
+            "skipped": self.skipped,
+            "hit_rate": self.hit_rate,
+            "last_score": self.last_score
+        }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Codificação de imagens da galeria em paralelo (pool de processos)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.logger import get_logger
+
+# (caminho, resultado ou None, mensagem de erro ou None)
+EncodeResult = Tuple[str, Optional[np.ndarray], Optional[str]]
+
+ProgressCallback = Callable[[int, int], None]
+
+
+def resolve_workers(workers: int, limit: Optional[int] = None) -> int:
+    """
+    Converte a configuração de processos em um número efetivo
+
+    Args:
+        workers: Número de processos (0 = automático, um por núcleo)
+        limit: Teto aplicado ao modo automático
+
+    Returns:
+        int: Número de processos (mínimo 1)
+    """
+    if workers and workers > 0:
+        return workers
+    count = os.cpu_count() or 1
+    return max(1, min(count, limit) if limit else count)
+
+
+def encode_face_file(image_path: str) -> EncodeResult:
+    """
+    Codifica o primeiro rosto de uma imagem (executado nos processos do pool)
+
+    Args:
+        image_path: Caminho da imagem
+
+    Returns:
+        EncodeResult: Codificação ou None se não houver rosto; erro isolado por arquivo
+    """
+    try:
+        import face_recognition
+
+        image = face_recognition.load_image_file(image_path)
+        encodings = face_recognition.face_encodings(image)
+        return image_path, (encodings[0] if encodings else None), None
+
+    except Exception as e:
+        return image_path, None, str(e)
+
+
+def parallel_map(func: Callable[[str], EncodeResult], image_paths: Sequence[str],
+                 workers: int = 0, chunksize: Optional[int] = None,
+                 progress_callback: Optional[ProgressCallback] = None,
+                 initializer: Optional[Callable] = None) -> List[EncodeResult]:
+    """
+    Aplica `func` a cada imagem em um pool de processos, mantendo a ordem
+
+    Args:
+        func: Função de nível de módulo (serializável) aplicada a cada caminho
+        image_paths: Caminhos das imagens
+        workers: Número de processos (0 = automático; 1 = no próprio processo)
+        chunksize: Imagens por tarefa enviada ao pool (None = automático)
+        progress_callback: Chamado com (concluídas, total) a cada resultado
+        initializer: Inicialização executada uma vez em cada processo
+
+    Returns:
+        List[EncodeResult]: Resultados na mesma ordem de `image_paths`
+    """
+    logger = get_logger(__name__)
+    total = len(image_paths)
+    workers = min(resolve_workers(workers), total) if total else 1
+    results = []
+
+    if workers <= 1:
+        if initializer is not None:
+            initializer()
+        for path in image_paths:
+            results.append(func(path))
+            if progress_callback is not None:
+                progress_callback(len(results), total)
+        return results
+
+    # Poucos blocos por processo: equilibra carga e custo de comunicação
+    if chunksize is None:
+        chunksize = max(1, total // (workers * 4))
+
+    logger.info(f"Codificando {total} imagens com {workers} processos")
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+            for result in executor.map(func, image_paths, chunksize=chunksize):
+                results.append(result)
+                if progress_callback is not None:
+                    progress_callback(len(results), total)
+        return results
+
+    except Exception as e:
+        # Pool indisponível (ex.: processo filho morto): concluir sequencialmente
+        logger.error(f"Erro no pool de codificação, continuando sem paralelismo: {e}")
+        done = len(results)
+        return results + parallel_map(
+            func, image_paths[done:], 1, None,
+            (lambda n, _: progress_callback(done + n, total)) if progress_callback else None,
+            initializer
+        )
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pipeline de vídeo em etapas ligadas por filas limitadas
+
+    captura -> detecção -> anotação -> exibição
+                   \\
+                    -> reconhecimento (assíncrono, atualiza os rastros)
+
+Cada etapa roda em sua própria thread. As filas têm tamanho máximo e uma
+política de descarte (mais antigo ou mais novo) quando cheias, de modo que a
+exibição segue fluida enquanto o reconhecimento roda na taxa que a CPU
+permitir. Cada etapa mede sua própria vazão.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from utils.logger import get_logger
+from utils.timing import LatencyHistogram, Timings
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST)
+
+
+class BoundedQueue:
+    """
+    Fila limitada que nunca bloqueia o produtor
+
+    Parâmetros:
+        maxsize: itens máximos na fila
+        policy: DROP_OLDEST descarta o item mais antigo para aceitar o novo;
+            DROP_NEWEST recusa o novo item
+        on_drop: chamado com cada item descartado
+    """
+
+    def __init__(self, name: str, maxsize: int = 2, policy: str = DROP_OLDEST,
+                 on_drop: Optional[Callable[[Any], None]] = None):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte inválida: {policy}")
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.on_drop = on_drop
+
+        self._items: deque = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item: Any) -> bool:
+        """
+        Enfileira um item aplicando a política de descarte
+
+        Returns:
+            bool: True se o item novo foi aceito
+        """
+        dropped = None
+        with self._condition:
+            if self._closed:
+                return False
+            self.put_count += 1
+            if len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    dropped = item
+                else:
+                    dropped = self._items.popleft()
+            if dropped is not item:
+                self._items.append(item)
+                self._condition.notify()
+
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+        return dropped is not item
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Retira o item mais antigo; None se o tempo esgotar ou a fila for fechada"""
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                return None
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        """Libera consumidores bloqueados; descarta os itens restantes"""
+        with self._condition:
+            self._closed = True
+            items = list(self._items)
+            self._items.clear()
+            self._condition.notify_all()
+        if self.on_drop is not None:
+            for item in items:
+                self.on_drop(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._items),
+            "maxsize": self.maxsize,
+            "policy": self.policy,
+            "put": self.put_count,
+            "dropped": self.dropped
+        }
+
+
+class Stage:
+    """
+    Etapa do pipeline: lê da fila de entrada, processa e publica na saída
+
+    `func` recebe um item e devolve o item seguinte (None = nada a publicar).
+    Sem fila de entrada a etapa é uma fonte: `func(None)` é chamada em laço.
+    A latência de cada item vai para o histograma "stage.<nome>" de `timings`.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any],
+                 input_queue: Optional[BoundedQueue] = None,
+                 output_queue: Optional[BoundedQueue] = None,
+                 timings: Optional[Timings] = None):
+        self.logger = get_logger(__name__)
+        self.name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.processed = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.latency = timings.histogram(f"stage.{name}") if timings is not None else LatencyHistogram()
+        # Itens por segundo (média móvel exponencial)
+        self.rate = 0.0
+        self._last_done: Optional[float] = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _run(self):
+        while self._running:
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+            else:
+                item = None
+
+            started = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                self.errors += 1
+                self.logger.error(f"Erro na etapa {self.name}: {e}")
+                continue
+            finished = time.perf_counter()
+
+            if result is None:
+                continue
+
+            self.processed += 1
+            self.busy_time += finished - started
+            self.latency.record(finished - started)
+            if self._last_done is not None and finished > self._last_done:
+                instant = 1.0 / (finished - self._last_done)
+                self.rate = instant if self.rate == 0.0 else 0.9 * self.rate + 0.1 * instant
+            self._last_done = finished
+
+            if self.output_queue is not None:
+                self.output_queue.put(result)
+
+    def stats(self) -> Dict[str, Any]:
+        latency = self.latency.snapshot()
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "rate": self.rate,
+            "avg_ms": 1000.0 * self.busy_time / self.processed if self.processed else 0.0,
+            "p50_ms": latency["p50_ms"],
+            "p95_ms": latency["p95_ms"],
+            "p99_ms": latency["p99_ms"]
+        }
+
+
+class Pipeline:
+    """Conjunto de etapas e filas iniciado e parado em bloco"""
+
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self.queues: List[BoundedQueue] = []
+
+    def add_queue(self, queue: BoundedQueue) -> BoundedQueue:
+        self.queues.append(queue)
+        return queue
+
+    def add_stage(self, stage: Stage) -> Stage:
+        self.stages.append(stage)
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+        for queue in self.queues:
+            queue.close()
+        for stage in self.stages:
+            stage.join(timeout=2.0)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Vazão de cada etapa e ocupação/descartes de cada fila"""
+        return {
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+            "queues": {queue.name: queue.stats() for queue in self.queues}
+        }
+
+
+class FramePacket:
+    """Frame em trânsito pelo pipeline"""
+
+    def __init__(self, image: np.ndarray, seq: int, timestamp: float):
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp
+        self.tracks: List = []
+        self.full_detection = False
+
+
+class VideoPipeline(Pipeline):
+    """
+    Pipeline de vídeo para FaceDetector/FaceDetectorRPi
+
+    Args:
+        face_detector: Detector com subscribe_frames, track_faces,
+            recognize_tracks, tracks_result e draw_face_rectangles
+        display: Recebe o frame anotado; devolve False se não pôde exibi-lo
+        on_recognized: Chamado com (rastros, resultados) após cada reconhecimento
+        queue_size: Capacidade das filas entre etapas
+        drop_policy: DROP_OLDEST ou DROP_NEWEST
+        frame_interval: Intervalo mínimo entre frames capturados (s)
+        presence: Recebe os rastros de cada frame anotado (sessões de presença)
+    """
+
+    def __init__(self, face_detector, display: Callable[[np.ndarray], bool],
+                 on_recognized: Optional[Callable[[List, List], None]] = None,
+                 queue_size: int = 2, drop_policy: str = DROP_OLDEST,
+                 frame_interval: float = 0.0, presence=None):
+        super().__init__()
+        self.face_detector = face_detector
+        self.display = display
+        self.on_recognized = on_recognized
+        self.presence = presence
+        self.frame_interval = frame_interval
+
+        self._subscription = None
+        self._last_capture = 0.0
+        self.display_dropped = 0
+
+        # Histogramas das etapas junto com os do detector (localização, codificação...)
+        self.timings = getattr(face_detector, "timings", None) or Timings()
+        timings = self.timings
+
+        detect_queue = self.add_queue(BoundedQueue("detect", queue_size, drop_policy))
+        recognize_queue = self.add_queue(BoundedQueue(
+            "recognize", queue_size, drop_policy, on_drop=self._release_step
+        ))
+        annotate_queue = self.add_queue(BoundedQueue("annotate", queue_size, drop_policy))
+        display_queue = self.add_queue(BoundedQueue("display", queue_size, drop_policy))
+        self._recognize_queue = recognize_queue
+
+        self.add_stage(Stage("capture", self._capture, None, detect_queue, timings))
+        self.add_stage(Stage("detect", self._detect, detect_queue, annotate_queue, timings))
+        self.add_stage(Stage("recognize", self._recognize, recognize_queue, None, timings))
+        self.add_stage(Stage("annotate", self._annotate, annotate_queue, display_queue, timings))
+        self.add_stage(Stage("display", self._display, display_queue, None, timings))
+
+    @staticmethod
+    def _release_step(step):
+        # Reconhecimento descartado: os rastros voltam a ser elegíveis
+        for track in step.pending:
+            track.in_flight = False
+
+    def stop(self):
+        super().stop()
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+
+    def _capture(self, _):
+        # Reinscrever se a câmera foi reaberta (ex.: troca de índice)
+        if self._subscription is None or not self._subscription.active:
+            self._subscription = self.face_detector.subscribe_frames("pipeline")
+            if self._subscription is None:
+                time.sleep(0.1)
+                return None
+
+        wait = self._last_capture + self.frame_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+
+        frame = self._subscription.get(timeout=0.5)
+        if frame is None:
+            return None
+        self._last_capture = time.monotonic()
+        return FramePacket(frame.image, frame.seq, frame.timestamp)
+
+    def _detect(self, packet: FramePacket):
+        step = self.face_detector.track_faces(packet.image)
+        if step is None:
+            # Sem movimento: manter os rastros atuais
+            packet.tracks = list(self.face_detector.tracker.tracks)
+            return packet
+
+        packet.tracks = step.tracks
+        packet.full_detection = self.face_detector.full_detection
+        if step.pending:
+            self._recognize_queue.put(step)
+        return packet
+
+    def _recognize(self, step):
+        results = self.face_detector.recognize_tracks(step)
+        if self.on_recognized is not None:
+            self.on_recognized(step.pending, results)
+        return results
+
+    def _annotate(self, packet: FramePacket):
+        # Nomes lidos agora: refletem reconhecimentos concluídos após a detecção
+        locations, names = self.face_detector.tracks_result(packet.tracks)
+        if self.presence is not None:
+            self.presence.observe(packet.tracks, self.face_detector.source_name or "")
+        packet.image = self.face_detector.draw_face_rectangles(packet.image, locations, names)
+        return packet
+
+    def _display(self, packet: FramePacket):
+        if self.display(packet.image) is False:
+            self.display_dropped += 1
+            return None
+        return packet
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Vazão e latência das etapas, descartes e histogramas do detector
+
+        Returns:
+            Dict: "stages", "queues", "latency" (p50/p95/p99 de cada etapa e
+            método medido) e "drops" (por fila, exibição e captura)
+        """
+        stats = super().stats()
+        stats["stages"]["display"]["dropped"] = self.display_dropped
+        stats["latency"] = self.timings.snapshot()
+
+        drops = {name: queue["dropped"] for name, queue in stats["queues"].items()}
+        drops["display"] = self.display_dropped
+        reader = getattr(self.face_detector, "frame_reader", None)
+        drops["capture"] = reader.dropped if reader is not None else 0
+        stats["drops"] = drops
+        return stats
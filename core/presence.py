@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sessões de presença: quem está diante da câmera, desde quando
+
+Em vez de um evento por rosto reconhecido, as identidades vistas em cada
+frame alimentam uma sessão por pessoa (primeira e última aparição e maior
+confiança). Só o início e o fim da sessão geram eventos; a sessão termina
+quando a pessoa fica `gap_timeout` segundos sem aparecer.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from core.face_matcher import UNKNOWN_NAME
+
+
+def match_confidence(match) -> Optional[float]:
+    """Confiança de um MatchResult (1 - distância); None se indisponível (LBPH)"""
+    distance = getattr(match, "distance", None)
+    if distance is None or distance == float("inf"):
+        return None
+    return max(0.0, 1.0 - float(distance))
+
+
+class PresenceSession:
+    """Presença contínua de uma identidade"""
+
+    def __init__(self, name: str, camera: str, now: float, confidence: Optional[float] = None):
+        self.name = name
+        self.camera = camera
+        self.first_seen = now
+        self.last_seen = now
+        self.peak_confidence = confidence
+        self.frames = 1
+
+    @property
+    def duration(self) -> float:
+        return self.last_seen - self.first_seen
+
+    def update(self, now: float, confidence: Optional[float]):
+        self.last_seen = max(self.last_seen, now)
+        self.frames += 1
+        if confidence is not None and (self.peak_confidence is None or confidence > self.peak_confidence):
+            self.peak_confidence = confidence
+
+    def describe(self) -> str:
+        """Resumo legível: horários, duração e maior confiança"""
+        first = time.strftime("%H:%M:%S", time.localtime(self.first_seen))
+        last = time.strftime("%H:%M:%S", time.localtime(self.last_seen))
+        text = f"{self.name} {first}-{last} ({self.duration:.0f}s"
+        if self.peak_confidence is not None:
+            text += f", confiança máx. {self.peak_confidence:.2f}"
+        return text + ")"
+
+    def __repr__(self) -> str:
+        return f"PresenceSession({self.name!r}, {self.duration:.1f}s)"
+
+
+class PresenceTracker:
+    """
+    Agrega as identidades vistas a cada frame em sessões
+
+    Parâmetros:
+        gap_timeout: segundos sem aparecer até a sessão terminar
+        on_start: chamado com a sessão ao começar
+        on_end: chamado com a sessão ao terminar
+    """
+
+    def __init__(self, gap_timeout: float = 5.0,
+                 on_start: Optional[Callable[[PresenceSession], None]] = None,
+                 on_end: Optional[Callable[[PresenceSession], None]] = None):
+        self.gap_timeout = gap_timeout
+        self.on_start = on_start
+        self.on_end = on_end
+        self._lock = threading.Lock()
+        self.sessions: Dict[str, PresenceSession] = {}
+
+    def observe(self, tracks: List, camera: str = "", now: Optional[float] = None):
+        """
+        Registra os rastros de um frame (barato: um dicionário por frame)
+
+        Args:
+            tracks: Rastros do frame (Track com name e last_match)
+            camera: Fonte do frame
+            now: Instante Unix (padrão: agora)
+        """
+        now = time.time() if now is None else now
+        seen: Dict[str, Optional[float]] = {}
+        for track in tracks:
+            if track.name == UNKNOWN_NAME:
+                continue
+            # O último resultado só conta se confirma o nome atual do rastro
+            match = track.last_match if getattr(track.last_match, "name", None) == track.name else None
+            confidence = match_confidence(match)
+            previous = seen.get(track.name)
+            if previous is None or (confidence is not None and confidence > previous):
+                seen[track.name] = confidence
+
+        started = []
+        with self._lock:
+            for name, confidence in seen.items():
+                session = self.sessions.get(name)
+                if session is None:
+                    session = self.sessions[name] = PresenceSession(name, camera, now, confidence)
+                    started.append(session)
+                else:
+                    session.update(now, confidence)
+            ended = self._expire_locked(now)
+
+        self._notify(ended, started)
+
+    def expire(self, now: Optional[float] = None) -> List[PresenceSession]:
+        """Encerra as sessões sem aparição há mais de gap_timeout segundos"""
+        with self._lock:
+            ended = self._expire_locked(time.time() if now is None else now)
+        self._notify(ended, [])
+        return ended
+
+    def close_all(self) -> List[PresenceSession]:
+        """Encerra todas as sessões (ex.: câmera desligada)"""
+        with self._lock:
+            ended = list(self.sessions.values())
+            self.sessions = {}
+        self._notify(ended, [])
+        return ended
+
+    def _expire_locked(self, now: float) -> List[PresenceSession]:
+        ended = [s for s in self.sessions.values() if now - s.last_seen > self.gap_timeout]
+        for session in ended:
+            del self.sessions[session.name]
+        return ended
+
+    def _notify(self, ended: List[PresenceSession], started: List[PresenceSession]):
+        # Fora do lock: os callbacks podem agendar trabalho na interface
+        if self.on_end is not None:
+            for session in ended:
+                self.on_end(session)
+        if self.on_start is not None:
+            for session in started:
+                self.on_start(session)
+
+    @property
+    def active(self) -> List[PresenceSession]:
+        with self._lock:
+            return list(self.sessions.values())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache de resultados de reconhecimento indexado por hash perceptual
+
+Câmeras fixas veem a mesma pessoa parada no mesmo lugar por minutos. Um
+recorte de rosto quase idêntico a um já reconhecido no mesmo lugar do frame
+(mesma célula de posição e escala da caixa e distância de Hamming pequena
+entre os dHash do recorte normalizado) reaproveita o resultado sem codificar
+nem predizer.
+Entradas expiram por tempo (TTL), o tamanho é limitado (LRU) e cada entrada
+guarda a geração da galeria/modelo: qualquer alteração as invalida.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+
+# Lado do recorte normalizado antes do hash
+NORMALIZED_SIZE = 64
+
+
+def normalize_crop(crop: np.ndarray, size: int = NORMALIZED_SIZE) -> np.ndarray:
+    """
+    Recorte em escala de cinza, tamanho fixo e histograma equalizado
+
+    A equalização tira do hash a iluminação e o contraste, deixando a
+    estrutura do rosto (olhos, nariz, boca) decidir a semelhança.
+
+    Args:
+        crop: Recorte BGR/RGB ou em escala de cinza
+        size: Lado do recorte normalizado
+
+    Returns:
+        np.ndarray: Recorte uint8 size x size
+    """
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+    if crop.dtype != np.uint8:
+        crop = np.clip(crop, 0, 255).astype(np.uint8)
+    return cv2.equalizeHist(cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA))
+
+
+def dhash(crop: np.ndarray, hash_size: int = 16) -> int:
+    """
+    Hash por diferença (dHash) de um recorte de rosto
+
+    Args:
+        crop: Recorte BGR/RGB ou em escala de cinza
+        hash_size: Lado do hash (hash_size² bits)
+
+    Returns:
+        int: Hash perceptual
+    """
+    if crop.ndim == 3:
+        crop = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(crop, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def box_cell(box: Sequence[int]) -> Tuple[int, int, int]:
+    """
+    Célula grosseira de uma caixa (top, right, bottom, left): escala e posição
+
+    A escala anda em quartos de oitava do tamanho do rosto e a posição em
+    passos de um rosto; rostos em lugares ou tamanhos diferentes nunca se
+    comparam.
+    """
+    top, right, bottom, left = box
+    size = max(2, max(bottom - top, right - left))
+    scale = int(round(np.log2(size) * 4))
+    step = 2.0 ** (scale / 4.0)
+    return scale, int((left + right) / 2 / step), int((top + bottom) / 2 / step)
+
+
+def hamming(a: int, b: int) -> int:
+    """Número de bits diferentes entre dois hashes"""
+    return bin(a ^ b).count("1")
+
+
+class RecognitionCache:
+    """
+    Cache LRU com TTL de resultados de reconhecimento
+
+    Parâmetros:
+        max_size: número máximo de entradas
+        ttl: segundos de validade de uma entrada (0 desativa o cache)
+        max_distance: distância de Hamming máxima (em 256 bits) para considerar
+            o recorte igual
+    """
+
+    def __init__(self, max_size: int = 256, ttl: float = 10.0, max_distance: int = 8):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+
+        self._lock = threading.Lock()
+        # (célula da caixa, hash) -> (resultado, instante, geração)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_size > 0
+
+    def key(self, crop: np.ndarray, box: Sequence[int]) -> Optional[tuple]:
+        """
+        Chave de um recorte: célula da caixa e dHash do recorte normalizado
+
+        Args:
+            crop: Recorte do rosto
+            box: Caixa (top, right, bottom, left) do recorte no frame
+
+        Returns:
+            Chave ou None para recortes vazios
+        """
+        if crop is None or crop.size == 0 or min(crop.shape[:2]) < 2:
+            return None
+        return box_cell(box), dhash(normalize_crop(crop))
+
+    def get(self, key: Optional[tuple], generation: Hashable = 0, now: Optional[float] = None) -> Optional[Any]:
+        """
+        Procura um resultado para um recorte quase idêntico na mesma célula
+
+        Args:
+            key: Chave do recorte (RecognitionCache.key)
+            generation: Geração atual da galeria/modelo
+            now: Instante atual (padrão: time.monotonic())
+
+        Returns:
+            Resultado em cache ou None
+        """
+        if key is None or not self.enabled:
+            return None
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            found = key if entry is not None and self._is_valid(entry, generation, now) else None
+            if found is None:
+                # Entradas vencidas da célula saem no caminho; vale a válida mais próxima
+                cell, crop_hash = key
+                best = self.max_distance + 1
+                stale = []
+                for candidate, entry in self._entries.items():
+                    if candidate[0] != cell:
+                        continue
+                    if not self._is_valid(entry, generation, now):
+                        stale.append(candidate)
+                        continue
+                    distance = hamming(crop_hash, candidate[1])
+                    if distance < best:
+                        found, best = candidate, distance
+                for candidate in stale:
+                    del self._entries[candidate]
+                self.expirations += len(stale)
+
+            if found is not None:
+                self._entries.move_to_end(found)
+                self.hits += 1
+                return self._entries[found][0]
+
+            self.misses += 1
+            return None
+
+    def _is_valid(self, entry: tuple, generation: Hashable, now: float) -> bool:
+        _, stamp, entry_generation = entry
+        return entry_generation == generation and now - stamp <= self.ttl
+
+    def put(self, key: Optional[tuple], value: Any, generation: Hashable = 0, now: Optional[float] = None):
+        """
+        Armazena o resultado de um reconhecimento
+
+        Args:
+            key: Chave do recorte (RecognitionCache.key)
+            value: Resultado (nome ou MatchResult)
+            generation: Geração da galeria/modelo usada no reconhecimento
+            now: Instante atual (padrão: time.monotonic())
+        """
+        if key is None or not self.enabled:
+            return
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries[key] = (value, now, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        """Zera os contadores"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores do cache"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hit_rate
+            }
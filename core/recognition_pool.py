@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pool de processos para detecção e reconhecimento (HOG/CNN + codificação dlib)
+
+A localização e a codificação seguram o GIL por longos trechos; em processos
+separados elas usam outros núcleos sem travar a interface. Cada processo
+mantém o modelo do dlib e uma cópia da galeria carregados. Os frames chegam
+por slots de um bloco de memória compartilhada (multiprocessing.shared_memory),
+não como arrays serializados, e os resultados voltam como tuplas compactas.
+Processos mortos ou travados são substituídos automaticamente.
+"""
+
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.face_matcher import FaceMatcher, MatchResult
+from utils.logger import get_logger
+
+TASK_LOCATE = "locate"
+TASK_IDENTIFY = "identify"
+
+
+class WorkerDiedError(RuntimeError):
+    """O processo que atendia a tarefa morreu ou foi reiniciado"""
+
+
+def _worker_main(worker_id: int, shm_name: str, slot_size: int, inbox, outbox):
+    """Laço de um processo do pool (nível de módulo para o modo spawn)"""
+    import face_recognition
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matcher = FaceMatcher()
+    outbox.put(("ready", worker_id))
+
+    try:
+        while True:
+            message = inbox.get()
+            kind = message[0]
+
+            if kind == "stop":
+                break
+
+            if kind == "ping":
+                outbox.put(("pong", worker_id, message[1]))
+                continue
+
+            if kind == "gallery":
+                _, matrix, names, keys = message
+                matcher.set_gallery(list(matrix), names, keys)
+                continue
+
+            _, job_id, task, slot, shape, boxes, options = message
+            try:
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_size)
+
+                if task == TASK_LOCATE:
+                    boxes = face_recognition.face_locations(
+                        frame, number_of_times_to_upsample=options["upsample"], model=options["model"]
+                    )
+                    outbox.put(("result", worker_id, job_id, task, [tuple(box) for box in boxes], None))
+                else:
+                    encodings = face_recognition.face_encodings(frame, boxes) if boxes else []
+                    matches = matcher.match(encodings, options["tolerance"], options["mode"])
+                    outbox.put(("result", worker_id, job_id, task, [tuple(match) for match in matches], None))
+
+            except Exception as e:
+                outbox.put(("result", worker_id, job_id, task, None, str(e)))
+    finally:
+        shm.close()
+
+
+class _Worker:
+    """Estado do processo no lado do pai"""
+
+    def __init__(self, worker_id: int, process, inbox):
+        self.worker_id = worker_id
+        self.process = process
+        self.inbox = inbox
+        self.gallery_version = None
+        self.last_pong = time.monotonic()
+        # job_id -> instante de envio
+        self.jobs: Dict[int, float] = {}
+
+
+class RecognitionPool:
+    """
+    Pool de processos de reconhecimento com frames em memória compartilhada
+
+    Parâmetros:
+        workers: número de processos
+        slots: slots de frame no anel compartilhado (padrão 2 por processo)
+        max_frame_bytes: tamanho máximo de um frame (H x W x 3)
+        job_timeout: segundos até uma tarefa ser considerada travada
+        health_interval: segundos entre verificações de saúde (ping)
+        ping_timeout: segundos sem responder ao ping até o processo ser
+            considerado travado (padrão: job_timeout; o ping espera na fila
+            atrás das tarefas já enviadas)
+    """
+
+    def __init__(self, workers: int = 2, slots: Optional[int] = None,
+                 max_frame_bytes: int = 1280 * 720 * 3, job_timeout: float = 30.0,
+                 health_interval: float = 1.0, ping_timeout: Optional[float] = None):
+        self.logger = get_logger(__name__)
+        self.worker_count = max(1, workers)
+        self.slot_count = slots or 2 * self.worker_count
+        self.slot_size = max_frame_bytes
+        self.job_timeout = job_timeout
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout or job_timeout
+
+        self._context = mp.get_context("spawn")
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._outbox = None
+        self._workers: Dict[int, _Worker] = {}
+        self._lock = threading.Lock()
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        # job_id -> (slot, future, worker_id)
+        self._pending: Dict[int, Tuple[int, Future, int]] = {}
+        self._job_ids = itertools.count(1)
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+        self._gallery = None
+        self._gallery_version = None
+
+        self.completed = 0
+        self.failed = 0
+        self.restarts = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> "RecognitionPool":
+        """Cria o anel compartilhado e inicia os processos"""
+        if self._running:
+            return self
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_size * self.slot_count)
+        self._outbox = self._context.Queue()
+        for slot in range(self.slot_count):
+            self._free_slots.put(slot)
+
+        self._running = True
+        for worker_id in range(self.worker_count):
+            self._spawn(worker_id)
+
+        for target in (self._collect_results, self._monitor):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        self.logger.info(f"Pool de reconhecimento iniciado com {self.worker_count} processos")
+        return self
+
+    def _spawn(self, worker_id: int):
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self._shm.name, self.slot_size, inbox, self._outbox),
+            daemon=True
+        )
+        process.start()
+        self._workers[worker_id] = _Worker(worker_id, process, inbox)
+
+    def stop(self):
+        """Encerra os processos e libera a memória compartilhada"""
+        if not self._running:
+            return
+        self._running = False
+
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers = {}
+        for worker in workers:
+            try:
+                worker.inbox.put(("stop",))
+            except Exception:
+                pass
+        for worker in workers:
+            worker.process.join(timeout=2.0)
+            if worker.process.is_alive():
+                worker.process.terminate()
+
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending = {}
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(WorkerDiedError("Pool de reconhecimento encerrado"))
+
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        self._free_slots = queue.Queue()
+        self.logger.info("Pool de reconhecimento encerrado")
+
+    def set_gallery(self, version, matrix: np.ndarray, names: List[str], keys: List[str]):
+        """
+        Publica uma nova versão da galeria (enviada a cada processo antes da próxima tarefa)
+
+        Args:
+            version: Identificador da versão (ex.: FaceMatcher.version)
+            matrix: Codificações (N x 128)
+            names: Identidade de cada linha
+            keys: Chave de cada linha
+        """
+        with self._lock:
+            self._gallery = (np.array(matrix, dtype=np.float32), list(names), list(keys))
+            self._gallery_version = version
+
+    @property
+    def gallery_version(self):
+        return self._gallery_version
+
+    def submit(self, frame: np.ndarray, task: str, boxes: Optional[List] = None,
+               timeout: float = 1.0, **options) -> Future:
+        """
+        Envia uma tarefa ao processo menos ocupado
+
+        Args:
+            frame: Frame RGB uint8 (copiado para um slot compartilhado)
+            task: TASK_LOCATE ou TASK_IDENTIFY
+            boxes: Caixas a codificar (TASK_IDENTIFY)
+            timeout: Espera máxima por um slot livre
+            options: model/upsample (localização) ou tolerance/mode (identificação)
+
+        Returns:
+            Future: Resolve com a lista de caixas ou de MatchResult
+        """
+        if not self._running:
+            raise RuntimeError("Pool de reconhecimento não iniciado")
+
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.nbytes > self.slot_size:
+            raise ValueError("Frame maior que o slot de memória compartilhada")
+
+        slot = self._free_slots.get(timeout=timeout)
+        target = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._shm.buf, offset=slot * self.slot_size)
+        target[...] = frame
+
+        future: Future = Future()
+        job_id = next(self._job_ids)
+        with self._lock:
+            alive = [w for w in self._workers.values() if w.process.is_alive()]
+            if not alive:
+                self._free_slots.put(slot)
+                raise WorkerDiedError("Nenhum processo de reconhecimento ativo")
+            worker = min(alive, key=lambda w: len(w.jobs))
+
+            if task == TASK_IDENTIFY and worker.gallery_version != self._gallery_version and self._gallery:
+                worker.inbox.put(("gallery",) + self._gallery)
+                worker.gallery_version = self._gallery_version
+
+            worker.jobs[job_id] = time.monotonic()
+            self._pending[job_id] = (slot, future, worker.worker_id)
+            worker.inbox.put(("job", job_id, task, slot, frame.shape, boxes, options))
+
+        return future
+
+    def locate(self, rgb_frame: np.ndarray, model: str = "hog", upsample: int = 1,
+               timeout: Optional[float] = None) -> List[Tuple[int, int, int, int]]:
+        """Localiza rostos em um processo do pool"""
+        future = self.submit(rgb_frame, TASK_LOCATE, model=model, upsample=upsample)
+        return future.result(timeout or self.job_timeout)
+
+    def identify(self, rgb_frame: np.ndarray, boxes: List, tolerance: float = 0.6,
+                 mode: str = "best", timeout: Optional[float] = None) -> List[MatchResult]:
+        """Codifica e compara rostos em um processo do pool"""
+        future = self.submit(rgb_frame, TASK_IDENTIFY, boxes=[tuple(box) for box in boxes],
+                             tolerance=tolerance, mode=mode)
+        return future.result(timeout or self.job_timeout)
+
+    def _finish(self, job_id: int, result=None, error: Optional[BaseException] = None):
+        with self._lock:
+            entry = self._pending.pop(job_id, None)
+            if entry is None:
+                return
+            slot, future, worker_id = entry
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                worker.jobs.pop(job_id, None)
+        self._free_slots.put(slot)
+
+        if error is not None:
+            self.failed += 1
+            future.set_exception(error)
+        else:
+            self.completed += 1
+            future.set_result(result)
+
+    def _collect_results(self):
+        while self._running:
+            try:
+                message = self._outbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            kind = message[0]
+            if kind in ("ready", "pong"):
+                with self._lock:
+                    worker = self._workers.get(message[1])
+                    if worker is not None:
+                        worker.last_pong = time.monotonic()
+                continue
+
+            _, _, job_id, task, payload, error = message
+            if error is not None:
+                self._finish(job_id, error=RuntimeError(error))
+            elif task == TASK_IDENTIFY:
+                self._finish(job_id, [MatchResult(*match) for match in payload])
+            else:
+                self._finish(job_id, payload)
+
+    def _monitor(self):
+        """Verificação de saúde: reinicia processos mortos, sem resposta ao ping ou com tarefas travadas"""
+        while self._running:
+            time.sleep(self.health_interval)
+            now = time.monotonic()
+
+            with self._lock:
+                workers = list(self._workers.values())
+
+            for worker in workers:
+                if not self._running:
+                    return
+                stuck = any(now - sent > self.job_timeout for sent in list(worker.jobs.values()))
+                # Ocioso mas sem responder (travado ou com a fila de saída parada)
+                silent = now - worker.last_pong > self.ping_timeout
+                if worker.process.is_alive() and not stuck and not silent:
+                    try:
+                        worker.inbox.put(("ping", now))
+                    except Exception:
+                        pass
+                    continue
+
+                if not worker.process.is_alive():
+                    reason = f"morto (código {worker.process.exitcode})"
+                else:
+                    reason = "travado" if stuck else f"sem responder há {now - worker.last_pong:.0f}s"
+                self.logger.warning(f"Processo de reconhecimento {worker.worker_id} {reason}; reiniciando")
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(timeout=2.0)
+
+                for job_id in list(worker.jobs):
+                    self._finish(job_id, error=WorkerDiedError(f"Processo {worker.worker_id} reiniciado"))
+
+                with self._lock:
+                    if self._running:
+                        self._spawn(worker.worker_id)
+                        self.restarts += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Processos ativos, reinícios e tarefas"""
+        with self._lock:
+            alive = sum(1 for w in self._workers.values() if w.process.is_alive())
+            in_flight = len(self._pending)
+        return {
+            "workers": self.worker_count,
+            "alive": alive,
+            "restarts": self.restarts,
+            "in_flight": in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "free_slots": self._free_slots.qsize()
+        }
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Execução sem interface gráfica (servidores, dispositivos sem tela, profiling)
+
+Roda FaceDetector ou FaceDetectorRPi sobre qualquer VideoSource (câmera,
+vídeo, pasta de imagens ou gravação), sem importar Tk, e escreve na saída
+padrão um evento por reconhecimento e a taxa de quadros periodicamente. O
+log continua indo para logs/ e stderr.
+SIGINT/SIGTERM encerram o laço e liberam a câmera.
+
+Uso:
+    python -m core.run [--rpi] [--source 0|video.mp4|pasta] [--replay-mode fast] [--speed 2]
+                       [--json] [--stats-interval 5] [--max-frames N] [--duration S]
+                       [--record pasta] [--events data/events.db] [--metrics-port 9108]
+                       [--settings config/settings.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.event_store import EventStore, open_event_store
+from core.presence import PresenceSession, PresenceTracker
+from core.video_source import FrameRecorder, VideoSource, create_source
+from utils.logger import setup_logger
+from utils.metrics_server import start_metrics_server
+from utils.settings import SETTINGS_FILE, apply_detector_settings, load_runtime_config
+
+
+def create_detector(rpi: bool):
+    """Importa apenas o detector escolhido (o do RPi não depende de dlib)"""
+    if rpi:
+        from core.face_detector_rpi import FaceDetectorRPi
+        return FaceDetectorRPi()
+
+    from core.face_detector import FaceDetector
+    return FaceDetector()
+
+
+class EventWriter:
+    """Escreve eventos como texto legível ou como JSON (um por linha)"""
+
+    def __init__(self, as_json: bool = False, stream=None):
+        self.as_json = as_json
+        self.stream = stream or sys.stdout
+
+    def emit(self, event: str, **fields):
+        fields = {"event": event, "time": round(time.time(), 3), **fields}
+        if self.as_json:
+            line = json.dumps(fields, ensure_ascii=False)
+        else:
+            stamp = time.strftime("%H:%M:%S", time.localtime(fields.pop("time")))
+            details = " ".join(f"{key}={value}" for key, value in fields.items() if key != "event")
+            line = f"{stamp} {event} {details}"
+        print(line, file=self.stream, flush=True)
+
+
+class HeadlessRunner:
+    """
+    Laço de detecção sem GUI
+
+    Args:
+        face_detector: FaceDetector ou FaceDetectorRPi já configurado
+        source: Fonte de vídeo (câmeras passam pelo FrameReader do detector;
+            fontes gravadas são lidas em sequência, sem descartar frames)
+        writer: Destino dos eventos
+        stats_interval: Segundos entre eventos de FPS (0 desativa)
+        max_frames: Encerrar após N frames (None = sem limite)
+        duration: Encerrar após S segundos (None = sem limite)
+        recorder: Grava os frames lidos para reprodução posterior (ReplaySource)
+        event_store: Registro SQLite onde cada reconhecimento também é gravado
+        gap_timeout: Segundos sem aparecer até uma sessão de presença terminar
+    """
+
+    def __init__(self, face_detector, source: VideoSource, writer: EventWriter, stats_interval: float = 5.0,
+                 max_frames: Optional[int] = None, duration: Optional[float] = None,
+                 recorder: Optional[FrameRecorder] = None, event_store: Optional[EventStore] = None,
+                 gap_timeout: float = 5.0):
+        self.logger = logging.getLogger(__name__)
+        self.face_detector = face_detector
+        self.source = source
+        self.writer = writer
+        self.stats_interval = stats_interval
+        self.max_frames = max_frames
+        self.duration = duration
+        self.recorder = recorder
+        self.event_store = event_store
+        self.presence = PresenceTracker(gap_timeout, on_start=self._session_start, on_end=self._session_end)
+
+        self.stop_event = threading.Event()
+        self.frames = 0
+        self.recognitions = 0
+        self.errors = 0
+        self._subscription = None
+
+    def stop(self, *_):
+        """Pede o encerramento do laço (seguro para handlers de sinal)"""
+        self.stop_event.set()
+
+    def _open(self) -> bool:
+        if self.source.is_live:
+            if not self.face_detector.initialize_camera(self.source):
+                return False
+            self._subscription = self.face_detector.subscribe_frames("headless")
+            return self._subscription is not None
+
+        # Fonte gravada: leitura sequencial, sem descartar frames
+        if not self.source.open():
+            self.logger.error(f"Não foi possível abrir a fonte de vídeo {self.source.name}")
+            return False
+        return True
+
+    def _read(self):
+        if self._subscription is not None:
+            frame = self._subscription.get(timeout=1.0, copy=False)
+            if frame is None:
+                return None
+            image, timestamp = frame.image, frame.timestamp
+        else:
+            ret, image = self.source.read()
+            if not ret:
+                if self.source.finished:
+                    self.stop_event.set()
+                return None
+            timestamp = self.source.timestamp
+
+        if self.recorder is not None:
+            self.recorder.write(image, timestamp)
+        return image
+
+    def _close(self):
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+        self.source.release()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.event_store is not None:
+            self.event_store.stop()
+        self.face_detector.cleanup()
+
+    def _session_start(self, session: PresenceSession):
+        self.writer.emit("session_start", name=session.name, frame=self.frames)
+
+    def _session_end(self, session: PresenceSession):
+        fields = {"name": session.name, "first_seen": round(session.first_seen, 3),
+                  "last_seen": round(session.last_seen, 3), "seconds": round(session.duration, 2)}
+        if session.peak_confidence is not None:
+            fields["peak_confidence"] = round(session.peak_confidence, 4)
+        self.writer.emit("session_end", **fields)
+
+    def _process(self, frame):
+        step = self.face_detector.track_faces(frame)
+        if step is None or not step.pending:
+            return
+
+        results = self.face_detector.recognize_tracks(step)
+        locations, _ = self.face_detector.tracks_result(step.pending)
+        if self.event_store is not None:
+            self.event_store.record_recognitions(self.source.name, locations, results)
+        for track, location, result in zip(step.pending, locations, results):
+            self.recognitions += 1
+            fields = {
+                "frame": self.frames,
+                "track": track.track_id,
+                "name": track.name,
+                "match": result if isinstance(result, str) else result.name,
+                "box": list(map(int, location))
+            }
+            if not isinstance(result, str):
+                fields["distance"] = round(result.distance, 4)
+            self.writer.emit("recognition", **fields)
+
+    def run(self) -> int:
+        """
+        Executa até o fim do vídeo, um limite ou um sinal
+
+        Returns:
+            int: Código de saída (0 = sucesso)
+        """
+        if not self._open():
+            self.writer.emit("error", message=f"fonte indisponível: {self.source.name}")
+            self._close()
+            return 1
+
+        self.writer.emit("start", source=self.source.name)
+        started = last_stats = time.monotonic()
+        frames_at_stats = 0
+
+        try:
+            while not self.stop_event.is_set():
+                if self.duration is not None and time.monotonic() - started >= self.duration:
+                    break
+
+                frame = self._read()
+                if frame is None:
+                    continue
+
+                self.frames += 1
+                try:
+                    self._process(frame)
+                    self.presence.observe(self.face_detector.tracker.tracks, self.source.name)
+                except Exception as e:
+                    # Um frame com erro não derruba o laço
+                    self.errors += 1
+                    self.logger.error(f"Erro ao processar frame {self.frames}: {e}")
+
+                now = time.monotonic()
+                if self.stats_interval > 0 and now - last_stats >= self.stats_interval:
+                    fps = (self.frames - frames_at_stats) / (now - last_stats)
+                    self.writer.emit("fps", fps=round(fps, 2), frames=self.frames,
+                                     tracks=len(self.face_detector.tracker.tracks))
+                    last_stats, frames_at_stats = now, self.frames
+
+                if self.max_frames is not None and self.frames >= self.max_frames:
+                    break
+        finally:
+            elapsed = time.monotonic() - started
+            self.presence.close_all()
+            self._close()
+            self.writer.emit(
+                "stop", frames=self.frames, recognitions=self.recognitions, errors=self.errors,
+                seconds=round(elapsed, 2), fps=round(self.frames / elapsed, 2) if elapsed > 0 else 0.0
+            )
+
+        return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Reconhecimento facial sem interface gráfica")
+    parser.add_argument("--rpi", action="store_true", help="usar o detector OpenCV/LBPH do Raspberry Pi")
+    parser.add_argument("--source", default=None,
+                        help="índice da câmera, vídeo, pasta de imagens ou gravação (padrão: configurações)")
+    parser.add_argument("--replay-mode", choices=("realtime", "fast"), default=None,
+                        help="ritmo das fontes gravadas (padrão: replay_mode das configurações)")
+    parser.add_argument("--speed", type=float, default=None, help="fator de velocidade no modo realtime")
+    parser.add_argument("--loop", action="store_true", help="repetir fontes gravadas")
+    parser.add_argument("--record", default=None, help="gravar os frames lidos nesta pasta (reproduzível)")
+    parser.add_argument("--faces-dir", default="data/faces", help="diretório da galeria")
+    parser.add_argument("--settings", default=SETTINGS_FILE, help="arquivo de configurações")
+    parser.add_argument("--json", action="store_true", help="eventos em JSON, um por linha")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="segundos entre eventos de FPS")
+    parser.add_argument("--max-frames", type=int, default=None, help="encerrar após N frames")
+    parser.add_argument("--duration", type=float, default=None, help="encerrar após S segundos")
+    parser.add_argument("--events", default=None,
+                        help="registro SQLite de detecções (padrão: event_store_path; \"\" desativa)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="porta do endpoint Prometheus /metrics (padrão: metrics_port das configurações)")
+    parser.add_argument("--log-level", default="INFO", help="nível de log (stderr e logs/)")
+    args = parser.parse_args(argv)
+
+    config = load_runtime_config(args.settings)
+    logger = setup_logger(getattr(logging, args.log_level.upper(), logging.INFO), **config.log_options)
+    logger.info("Iniciando reconhecimento facial sem interface gráfica")
+
+    face_detector = create_detector(args.rpi)
+    apply_detector_settings(face_detector, config)
+    face_detector.load_known_faces(args.faces_dir)
+
+    source = create_source(
+        args.source if args.source is not None else config.source,
+        mode=args.replay_mode or config.replay_mode,
+        speed=args.speed or config.replay_speed,
+        loop=args.loop
+    )
+    runner = HeadlessRunner(
+        face_detector, source, EventWriter(args.json),
+        stats_interval=args.stats_interval, max_frames=args.max_frames, duration=args.duration,
+        recorder=FrameRecorder(args.record) if args.record else None,
+        event_store=open_event_store(
+            args.events if args.events is not None else config.event_store_path,
+            config.event_retention_days, config.event_compact_after_days
+        ),
+        gap_timeout=config.presence_gap_timeout
+    )
+
+    signal.signal(signal.SIGINT, runner.stop)
+    signal.signal(signal.SIGTERM, runner.stop)
+
+    metrics_port = args.metrics_port if args.metrics_port is not None else config.metrics_port
+    metrics_server = start_metrics_server(face_detector, metrics_port, config.metrics_host)
+    try:
+        return runner.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
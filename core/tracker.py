@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rastreamento de rostos entre detecções completas
+
+A detecção (e o reconhecimento) roda a cada `detection_interval` frames ou
+quando algum rastro perde confiança. Nos frames intermediários as caixas são
+propagadas por fluxo óptico (Lucas-Kanade) e, na detecção seguinte, as novas
+caixas são associadas aos rastros existentes por IoU.
+
+A identidade fica presa ao rastro: um rastro reconhecido com segurança só é
+reverificado periodicamente ou quando a caixa salta; rastros novos ou
+desconhecidos têm prioridade no reconhecimento. Os nomes passam por uma
+votação curta para evitar oscilação.
+
+Caixas no formato do face_recognition: (top, right, bottom, left).
+"""
+
+import time
+from collections import Counter, deque
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from core.face_matcher import UNKNOWN_NAME
+
+Box = Tuple[int, int, int, int]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Interseção sobre união de duas caixas (top, right, bottom, left)"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    inter = max(0, bottom - top) * max(0, right - left)
+    if inter == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def associate(tracks_boxes: List[Box], detections: List[Box],
+              threshold: float) -> Tuple[List[Tuple[int, int]], List[int], List[int]]:
+    """
+    Associação gulosa por IoU decrescente
+
+    Args:
+        tracks_boxes: Caixas dos rastros
+        detections: Caixas detectadas
+        threshold: IoU mínimo para associar
+
+    Returns:
+        Tuple: (pares (rastro, detecção), rastros sem par, detecções sem par)
+    """
+    pairs = []
+    for t, track_box in enumerate(tracks_boxes):
+        for d, det_box in enumerate(detections):
+            overlap = box_iou(track_box, det_box)
+            if overlap >= threshold:
+                pairs.append((overlap, t, d))
+    pairs.sort(reverse=True)
+
+    matched = []
+    used_tracks, used_dets = set(), set()
+    for _, t, d in pairs:
+        if t in used_tracks or d in used_dets:
+            continue
+        matched.append((t, d))
+        used_tracks.add(t)
+        used_dets.add(d)
+
+    unmatched_tracks = [t for t in range(len(tracks_boxes)) if t not in used_tracks]
+    unmatched_dets = [d for d in range(len(detections)) if d not in used_dets]
+    return matched, unmatched_tracks, unmatched_dets
+
+
+def _box_jumped(old: Box, new: Box, ratio: float) -> bool:
+    """True se o centro moveu mais que `ratio` do tamanho da caixa ou a escala mudou muito"""
+    old_w, old_h = old[1] - old[3], old[2] - old[0]
+    new_w, new_h = new[1] - new[3], new[2] - new[0]
+    if old_w <= 0 or old_h <= 0:
+        return True
+
+    dx = abs((new[1] + new[3]) - (old[1] + old[3])) / 2.0
+    dy = abs((new[0] + new[2]) - (old[0] + old[2])) / 2.0
+    scale = (new_w * new_h) / float(old_w * old_h)
+    return dx > ratio * old_w or dy > ratio * old_h or not (0.5 <= scale <= 2.0)
+
+
+class Track:
+    """Rosto rastreado"""
+
+    def __init__(self, track_id: int, box: Box, vote_window: int = 5):
+        self.track_id = track_id
+        self.box = box
+        self.name = UNKNOWN_NAME
+        # Fração de pontos do fluxo óptico aceitos na última propagação
+        self.confidence = 1.0
+        self.frames_since_detection = 0
+
+        # Identidade: votos recentes, último reconhecimento e resultado bruto
+        self.votes = deque(maxlen=vote_window)
+        self.last_verified: Optional[float] = None
+        self.last_match = None
+        self.jumped = False
+        # Reconhecimento solicitado e ainda não concluído (pipeline assíncrono)
+        self.in_flight = False
+
+    @property
+    def is_identified(self) -> bool:
+        """True se a maioria dos votos (ao menos dois) aponta para uma identidade conhecida"""
+        if self.name == UNKNOWN_NAME or len(self.votes) < 2:
+            return False
+        return 2 * self.votes.count(self.name) > len(self.votes)
+
+    def add_vote(self, name: str, match=None, now: Optional[float] = None):
+        """
+        Registra um reconhecimento e atualiza o nome por maioria
+
+        Args:
+            name: Nome reconhecido
+            match: Resultado bruto do reconhecimento (opcional)
+            now: Instante do reconhecimento (padrão: time.monotonic())
+        """
+        self.votes.append(name)
+        self.last_match = match
+        self.last_verified = time.monotonic() if now is None else now
+        self.jumped = False
+
+        counts = Counter(self.votes)
+        best = max(counts.values())
+        # Empate: vence o voto mais recente entre os mais votados
+        for vote in reversed(self.votes):
+            if counts[vote] == best:
+                self.name = vote
+                break
+
+    def recognition_priority(self, now: float, reverify_interval: float) -> Optional[int]:
+        """
+        Prioridade de reconhecimento (menor = mais urgente; None = não precisa)
+
+        Args:
+            now: Instante atual
+            reverify_interval: Segundos entre reverificações de rastros identificados
+        """
+        if self.in_flight:
+            return None
+        if not self.votes:
+            return 0
+        if self.name == UNKNOWN_NAME:
+            return 1
+        if not self.is_identified:
+            return 2
+        if self.jumped:
+            return 3
+        if now - self.last_verified >= reverify_interval:
+            return 4
+        return None
+
+
+class TrackingStep(NamedTuple):
+    """Resultado da etapa de localização/rastreamento de um frame"""
+    tracks: List[Track]
+    # Rastros a reconhecer e suas caixas no instante do frame
+    pending: List[Track]
+    boxes: List[Box]
+    # Imagem (na escala das caixas) usada pelo reconhecimento
+    image: Any
+
+
+class FaceTracker:
+    """
+    Propaga caixas de rostos entre detecções completas
+
+    Parâmetros:
+        detection_interval: frames entre detecções completas
+        min_confidence: abaixo desta confiança de fluxo uma detecção é antecipada
+        iou_threshold: IoU mínimo para associar detecção a rastro
+        reverify_interval: segundos entre reverificações de rastros identificados
+        vote_window: reconhecimentos considerados na votação do nome
+        jump_ratio: deslocamento (fração da caixa) que força reverificação
+        recognition_budget: máximo de rostos reconhecidos por detecção (None = todos)
+    """
+
+    def __init__(self, detection_interval: int = 10, min_confidence: float = 0.5,
+                 iou_threshold: float = 0.3, max_points: int = 30,
+                 max_fb_error: float = 1.0, reverify_interval: float = 2.0,
+                 vote_window: int = 5, jump_ratio: float = 0.5,
+                 recognition_budget: Optional[int] = None):
+        self.detection_interval = detection_interval
+        self.min_confidence = min_confidence
+        self.iou_threshold = iou_threshold
+        self.max_points = max_points
+        self.max_fb_error = max_fb_error
+        self.reverify_interval = reverify_interval
+        self.vote_window = vote_window
+        self.jump_ratio = jump_ratio
+        self.recognition_budget = recognition_budget
+
+        self.tracks: List[Track] = []
+        self.frames_since_detection = 0
+        self._next_id = 0
+        self._prev_gray: Optional[np.ndarray] = None
+        self._lk_params = dict(
+            winSize=(15, 15),
+            maxLevel=2,
+            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+        )
+
+    def reset(self):
+        """Descarta todos os rastros (ex.: câmera reiniciada)"""
+        self.tracks = []
+        self._prev_gray = None
+        self.frames_since_detection = 0
+
+    def needs_detection(self) -> bool:
+        """True se o próximo frame deve passar pela detecção completa"""
+        if self._prev_gray is None or self.frames_since_detection >= self.detection_interval:
+            return True
+        return any(track.confidence < self.min_confidence for track in self.tracks)
+
+    def update_detections(self, gray: np.ndarray, boxes: List[Box]) -> List[Track]:
+        """
+        Incorpora as caixas de uma detecção completa
+
+        Os nomes não mudam aqui: use pending_recognition() para saber quais
+        rastros reconhecer e Track.add_vote() para registrar o resultado.
+
+        Args:
+            gray: Frame em escala de cinza (mesma escala das caixas)
+            boxes: Caixas detectadas
+
+        Returns:
+            List[Track]: Rastros ativos, na ordem das caixas detectadas
+        """
+        matched, _, unmatched_dets = associate([t.box for t in self.tracks], boxes, self.iou_threshold)
+
+        tracks: List[Optional[Track]] = [None] * len(boxes)
+        for t, d in matched:
+            track = self.tracks[t]
+            if _box_jumped(track.box, boxes[d], self.jump_ratio):
+                track.jumped = True
+            track.box = boxes[d]
+            tracks[d] = track
+        for d in unmatched_dets:
+            tracks[d] = Track(self._next_id, boxes[d], self.vote_window)
+            self._next_id += 1
+
+        # Rastros sem detecção correspondente são descartados
+        for track in tracks:
+            track.confidence = 1.0
+            track.frames_since_detection = 0
+
+        self.tracks = tracks
+        self.frames_since_detection = 0
+        self._prev_gray = gray
+        return self.tracks
+
+    def pending_recognition(self, now: Optional[float] = None) -> List[Track]:
+        """
+        Rastros que devem ser reconhecidos agora, do mais urgente ao menos
+
+        Novos e desconhecidos primeiro; depois não confirmados, caixas que
+        saltaram e reverificações vencidas. Limitado por recognition_budget.
+
+        Args:
+            now: Instante atual (padrão: time.monotonic())
+
+        Returns:
+            List[Track]: Rastros a reconhecer
+        """
+        now = time.monotonic() if now is None else now
+        ranked = []
+        for track in self.tracks:
+            priority = track.recognition_priority(now, self.reverify_interval)
+            if priority is not None:
+                ranked.append((priority, track.last_verified or 0.0, track.track_id, track))
+        ranked.sort(key=lambda item: item[:3])
+
+        pending = [item[3] for item in ranked]
+        if self.recognition_budget is not None:
+            pending = pending[:self.recognition_budget]
+        return pending
+
+    def propagate(self, gray: np.ndarray) -> List[Track]:
+        """
+        Move os rastros para o frame atual por fluxo óptico
+
+        Args:
+            gray: Frame em escala de cinza
+
+        Returns:
+            List[Track]: Rastros ativos
+        """
+        self.frames_since_detection += 1
+        prev_gray, self._prev_gray = self._prev_gray, gray
+        if prev_gray is None or not self.tracks:
+            return self.tracks
+
+        # Pontos de todos os rastros em uma única chamada de fluxo
+        seeds = [self._seed_points(prev_gray, track.box) for track in self.tracks]
+        counts = [len(points) for points in seeds]
+        if sum(counts) == 0:
+            for track in self.tracks:
+                track.confidence = 0.0
+            return self.tracks
+
+        points = np.concatenate([p for p in seeds if len(p)]).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **self._lk_params)
+        back, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, moved, None, **self._lk_params)
+
+        # Verificação ida-e-volta descarta pontos instáveis
+        fb_error = np.linalg.norm(points - back, axis=2).ravel()
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        height, width = gray.shape[:2]
+        offset = 0
+        for track, count in zip(self.tracks, counts):
+            selected = slice(offset, offset + count)
+            offset += count
+            track.frames_since_detection += 1
+
+            keep = good[selected]
+            track.confidence = float(keep.mean()) if count else 0.0
+            if keep.sum() < 3:
+                track.confidence = 0.0
+                continue
+
+            before = points[selected][keep].reshape(-1, 2)
+            after = moved[selected][keep].reshape(-1, 2)
+            track.box = self._move_box(track.box, before, after, width, height)
+
+        return self.tracks
+
+    def _seed_points(self, gray: np.ndarray, box: Box) -> np.ndarray:
+        """Cantos (Shi-Tomasi) dentro da caixa, em coordenadas do frame"""
+        top, right, bottom, left = box
+        top, left = max(0, top), max(0, left)
+        if bottom - top < 8 or right - left < 8:
+            return np.zeros((0, 2), dtype=np.float32)
+
+        corners = cv2.goodFeaturesToTrack(
+            gray[top:bottom, left:right], maxCorners=self.max_points,
+            qualityLevel=0.01, minDistance=3
+        )
+        if corners is None:
+            return np.zeros((0, 2), dtype=np.float32)
+        return (corners.reshape(-1, 2) + (left, top)).astype(np.float32)
+
+    @staticmethod
+    def _move_box(box: Box, before: np.ndarray, after: np.ndarray, width: int, height: int) -> Box:
+        """Translada (mediana dos deslocamentos) e escala (mediana das razões de distância)"""
+        dx, dy = np.median(after - before, axis=0)
+
+        scale = 1.0
+        if len(before) >= 4:
+            i, j = np.triu_indices(len(before), k=1)
+            d_before = np.linalg.norm(before[i] - before[j], axis=1)
+            d_after = np.linalg.norm(after[i] - after[j], axis=1)
+            valid = d_before > 1e-3
+            if valid.any():
+                scale = float(np.clip(np.median(d_after[valid] / d_before[valid]), 0.8, 1.25))
+
+        top, right, bottom, left = box
+        cx = (left + right) / 2.0 + dx
+        cy = (top + bottom) / 2.0 + dy
+        half_w = (right - left) * scale / 2.0
+        half_h = (bottom - top) * scale / 2.0
+
+        return (
+            int(max(0, round(cy - half_h))),
+            int(min(width, round(cx + half_w))),
+            int(min(height, round(cy + half_h))),
+            int(max(0, round(cx - half_w)))
+        )
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fontes de vídeo intercambiáveis: câmera, arquivo, pasta de imagens e gravação
+
+Todas seguem a interface de cv2.VideoCapture usada pelo FrameReader
+(isOpened, read, release), de modo que detectores, GUI e execução sem
+interface funcionam igual com uma webcam ou com material gravado em campo.
+Fontes gravadas reproduzem em tempo real (com fator de velocidade), o mais
+rápido possível ou quadro a quadro (step()).
+"""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from core.gallery import is_image_file
+from utils.logger import get_logger
+
+REPLAY_REALTIME = "realtime"
+REPLAY_FAST = "fast"
+REPLAY_STEP = "step"
+REPLAY_MODES = (REPLAY_REALTIME, REPLAY_FAST, REPLAY_STEP)
+
+# Índice de uma gravação feita com FrameRecorder
+REPLAY_INDEX = "frames.jsonl"
+
+
+def source_name(spec: Union[int, str, "VideoSource"]) -> str:
+    """Identificação estável de uma fonte (para comparar configurações)"""
+    if isinstance(spec, VideoSource):
+        return spec.name
+    if isinstance(spec, int) or str(spec).isdigit():
+        return f"camera:{int(spec)}"
+    return os.path.abspath(str(spec))
+
+
+class VideoSource(ABC):
+    """
+    Fonte de frames BGR com a interface de cv2.VideoCapture
+
+    Atributos:
+        name: identificação da fonte
+        is_live: True para dispositivos (frames perdidos se não lidos a tempo)
+        finished: fonte gravada chegou ao fim
+        timestamp: instante do último frame lido na gravação (None em câmeras)
+    """
+
+    is_live = False
+
+    def __init__(self, name: str):
+        self.logger = get_logger(__name__)
+        self.name = name
+        self.finished = False
+        self.timestamp: Optional[float] = None
+        self.frames_read = 0
+
+    @abstractmethod
+    def open(self) -> bool:
+        """Abre a fonte; False se indisponível"""
+
+    @abstractmethod
+    def isOpened(self) -> bool:
+        """True enquanto houver frames a ler"""
+
+    @abstractmethod
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """Próximo frame, como cv2.VideoCapture.read()"""
+
+    @abstractmethod
+    def release(self):
+        """Libera o dispositivo ou arquivo"""
+
+    @property
+    def fps(self) -> float:
+        """Taxa nominal de quadros (0 se desconhecida)"""
+        return 0.0
+
+    @property
+    def paused(self) -> bool:
+        """True enquanto a fonte aguarda step() no modo quadro a quadro"""
+        return False
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+
+class CameraSource(VideoSource):
+    """Câmera local (índice do cv2.VideoCapture)"""
+
+    is_live = True
+
+    def __init__(self, index: int = 0, width: Optional[int] = None, height: Optional[int] = None):
+        super().__init__(source_name(index))
+        self.index = index
+        self.width = width
+        self.height = height
+        self._capture = None
+
+    def open(self) -> bool:
+        self._capture = cv2.VideoCapture(self.index)
+        if not self._capture.isOpened():
+            return False
+        if self.width and self.height:
+            self._capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            self._capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return True
+
+    def isOpened(self) -> bool:
+        return self._capture is not None and self._capture.isOpened()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._capture is None:
+            return False, None
+        ret, image = self._capture.read()
+        if ret:
+            self.frames_read += 1
+        return ret, image
+
+    def release(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    @property
+    def fps(self) -> float:
+        return self._capture.get(cv2.CAP_PROP_FPS) if self._capture is not None else 0.0
+
+
+class PlaybackSource(VideoSource):
+    """
+    Base das fontes gravadas: ritmo de reprodução, repetição e modo quadro a quadro
+
+    Parâmetros:
+        mode: REPLAY_REALTIME, REPLAY_FAST ou REPLAY_STEP
+        speed: fator de velocidade no modo tempo real (2.0 = duas vezes mais rápido)
+        loop: recomeçar ao chegar ao fim
+    """
+
+    def __init__(self, name: str, mode: str = REPLAY_REALTIME, speed: float = 1.0, loop: bool = False):
+        super().__init__(name)
+        if mode not in REPLAY_MODES:
+            raise ValueError(f"Modo de reprodução inválido: {mode}")
+        self.mode = mode
+        self.speed = speed if speed > 0 else 1.0
+        self.loop = loop
+
+        self._opened = False
+        self._steps = threading.Semaphore(0)
+        self._waiting = False
+        self._clock_start: Optional[float] = None
+        self._first_timestamp: Optional[float] = None
+
+    @abstractmethod
+    def _next_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        """Próximo (frame, instante em segundos) ou None no fim"""
+
+    @abstractmethod
+    def _rewind(self):
+        """Volta ao primeiro frame (repetição)"""
+
+    def open(self) -> bool:
+        self._opened = True
+        self.finished = False
+        return True
+
+    def isOpened(self) -> bool:
+        return self._opened and not self.finished
+
+    def release(self):
+        self._opened = False
+        # Liberar um read() bloqueado no modo quadro a quadro
+        self._steps.release()
+
+    @property
+    def paused(self) -> bool:
+        return self._waiting
+
+    def step(self, frames: int = 1):
+        """Libera a leitura de mais `frames` frames (modo REPLAY_STEP)"""
+        for _ in range(max(0, frames)):
+            self._steps.release()
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self._opened or self.finished:
+            return False, None
+
+        if self.mode == REPLAY_STEP:
+            # Sem step(): continua pausada (o FrameReader não conta como erro)
+            self._waiting = True
+            if not self._steps.acquire(timeout=0.1) or not self._opened:
+                return False, None
+            self._waiting = False
+
+        item = self._next_frame()
+        if item is None and self.loop and self.frames_read > 0:
+            self._rewind()
+            self._clock_start = None
+            item = self._next_frame()
+        if item is None:
+            self.finished = True
+            self.logger.info(f"Fim da fonte de vídeo {self.name}")
+            return False, None
+
+        image, timestamp = item
+        if self.mode == REPLAY_REALTIME:
+            self._pace(timestamp)
+        self.timestamp = timestamp
+        self.frames_read += 1
+        return True, image
+
+    def _pace(self, timestamp: float):
+        """Espera até o instante do frame na escala da gravação"""
+        now = time.monotonic()
+        if self._clock_start is None:
+            self._clock_start = now
+            self._first_timestamp = timestamp
+            return
+        wait = self._clock_start + (timestamp - self._first_timestamp) / self.speed - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+class VideoFileSource(PlaybackSource):
+    """Arquivo de vídeo (qualquer formato lido pelo OpenCV)"""
+
+    def __init__(self, path: str, **options):
+        super().__init__(source_name(path), **options)
+        self.path = path
+        self._capture = None
+        self._fps = 0.0
+
+    def open(self) -> bool:
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            self._capture = None
+            return False
+        self._fps = self._capture.get(cv2.CAP_PROP_FPS) or 30.0
+        return super().open()
+
+    def _next_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        ret, image = self._capture.read()
+        if not ret:
+            return None
+        position = self._capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        # Alguns backends não informam a posição: usar a taxa nominal
+        return image, position if position > 0 else self.frames_read / self._fps
+
+    def _rewind(self):
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        super().release()
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+    @property
+    def fps(self) -> float:
+        return self._fps
+
+
+class ImageSequenceSource(PlaybackSource):
+    """Pasta de imagens lidas em ordem alfabética a uma taxa fixa"""
+
+    def __init__(self, directory: str, frame_rate: float = 10.0, **options):
+        super().__init__(source_name(directory), **options)
+        self.directory = directory
+        self.frame_rate = frame_rate if frame_rate > 0 else 10.0
+        self.files: List[str] = []
+        self._position = 0
+
+    def open(self) -> bool:
+        if not os.path.isdir(self.directory):
+            return False
+        self.files = [
+            os.path.join(self.directory, name)
+            for name in sorted(os.listdir(self.directory)) if is_image_file(name)
+        ]
+        self._position = 0
+        return bool(self.files) and super().open()
+
+    def _next_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        while self._position < len(self.files):
+            index = self._position
+            self._position += 1
+            image = cv2.imread(self.files[index])
+            if image is not None:
+                return image, index / self.frame_rate
+            self.logger.warning(f"Imagem ilegível ignorada: {self.files[index]}")
+        return None
+
+    def _rewind(self):
+        self._position = 0
+
+    @property
+    def fps(self) -> float:
+        return self.frame_rate
+
+
+class ReplaySource(ImageSequenceSource):
+    """
+    Gravação com instantes originais (FrameRecorder), reproduzida com o
+    mesmo espaçamento entre frames em que foi capturada
+
+    Várias gravações na mesma pasta são reproduzidas em sequência, sem
+    esperar o intervalo real entre uma e outra.
+    """
+
+    def __init__(self, directory: str, **options):
+        super().__init__(directory, **options)
+        self.timestamps: List[float] = []
+        self.sessions: List[int] = []
+
+    def open(self) -> bool:
+        index_file = os.path.join(self.directory, REPLAY_INDEX)
+        if not os.path.exists(index_file):
+            return False
+
+        self.files, self.timestamps, self.sessions = [], [], []
+        for entry in read_replay_index(self.directory):
+            self.files.append(os.path.join(self.directory, entry["file"]))
+            self.timestamps.append(float(entry["timestamp"]))
+            self.sessions.append(int(entry.get("session", 0)))
+
+        self._position = 0
+        return bool(self.files) and PlaybackSource.open(self)
+
+    def _next_frame(self) -> Optional[Tuple[np.ndarray, float]]:
+        item = super()._next_frame()
+        if item is None:
+            return None
+        position = self._position - 1
+        if position > 0 and self.sessions[position] != self.sessions[position - 1]:
+            # Nova gravação: o relógio recomeça neste frame
+            self._clock_start = None
+        return item[0], self.timestamps[position]
+
+    @property
+    def fps(self) -> float:
+        if len(self.timestamps) < 2 or self.timestamps[-1] <= self.timestamps[0]:
+            return 0.0
+        return (len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0])
+
+
+def read_replay_index(directory: str) -> List[dict]:
+    """Entradas do índice de uma pasta de gravação (vazio se não houver)"""
+    index_file = os.path.join(directory, REPLAY_INDEX)
+    if not os.path.exists(index_file):
+        return []
+    entries = []
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+class FrameRecorder:
+    """
+    Grava frames com seus instantes em uma pasta reproduzível por ReplaySource
+
+    Gravar de novo na mesma pasta acrescenta uma nova sessão: a numeração
+    continua depois do último frame existente, sem sobrescrever nada.
+
+    Parâmetros:
+        directory: pasta de destino (criada se não existir)
+        quality: qualidade JPEG
+    """
+
+    def __init__(self, directory: str, quality: int = 90):
+        self.directory = directory
+        self.quality = quality
+        os.makedirs(directory, exist_ok=True)
+
+        entries = read_replay_index(directory)
+        self.session = max((int(entry.get("session", 0)) for entry in entries), default=-1) + 1
+        # Também os JPEGs sem entrada no índice (gravação interrompida)
+        numbers = [
+            int(os.path.splitext(name)[0]) for name in os.listdir(directory)
+            if name.endswith(".jpg") and os.path.splitext(name)[0].isdigit()
+        ]
+        self._next_number = max(numbers, default=0) + 1
+        self.frames = 0
+        self._index = open(os.path.join(directory, REPLAY_INDEX), 'a', encoding='utf-8')
+
+    def write(self, image: np.ndarray, timestamp: Optional[float] = None):
+        """Grava um frame (instante padrão: agora)"""
+        filename = f"{self._next_number:06d}.jpg"
+        self._next_number += 1
+        self.frames += 1
+        cv2.imwrite(os.path.join(self.directory, filename), image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        entry = {
+            "file": filename, "timestamp": time.time() if timestamp is None else timestamp,
+            "session": self.session
+        }
+        self._index.write(json.dumps(entry) + "\n")
+        self._index.flush()
+
+    def close(self):
+        self._index.close()
+
+
+def create_source(spec: Union[int, str, VideoSource], width: Optional[int] = None,
+                  height: Optional[int] = None, **options) -> VideoSource:
+    """
+    Cria a fonte correspondente a um índice, caminho ou fonte já construída
+
+    Args:
+        spec: Índice da câmera, arquivo de vídeo, pasta de imagens, pasta de
+            gravação (com frames.jsonl) ou VideoSource
+        width: Largura pedida à câmera (se ela ainda não tiver uma)
+        height: Altura pedida à câmera (se ela ainda não tiver uma)
+        options: mode/speed/loop para fontes gravadas
+
+    Returns:
+        VideoSource: Fonte ainda não aberta (exceto se já recebida aberta)
+    """
+    if isinstance(spec, CameraSource) and spec.width is None:
+        # Câmera sem resolução definida: usar a pedida pelo consumidor
+        spec.width, spec.height = width, height
+    if isinstance(spec, VideoSource):
+        return spec
+    if isinstance(spec, int) or str(spec).strip().isdigit():
+        return CameraSource(int(spec), width, height)
+
+    path = str(spec)
+    if os.path.isdir(path):
+        if os.path.exists(os.path.join(path, REPLAY_INDEX)):
+            return ReplaySource(path, **options)
+        return ImageSequenceSource(path, **options)
+    return VideoFileSource(path, **options)
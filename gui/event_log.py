@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Painel de eventos com capacidade fixa
+"""
+
+import threading
+from collections import deque
+from typing import List
+
+import tkinter as tk
+
+
+class EventLogView:
+    """
+    Mantém as últimas `capacity` linhas em um tk.Text somente leitura
+
+    As linhas novas ficam em um buffer circular e são inseridas no widget de
+    uma vez, no máximo a cada `refresh_ms`; as mais antigas são removidas do
+    topo. O histórico completo fica no arquivo de log e no registro de
+    detecções, não no widget.
+
+    Parâmetros:
+        root: janela Tk (agenda as atualizações)
+        text: widget de texto do painel
+        capacity: linhas mantidas no painel
+        refresh_ms: intervalo mínimo entre atualizações do widget
+    """
+
+    def __init__(self, root, text: tk.Text, capacity: int = 500, refresh_ms: int = 250):
+        self.root = root
+        self.text = text
+        self.capacity = max(1, capacity)
+        self.refresh_ms = refresh_ms
+        self._lock = threading.Lock()
+        self._lines = deque(maxlen=self.capacity)
+        # Linhas ainda não exibidas (o excedente à capacidade nunca chega ao widget)
+        self._pending = deque(maxlen=self.capacity)
+        self._shown = 0
+        self._job = None
+
+    def append(self, line: str):
+        """Acrescenta uma linha; o widget é atualizado no próximo ciclo"""
+        with self._lock:
+            self._lines.append(line)
+            self._pending.append(line)
+        if self._job is None:
+            self._job = self.root.after(self.refresh_ms, self._flush)
+
+    def lines(self) -> List[str]:
+        """Linhas atualmente no buffer (mais antiga primeiro)"""
+        with self._lock:
+            return list(self._lines)
+
+    def set_capacity(self, capacity: int):
+        """Troca a capacidade mantendo as linhas mais recentes"""
+        capacity = max(1, capacity)
+        if capacity == self.capacity:
+            return
+        with self._lock:
+            self.capacity = capacity
+            self._lines = deque(self._lines, maxlen=capacity)
+            self._pending = deque(self._pending, maxlen=capacity)
+        if self._job is None:
+            self._job = self.root.after(self.refresh_ms, self._flush)
+
+    def _flush(self):
+        self._job = None
+        with self._lock:
+            pending = list(self._pending)
+            self._pending.clear()
+
+        # Rolar só se o usuário estava no fim (não arrancar quem lê o histórico)
+        at_end = self.text.yview()[1] >= 1.0
+
+        self.text.config(state=tk.NORMAL)
+        if pending:
+            self.text.insert(tk.END, "".join(line + "\n" for line in pending))
+            self._shown += len(pending)
+        excess = self._shown - self.capacity
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self._shown = self.capacity
+        self.text.config(state=tk.DISABLED)
+
+        if at_end:
+            self.text.see(tk.END)
+
+    def cancel(self):
+        """Cancela a atualização agendada (ao fechar a janela)"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
@@ -14,7 +14,13 @@ import time
 from core.face_detector_rpi import FaceDetectorRPi
 from gui.profile_manager import ProfileManager
 from gui.settings_window import SettingsWindow
+from gui.event_log import EventLogView
+from core.event_store import open_event_store
+from core.pipeline import VideoPipeline
+from core.presence import PresenceTracker
 from utils.logger import get_logger
+from utils.metrics_server import start_metrics_server
+from utils.settings import SettingsWatcher, apply_detector_settings, load_runtime_config
 
 class MainWindowRPi:
     """Janela principal da aplicação - Versão otimizada para Raspberry Pi"""
@@ -26,12 +32,35 @@ class MainWindowRPi:
         # Inicializar detector facial para RPi
         self.face_detector = FaceDetectorRPi()
         
+        # Configurações aplicadas ao vivo (settings.json observado em segundo plano)
+        self.config = load_runtime_config()
+        apply_detector_settings(self.face_detector, self.config)
+        self.settings_watcher = SettingsWatcher(
+            lambda config: self.root.after(0, self.apply_config, config)
+        )
+        self.settings_watcher.start()
+        
         # Variáveis de controle
         self.camera_active = False
-        self.video_thread = None
-        self.last_detections = ([], [])
+        self.pipeline = None
+        self.performance_job = None
+        self.display_pending = False
+        self.loading_thread = None
         self.video_image_id = None
         
+        # Endpoint Prometheus opcional (metrics_port > 0)
+        self.metrics_server = self.start_metrics_server()
+        
+        # Registro consultável de detecções (gravado em segundo plano)
+        self.event_store = self.open_event_store()
+        
+        # Sessões de presença: só a chegada e a saída de cada pessoa vão para o log
+        self.presence = PresenceTracker(
+            self.config.presence_gap_timeout,
+            on_start=self.on_presence_start,
+            on_end=self.on_presence_end
+        )
+        
         # Configurar interface
         self.setup_ui()
         
@@ -289,11 +318,29 @@ class MainWindowRPi:
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         log_scrollbar.config(command=self.log_text.yview)
         
+        # Últimas linhas apenas; o histórico completo vai para logs/ e para o registro de detecções
+        self.event_log = EventLogView(self.root, self.log_text, self.config.event_log_lines)
+        
         status_frame.rowconfigure(7, weight=1)
+        
+        # Desempenho: FPS, descartes e latência p50/p95 de cada etapa
+        ttk.Label(status_frame, text="Desempenho:", font=("Arial", 9, "bold")).grid(
+            row=8, column=0, sticky=tk.W, pady=(0, 5)
+        )
+        
+        self.performance_text = tk.Text(
+            status_frame,
+            height=7,
+            width=25,
+            font=("Courier", 8),
+            wrap=tk.NONE,
+            state=tk.DISABLED
+        )
+        self.performance_text.grid(row=9, column=0, sticky=(tk.W, tk.E))
     
     def initialize_camera(self):
         """Inicializa a câmera"""
-        success = self.face_detector.initialize_camera()
+        success = self.face_detector.initialize_camera(self.config.source, **self.config.source_options)
         if not success:
             self.log_event("Erro: Não foi possível inicializar a câmera")
             messagebox.showerror("Erro", "Não foi possível acessar a câmera.")
@@ -308,16 +355,26 @@ class MainWindowRPi:
     def start_camera(self):
         """Inicia o feed da câmera"""
         if not self.camera_active:
-            success = self.face_detector.initialize_camera()
+            success = self.face_detector.initialize_camera(self.config.source, **self.config.source_options)
             if success:
                 self.camera_active = True
                 self.camera_button.config(text="Parar Câmera")
                 self.capture_button.config(state=tk.NORMAL)
                 self.camera_status.config(text="Ligada", foreground="green")
                 
-                # Iniciar thread de vídeo
-                self.video_thread = threading.Thread(target=self.video_loop, daemon=True)
-                self.video_thread.start()
+                # Iniciar pipeline: captura -> detecção -> reconhecimento -> anotação -> exibição
+                self.pipeline = VideoPipeline(
+                    self.face_detector,
+                    display=self.schedule_display,
+                    on_recognized=self.on_faces_recognized,
+                    queue_size=self.config.pipeline_queue_size,
+                    drop_policy=self.config.pipeline_drop_policy,
+                    frame_interval=self.config.detection_interval / 1000.0,
+                    presence=self.presence
+                )
+                self.pipeline.start()
+                self.face_detector.timings.reset()
+                self.update_performance_panel()
                 
                 self.log_event("Câmera iniciada")
             else:
@@ -327,6 +384,12 @@ class MainWindowRPi:
         """Para o feed da câmera"""
         if self.camera_active:
             self.camera_active = False
+            if self.performance_job is not None:
+                self.root.after_cancel(self.performance_job)
+                self.performance_job = None
+            if self.pipeline is not None:
+                self.pipeline.stop()
+            self.presence.close_all()
             self.camera_button.config(text="Iniciar Câmera")
             self.capture_button.config(state=tk.DISABLED)
             self.camera_status.config(text="Desligada", foreground="red")
@@ -342,47 +405,103 @@ class MainWindowRPi:
             )
             
             self.log_event("Câmera parada")
+            
+            # Vazão de cada etapa do pipeline
+            if self.pipeline is not None:
+                stages = self.pipeline.stats()["stages"]
+                rates = ", ".join(f"{name} {info['rate']:.1f}/s" for name, info in stages.items())
+                self.log_event(f"Etapas: {rates}")
+                latency = self.pipeline.stats()["latency"]
+                p95 = ", ".join(f"{name} {info['p95_ms']:.1f}ms" for name, info in latency.items() if info["count"])
+                if p95:
+                    self.log_event(f"Latência p95: {p95}")
+                self.pipeline = None
+            
+            # Frames lidos e descartados pela thread de captura
+            reader = self.face_detector.frame_reader
+            if reader is not None and reader.frames_read:
+                self.log_event(f"Captura: {reader.frames_read} frames, {reader.dropped} descartados")
+            
+            # Eficiência do filtro de movimento na sessão
+            gate = self.face_detector.motion_gate
+            if gate.frames:
+                self.log_event(f"Filtro de movimento: {gate.hit_rate:.0%} de {gate.frames} frames sem detecção")
+                gate.reset_stats()
+            
+            cache = self.face_detector.recognition_cache
+            if cache.hits or cache.misses:
+                self.log_event(f"Cache de reconhecimento: {cache.hit_rate:.0%} de acertos ({cache.hits}/{cache.hits + cache.misses})")
+                cache.reset_stats()
     
-    def video_loop(self):
-        """Loop principal do vídeo - otimizado para RPi"""
-        frame_count = 0
-        last_detection_frame = 0
-        
-        while self.camera_active:
-            try:
-                frame = self.face_detector.get_frame()
-                if frame is not None:
-                    frame_count += 1
-                    
-                    # Detectar rostos apenas a cada 5 frames para reduzir processamento
-                    if frame_count - last_detection_frame >= 5:
-                        face_locations, face_names = self.face_detector.detect_faces(frame)
-                        last_detection_frame = frame_count
-                        
-                        # Log de detecções (apenas uma vez por pessoa)
-                        for name in face_names:
-                            if name != "Desconhecido":
-                                self.log_event(f"Detectado: {name}")
-                    else:
-                        # Usar detecções da frame anterior
-                        face_locations, face_names = getattr(self, 'last_detections', ([], []))
-                    
-                    # Armazenar detecções para próxima frame
-                    self.last_detections = (face_locations, face_names)
-                    
-                    # Desenhar retângulos
-                    frame_with_faces = self.face_detector.draw_face_rectangles(
-                        frame, face_locations, face_names
-                    )
-                    
-                    # Converter para Tkinter - usar schedule_idle para evitar flickering
-                    self.root.after_idle(self.update_video_display, frame_with_faces)
-                
-                time.sleep(0.1)  # ~10 FPS para RPi
-                
-            except Exception as e:
-                self.logger.error(f"Erro no loop de vídeo: {e}")
-                break
+    def schedule_display(self, frame):
+        """Entrega um frame anotado à thread da interface (chamado pela etapa de exibição)"""
+        # Interface ainda ocupada com o frame anterior: descartar este
+        if self.display_pending or not self.camera_active:
+            return False
+        
+        self.display_pending = True
+        self.root.after_idle(self.show_frame, frame)
+        return True
+    
+    def show_frame(self, frame):
+        """Exibe um frame na thread da interface"""
+        try:
+            if self.camera_active:
+                self.update_video_display(frame)
+        finally:
+            self.display_pending = False
+    
+    def performance_stats(self) -> dict:
+        """FPS, descartes e latências atuais (as mesmas exibidas no painel)"""
+        stats = self.pipeline.stats() if self.pipeline is not None else {
+            "stages": {}, "queues": {}, "drops": {}, "latency": self.face_detector.timings.snapshot()
+        }
+        reader = self.face_detector.frame_reader
+        stats["capture_fps"] = reader.fps if reader is not None else 0.0
+        stats["display_fps"] = stats["stages"].get("display", {}).get("rate", 0.0)
+        return stats
+    
+    def update_performance_panel(self):
+        """Atualiza o painel de desempenho uma vez por segundo enquanto a câmera estiver ligada"""
+        if not self.camera_active:
+            return
+        
+        try:
+            stats = self.performance_stats()
+            lines = [
+                f"FPS {stats['display_fps']:.1f} (câm {stats['capture_fps']:.1f})",
+                f"Descartes: {sum(stats['drops'].values())}",
+                f"{'etapa':<11}{'p50':>6}{'p95':>7}"
+            ]
+            for name, latency in stats["latency"].items():
+                if latency["count"]:
+                    short = name[len("stage."):] if name.startswith("stage.") else name
+                    lines.append(f"{short[:11]:<11}{latency['p50_ms']:>6.1f}{latency['p95_ms']:>7.1f}")
+            
+            self.performance_text.configure(state=tk.NORMAL)
+            self.performance_text.delete(1.0, tk.END)
+            self.performance_text.insert(tk.END, "\n".join(lines))
+            self.performance_text.configure(state=tk.DISABLED)
+        except Exception as e:
+            self.logger.error(f"Erro ao atualizar desempenho: {e}")
+        
+        self.performance_job = self.root.after(1000, self.update_performance_panel)
+    
+    def on_faces_recognized(self, tracks, results):
+        """Registra identidades reconhecidas (chamado pela etapa de reconhecimento)"""
+        if self.event_store is not None:
+            locations, _ = self.face_detector.tracks_result(tracks)
+            self.event_store.record_recognitions(self.face_detector.source_name or "", locations, results)
+    
+    def on_presence_start(self, session):
+        """Pessoa passou a ser vista (chamado pela etapa de anotação)"""
+        if self.config.log_detections:
+            self.root.after(0, self.log_event, f"Chegou: {session.name}")
+    
+    def on_presence_end(self, session):
+        """Pessoa deixou de ser vista por presence_gap_timeout segundos"""
+        if self.config.log_detections:
+            self.root.after(0, self.log_event, f"Saiu: {session.describe()}")
     
     def update_video_display(self, frame):
         """Atualiza a exibição do vídeo"""
@@ -390,15 +509,17 @@ class MainWindowRPi:
             if not self.camera_active:
                 return
                 
-            # Converter BGR para RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Redimensionar frame para ocupar todo o canvas (320x240)
-            rgb_frame = cv2.resize(rgb_frame, (320, 240))
-            
-            # Converter para PIL Image
-            pil_image = Image.fromarray(rgb_frame)
-            photo = ImageTk.PhotoImage(image=pil_image)
+            # Conversão para o Tk medida como "tk_convert"
+            with self.face_detector.timings.measure("tk_convert"):
+                # Converter BGR para RGB
+                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                
+                # Redimensionar frame para ocupar todo o canvas (320x240)
+                rgb_frame = cv2.resize(rgb_frame, (320, 240))
+                
+                # Converter para PIL Image
+                pil_image = Image.fromarray(rgb_frame)
+                photo = ImageTk.PhotoImage(image=pil_image)
             
             # Atualizar canvas sem deletar tudo (evita flickering)
             if hasattr(self, 'video_image_id'):
@@ -418,19 +539,23 @@ class MainWindowRPi:
             messagebox.showwarning("Aviso", "Digite um nome para o rosto.")
             return
         
-        # Verificar se já existe
+        # Verificar se já existe: adicionar nova amostra ou substituir
+        append = False
         if name in self.face_detector.known_names:
-            result = messagebox.askyesno(
+            result = messagebox.askyesnocancel(
                 "Confirmar", 
-                f"Já existe um rosto cadastrado com o nome '{name}'.\nDeseja substituir?"
+                f"Já existe um rosto cadastrado com o nome '{name}'.\n\n"
+                "Sim: adicionar como nova amostra\n"
+                "Não: substituir as amostras existentes"
             )
-            if not result:
+            if result is None:
                 return
+            append = result
         
-        success = self.face_detector.capture_face(name)
+        success = self.face_detector.capture_face(name, append=append)
         if success:
             self.name_entry.delete(0, tk.END)
-            self.refresh_known_faces()
+            self.update_faces_list()
             self.log_event(f"Rosto capturado: {name}")
             messagebox.showinfo("Sucesso", f"Rosto de '{name}' cadastrado com sucesso!")
         else:
@@ -449,30 +574,45 @@ class MainWindowRPi:
             messagebox.showerror("Erro", f"Erro ao retreinar modelo: {str(e)}")
     
     def refresh_known_faces(self):
-        """Atualiza a lista de rostos conhecidos"""
-        count = self.face_detector.load_known_faces()
-        self.faces_count.config(text=f"{count} rostos")
+        """Recarrega os rostos conhecidos do disco em segundo plano e atualiza a lista"""
+        if self.loading_thread and self.loading_thread.is_alive():
+            return
+        
+        self.loading_thread = threading.Thread(target=self.load_faces_worker, daemon=True)
+        self.loading_thread.start()
+    
+    def load_faces_worker(self):
+        """Carrega a galeria fora da thread da interface"""
+        def progress(done, total):
+            self.root.after(0, lambda: self.faces_count.config(text=f"Codificando {done}/{total}..."))
+        
+        count = self.face_detector.load_known_faces(progress_callback=progress)
+        self.root.after(0, lambda: self.on_faces_loaded(count))
+    
+    def on_faces_loaded(self, count):
+        """Executado na thread da interface ao fim do carregamento"""
+        self.update_faces_list()
+        self.log_event(f"Lista atualizada: {count} rostos")
+    
+    def update_faces_list(self):
+        """Atualiza a lista exibida a partir da galeria em memória"""
+        names = list(self.face_detector.known_names)
+        self.faces_count.config(text=f"{len(names)} rostos")
         
         # Atualizar listbox
         self.faces_listbox.delete(0, tk.END)
-        for name in self.face_detector.known_names:
+        for name in names:
             self.faces_listbox.insert(tk.END, name)
-        
-        self.log_event(f"Lista atualizada: {count} rostos")
     
     def log_event(self, message):
-        """Adiciona evento ao log"""
+        """Adiciona evento ao painel (limitado a event_log_lines) e ao arquivo de log"""
+        self.logger.info(message)
         timestamp = time.strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        
-        self.log_text.config(state=tk.NORMAL)
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.log_text.config(state=tk.DISABLED)
+        self.event_log.append(f"[{timestamp}] {message}")
     
     def open_profile_manager(self):
         """Abre o gerenciador de perfis"""
-        ProfileManager(self.root, self.face_detector, self.refresh_known_faces)
+        ProfileManager(self.root, self.face_detector, self.update_faces_list)
     
     def open_settings(self):
         """Abre as configurações"""
@@ -497,8 +637,60 @@ Otimizações para RPi:
 © 2024"""
         messagebox.showinfo("Sobre", about_text)
     
+    def apply_config(self, config):
+        """Aplica configurações recarregadas sem parar a câmera"""
+        previous = self.config
+        self.config = config
+        apply_detector_settings(self.face_detector, config)
+        if self.pipeline is not None:
+            self.pipeline.frame_interval = config.detection_interval / 1000.0
+        self.presence.gap_timeout = config.presence_gap_timeout
+        self.event_log.set_capacity(config.event_log_lines)
+        
+        # Só a troca de fonte exige reabrir o dispositivo
+        source_changed = (config.source, config.source_options) != (previous.source, previous.source_options)
+        if source_changed and self.camera_active:
+            if self.face_detector.initialize_camera(config.source, **config.source_options):
+                self.log_event(f"Fonte de vídeo trocada para {config.source}")
+            else:
+                self.log_event(f"Erro: fonte de vídeo {config.source} indisponível")
+        
+        if (config.metrics_port, config.metrics_host) != (previous.metrics_port, previous.metrics_host):
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.metrics_server = self.start_metrics_server()
+        
+        if config.event_store_path != previous.event_store_path:
+            if self.event_store is not None:
+                self.event_store.stop()
+            self.event_store = self.open_event_store()
+        elif self.event_store is not None:
+            self.event_store.retention_days = config.event_retention_days
+            self.event_store.compact_after_days = config.event_compact_after_days
+        
+        self.log_event("Configurações aplicadas")
+    
+    def start_metrics_server(self):
+        """Abre o endpoint de métricas conforme a configuração atual"""
+        return start_metrics_server(
+            self.face_detector, self.config.metrics_port, self.config.metrics_host,
+            pipeline=lambda: self.pipeline
+        )
+    
+    def open_event_store(self):
+        """Abre o registro de detecções conforme a configuração atual"""
+        return open_event_store(
+            self.config.event_store_path, self.config.event_retention_days, self.config.event_compact_after_days
+        )
+    
     def cleanup(self):
         """Limpa recursos antes de fechar"""
+        self.settings_watcher.stop()
         self.stop_camera()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.event_store is not None:
+            self.event_store.stop()
+        self.event_log.cancel()
         self.face_detector.cleanup()
         self.logger.info("Recursos liberados") 
\ No newline at end of file
@@ -10,6 +10,7 @@ from PIL import Image, ImageTk
 import os
 import shutil
 
+from core.gallery import iter_gallery_images, identity_image_paths, is_image_file, new_template_path
 from utils.logger import get_logger
 
 class ProfileManager:
@@ -87,6 +88,12 @@ class ProfileManager:
             command=self.import_profiles
         ).pack(side=tk.LEFT, padx=(0, 10))
         
+        ttk.Button(
+            controls_frame, 
+            text="Podar Amostras", 
+            command=self.prune_templates
+        ).pack(side=tk.LEFT, padx=(0, 10))
+        
         ttk.Button(
             controls_frame, 
             text="Atualizar", 
@@ -201,7 +208,8 @@ class ProfileManager:
                 placeholder_label.pack(pady=(0, 10))
             
             # Informações do perfil
-            info_text = f"Nome: {name}\nArquivo: {os.path.basename(image_path)}"
+            templates = len(self.face_detector.get_template_paths(name))
+            info_text = f"Nome: {name}\nArquivo: {os.path.basename(image_path)}\nAmostras: {templates}"
             info_label = ttk.Label(
                 profile_frame, 
                 text=info_text, 
@@ -249,9 +257,7 @@ class ProfileManager:
             faces_dir = "data/faces"
             if os.path.exists(faces_dir):
                 total_size = sum(
-                    os.path.getsize(os.path.join(faces_dir, f))
-                    for f in os.listdir(faces_dir)
-                    if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+                    os.path.getsize(path) for _, path in iter_gallery_images(faces_dir)
                 )
                 size_mb = total_size / (1024 * 1024)
                 stats_text += f" | Espaço usado: {size_mb:.2f} MB"
@@ -333,10 +339,8 @@ class ProfileManager:
         """Renomeia um perfil"""
         try:
             faces_dir = "data/faces"
-            old_path = os.path.join(faces_dir, f"{old_name}.jpg")
-            new_path = os.path.join(faces_dir, f"{new_name}.jpg")
             
-            if os.path.exists(new_path) and new_name != old_name:
+            if identity_image_paths(faces_dir, new_name) and new_name != old_name:
                 result = messagebox.askyesno(
                     "Confirmar", 
                     f"Já existe um perfil com o nome '{new_name}'.\nDeseja substituir?"
@@ -344,8 +348,11 @@ class ProfileManager:
                 if not result:
                     return False
             
-            if os.path.exists(old_path):
-                os.rename(old_path, new_path)
+            if identity_image_paths(faces_dir, old_name):
+                # Renomear no disco e na galeria do detector
+                if not self.face_detector.rename_face(old_name, new_name, faces_dir):
+                    messagebox.showerror("Erro", f"Não foi possível renomear o perfil '{old_name}'.")
+                    return False
                 self.logger.info(f"Perfil renomeado de '{old_name}' para '{new_name}'")
                 messagebox.showinfo("Sucesso", f"Perfil renomeado para '{new_name}' com sucesso!")
                 return True
@@ -452,22 +459,38 @@ class ProfileManager:
         
         return result["name"]
     
-    def import_image_file(self, file_path, name):
-        """Importa um arquivo de imagem"""
+    def import_image_file(self, file_path, name, register=True):
+        """
+        Importa um arquivo de imagem
+        
+        Args:
+            file_path: Imagem de origem
+            name: Nome do perfil
+            register: Se False, apenas copia a imagem (cadastro feito em lote pelo chamador)
+            
+        Returns:
+            str: Caminho da imagem copiada, ou None em caso de falha/cancelamento
+        """
         try:
             faces_dir = "data/faces"
             if not os.path.exists(faces_dir):
                 os.makedirs(faces_dir)
             
-            # Verificar se já existe
+            # Verificar se já existe: adicionar nova amostra ou substituir
             dest_path = os.path.join(faces_dir, f"{name}.jpg")
-            if os.path.exists(dest_path):
-                result = messagebox.askyesno(
+            if identity_image_paths(faces_dir, name):
+                result = messagebox.askyesnocancel(
                     "Confirmar", 
-                    f"Já existe um perfil com o nome '{name}'.\nDeseja substituir?"
+                    f"Já existe um perfil com o nome '{name}'.\n\n"
+                    "Sim: adicionar como nova amostra\n"
+                    "Não: substituir as amostras existentes"
                 )
-                if not result:
-                    return False
+                if result is None:
+                    return None
+                if result:
+                    dest_path = new_template_path(faces_dir, name)
+                else:
+                    self.face_detector.delete_face(name, faces_dir)
             
             # Copiar e converter arquivo
             with Image.open(file_path) as img:
@@ -484,13 +507,20 @@ class ProfileManager:
                 img.save(dest_path, 'JPEG', quality=90)
             
             self.logger.info(f"Imagem importada: {name} de {file_path}")
+            if not register:
+                return dest_path
+            
+            # Adicionar apenas este rosto à galeria do detector
+            if not self.face_detector.add_face(name, dest_path, faces_dir):
+                self.logger.warning(f"Nenhum rosto reconhecível na imagem importada: {name}")
+            
             messagebox.showinfo("Sucesso", f"Perfil '{name}' adicionado com sucesso!")
-            return True
+            return dest_path
             
         except Exception as e:
             self.logger.error(f"Erro ao importar imagem: {e}")
             messagebox.showerror("Erro", f"Erro ao importar imagem: {str(e)}")
-            return False
+            return None
     
     def export_profiles(self):
         """Exporta todos os perfis para um diretório"""
@@ -500,13 +530,12 @@ class ProfileManager:
                 faces_dir = "data/faces"
                 exported_count = 0
                 
-                if os.path.exists(faces_dir):
-                    for filename in os.listdir(faces_dir):
-                        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-                            src_path = os.path.join(faces_dir, filename)
-                            dest_path = os.path.join(dest_dir, filename)
-                            shutil.copy2(src_path, dest_path)
-                            exported_count += 1
+                # Copiar mantendo a estrutura (modelos adicionais em <nome>/)
+                for _, src_path in iter_gallery_images(faces_dir):
+                    dest_path = os.path.join(dest_dir, os.path.relpath(src_path, faces_dir))
+                    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                    shutil.copy2(src_path, dest_path)
+                    exported_count += 1
                 
                 messagebox.showinfo(
                     "Exportação Concluída", 
@@ -522,33 +551,60 @@ class ProfileManager:
         source_dir = filedialog.askdirectory(title="Selecionar Diretório com Imagens")
         if source_dir:
             try:
-                imported_count = 0
                 faces_dir = "data/faces"
                 
                 if not os.path.exists(faces_dir):
                     os.makedirs(faces_dir)
                 
-                for filename in os.listdir(source_dir):
-                    if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+                # Copiar todas as imagens e depois cadastrar em lote (codificação em paralelo)
+                imported = []
+                for filename in sorted(os.listdir(source_dir)):
+                    if is_image_file(filename):
                         name = os.path.splitext(filename)[0]
                         src_path = os.path.join(source_dir, filename)
                         
-                        if self.import_image_file(src_path, name):
-                            imported_count += 1
+                        dest_path = self.import_image_file(src_path, name, register=False)
+                        if dest_path:
+                            imported.append((name, dest_path))
                 
-                if imported_count > 0:
+                if imported:
+                    self.window.config(cursor="watch")
+                    self.window.update_idletasks()
+                    try:
+                        added = self.face_detector.add_faces(imported, faces_dir)
+                    finally:
+                        self.window.config(cursor="")
+                    
+                    if added < len(imported):
+                        self.logger.warning(f"{len(imported) - added} imagens importadas sem rosto reconhecível")
+                    
                     self.load_profiles()
                     self.refresh_callback()
                 
                 messagebox.showinfo(
                     "Importação Concluída", 
-                    f"{imported_count} perfis importados de:\n{source_dir}"
+                    f"{len(imported)} perfis importados de:\n{source_dir}"
                 )
                 
             except Exception as e:
                 self.logger.error(f"Erro ao importar perfis: {e}")
                 messagebox.showerror("Erro", f"Erro ao importar perfis: {str(e)}")
     
+    def prune_templates(self):
+        """Limita cada perfil às amostras mais representativas"""
+        max_templates = self.face_detector.max_templates
+        result = messagebox.askyesno(
+            "Confirmar Poda", 
+            f"Manter no máximo {max_templates} amostras por perfil?\n"
+            "As amostras menos representativas serão excluídas."
+        )
+        
+        if result:
+            removed = self.face_detector.prune_all_templates(max_templates)
+            self.load_profiles()
+            self.refresh_callback()
+            messagebox.showinfo("Poda Concluída", f"{removed} amostras removidas.")
+    
     def on_closing(self):
         """Executado ao fechar a janela"""
         self.window.grab_release()
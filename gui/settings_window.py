@@ -5,11 +5,13 @@ Janela de configurações da aplicação
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
-import json
+from tkinter import ttk, messagebox, filedialog
 import os
 
-from utils.logger import get_logger
+from core.encoding_cache import EncodingCache
+from core.video_source import REPLAY_FAST, REPLAY_MODES, create_source, source_name
+from utils.logger import LOG_FILENAME, get_logger
+from utils.settings import DEFAULT_SETTINGS, load_settings, save_settings
 
 class SettingsWindow:
     """Janela de configurações"""
@@ -20,14 +22,7 @@ class SettingsWindow:
         self.logger = get_logger(__name__)
         
         # Configurações padrão
-        self.default_settings = {
-            "camera_index": 0,
-            "detection_model": "hog",  # hog ou cnn
-            "face_tolerance": 0.6,
-            "auto_save_captures": True,
-            "log_detections": True,
-            "detection_interval": 30  # ms
-        }
+        self.default_settings = DEFAULT_SETTINGS.copy()
         
         # Carregar configurações
         self.settings = self.load_settings()
@@ -45,14 +40,14 @@ class SettingsWindow:
         """Cria a janela de configurações"""
         self.window = tk.Toplevel(self.parent)
         self.window.title("Configurações")
-        self.window.geometry("500x600")
+        self.window.geometry("500x720")
         self.window.resizable(False, False)
         
         # Centralizar janela
         self.window.update_idletasks()
         x = (self.window.winfo_screenwidth() - 500) // 2
-        y = (self.window.winfo_screenheight() - 600) // 2
-        self.window.geometry(f"500x600+{x}+{y}")
+        y = (self.window.winfo_screenheight() - 720) // 2
+        self.window.geometry(f"500x720+{x}+{y}")
         
         # Tornar modal
         self.window.transient(self.parent)
@@ -142,6 +137,46 @@ class SettingsWindow:
             text="(0 = câmera padrão, 1 = segunda câmera, etc.)"
         ).pack(side=tk.LEFT, padx=(10, 0))
         
+        # Fonte gravada (substitui a câmera)
+        ttk.Label(camera_frame, text="Fonte de Vídeo (opcional):", font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 5))
+        
+        source_frame = ttk.Frame(camera_frame)
+        source_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        self.video_source_var = tk.StringVar()
+        ttk.Entry(source_frame, textvariable=self.video_source_var, width=30).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        ttk.Button(source_frame, text="Arquivo...", command=self.browse_video_file).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(source_frame, text="Pasta...", command=self.browse_video_dir).pack(side=tk.LEFT, padx=(5, 0))
+        
+        ttk.Label(
+            camera_frame,
+            text="(vídeo, pasta de imagens ou gravação; vazio = usar a câmera)"
+        ).pack(anchor=tk.W, pady=(0, 5))
+        
+        replay_frame = ttk.Frame(camera_frame)
+        replay_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        ttk.Label(replay_frame, text="Reprodução:").pack(side=tk.LEFT)
+        self.replay_mode_var = tk.StringVar()
+        ttk.Combobox(
+            replay_frame,
+            textvariable=self.replay_mode_var,
+            values=REPLAY_MODES,
+            state="readonly",
+            width=10
+        ).pack(side=tk.LEFT, padx=(5, 10))
+        
+        ttk.Label(replay_frame, text="Velocidade:").pack(side=tk.LEFT)
+        self.replay_speed_var = tk.DoubleVar()
+        ttk.Spinbox(
+            replay_frame,
+            from_=0.25,
+            to=16.0,
+            increment=0.25,
+            textvariable=self.replay_speed_var,
+            width=6
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        
         # Botão testar câmera
         ttk.Button(
             camera_frame,
@@ -241,6 +276,57 @@ class SettingsWindow:
         interval_spin.pack(side=tk.LEFT)
         
         ttk.Label(interval_frame, text="ms (menor = mais suave, maior uso de CPU)").pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Rastreamento entre detecções
+        ttk.Label(detection_frame, text="Rastreamento:", font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.tracking_enabled_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            detection_frame,
+            text="Rastrear rostos entre detecções completas",
+            variable=self.tracking_enabled_var
+        ).pack(anchor=tk.W, pady=(0, 5))
+        
+        tracking_frame = ttk.Frame(detection_frame)
+        tracking_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.tracking_interval_var = tk.IntVar()
+        tracking_spin = ttk.Spinbox(
+            tracking_frame,
+            from_=1,
+            to=60,
+            textvariable=self.tracking_interval_var,
+            width=10
+        )
+        tracking_spin.pack(side=tk.LEFT)
+        
+        ttk.Label(tracking_frame, text="frames entre detecções (maior = menor uso de CPU)").pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Filtro de movimento
+        ttk.Label(detection_frame, text="Filtro de Movimento:", font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 5))
+        
+        self.motion_gate_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            detection_frame,
+            text="Pular detecção quando a imagem não muda",
+            variable=self.motion_gate_var
+        ).pack(anchor=tk.W, pady=(0, 5))
+        
+        motion_frame = ttk.Frame(detection_frame)
+        motion_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.motion_threshold_var = tk.DoubleVar()
+        motion_spin = ttk.Spinbox(
+            motion_frame,
+            from_=0.1,
+            to=20.0,
+            increment=0.1,
+            textvariable=self.motion_threshold_var,
+            width=10
+        )
+        motion_spin.pack(side=tk.LEFT)
+        
+        ttk.Label(motion_frame, text="% de pixels alterados (maior = ignora mais)").pack(side=tk.LEFT, padx=(10, 0))
     
     def create_system_tab(self, parent):
         """Cria a aba de configurações do sistema"""
@@ -263,10 +349,45 @@ class SettingsWindow:
         self.log_detections_var = tk.BooleanVar()
         ttk.Checkbutton(
             system_frame,
-            text="Registrar detecções no log",
+            text="Registrar chegada e saída de pessoas no log",
             variable=self.log_detections_var
         ).pack(anchor=tk.W, pady=(0, 15))
         
+        # Desempenho
+        ttk.Label(system_frame, text="Desempenho:", font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 10))
+        
+        workers_frame = ttk.Frame(system_frame)
+        workers_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.encoding_workers_var = tk.IntVar()
+        workers_spin = ttk.Spinbox(
+            workers_frame,
+            from_=0,
+            to=max(os.cpu_count() or 1, 1),
+            textvariable=self.encoding_workers_var,
+            width=10
+        )
+        workers_spin.pack(side=tk.LEFT)
+        
+        ttk.Label(workers_frame, text="processos de codificação (0 = automático)").pack(side=tk.LEFT, padx=(10, 0))
+        
+        recognition_workers_frame = ttk.Frame(system_frame)
+        recognition_workers_frame.pack(fill=tk.X, pady=(0, 15))
+        
+        self.recognition_workers_var = tk.IntVar()
+        recognition_workers_spin = ttk.Spinbox(
+            recognition_workers_frame,
+            from_=0,
+            to=max(os.cpu_count() or 1, 1),
+            textvariable=self.recognition_workers_var,
+            width=10
+        )
+        recognition_workers_spin.pack(side=tk.LEFT)
+        
+        ttk.Label(
+            recognition_workers_frame, text="processos de reconhecimento ao vivo (0 = desativado)"
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
         # Diretórios
         ttk.Label(system_frame, text="Diretórios:", font=("Arial", 10, "bold")).pack(anchor=tk.W, pady=(0, 10))
         
@@ -310,34 +431,85 @@ Rostos: {os.path.abspath('data/faces')}"""
         """Atualiza o label da tolerância"""
         self.tolerance_label.config(text=f"{float(value):.2f}")
     
+    def browse_video_file(self):
+        """Seleciona um arquivo de vídeo como fonte"""
+        path = filedialog.askopenfilename(
+            parent=self.window,
+            title="Selecionar vídeo",
+            filetypes=[("Vídeos", "*.mp4 *.avi *.mkv *.mov"), ("Todos os arquivos", "*.*")]
+        )
+        if path:
+            self.video_source_var.set(path)
+    
+    def browse_video_dir(self):
+        """Seleciona uma pasta de imagens ou gravação como fonte"""
+        path = filedialog.askdirectory(parent=self.window, title="Selecionar pasta de imagens ou gravação")
+        if path:
+            self.video_source_var.set(path)
+    
+    def selected_source(self):
+        """Fonte escolhida na aba: caminho, se informado, senão o índice da câmera"""
+        return self.video_source_var.get().strip() or self.camera_index_var.get()
+    
+    @staticmethod
+    def source_label(source) -> str:
+        return f"Câmera {source}" if isinstance(source, int) else f"Fonte {source}"
+    
+    def shared_frame_reader(self, source):
+        """Thread de captura do detector, se já estiver lendo esta fonte"""
+        reader = getattr(self.face_detector, "frame_reader", None)
+        if reader is not None and reader.is_running and self.face_detector.source_name == source_name(source):
+            return reader
+        return None
+    
     def test_camera(self):
-        """Testa a câmera selecionada"""
-        camera_index = self.camera_index_var.get()
+        """Testa a câmera ou fonte de vídeo selecionada"""
+        source = self.selected_source()
+        label = self.source_label(source)
         
         try:
-            import cv2
-            cap = cv2.VideoCapture(camera_index)
+            # Fonte em uso pelo vídeo: consumir a mesma captura em vez de reabrir o dispositivo
+            reader = self.shared_frame_reader(source)
+            if reader is not None:
+                subscription = reader.subscribe("settings")
+                try:
+                    frame = subscription.get(timeout=2.0, copy=False)
+                finally:
+                    subscription.close()
+                
+                if frame is not None:
+                    height, width = frame.image.shape[:2]
+                    messagebox.showinfo(
+                        "Teste de Câmera", 
+                        f"{label} funcionando (em uso pelo vídeo)!\n\n"
+                        f"Resolução: {width}x{height}\n"
+                        f"FPS: {reader.fps:.1f}\n"
+                        f"Frames descartados: {reader.dropped}"
+                    )
+                else:
+                    messagebox.showerror("Erro", f"{label} não consegue capturar frames.")
+                return
             
-            if cap.isOpened():
+            video_source = create_source(source, mode=REPLAY_FAST)
+            
+            if video_source.open():
                 # Tentar capturar um frame
-                ret, frame = cap.read()
+                ret, frame = video_source.read()
                 if ret:
-                    width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                    height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                    fps = cap.get(cv2.CAP_PROP_FPS)
+                    height, width = frame.shape[:2]
                     
                     messagebox.showinfo(
                         "Teste de Câmera", 
-                        f"Câmera {camera_index} funcionando!\n\n"
-                        f"Resolução: {int(width)}x{int(height)}\n"
-                        f"FPS: {fps:.1f}"
+                        f"{label} funcionando!\n\n"
+                        f"Resolução: {width}x{height}\n"
+                        f"FPS: {video_source.fps:.1f}"
                     )
                 else:
-                    messagebox.showerror("Erro", f"Câmera {camera_index} não consegue capturar frames.")
+                    messagebox.showerror("Erro", f"{label} não consegue capturar frames.")
                 
-                cap.release()
+                video_source.release()
             else:
-                messagebox.showerror("Erro", f"Não foi possível abrir a câmera {camera_index}.")
+                messagebox.showerror("Erro", f"Não foi possível abrir: {label}.")
                 
         except Exception as e:
             messagebox.showerror("Erro", f"Erro ao testar câmera: {str(e)}")
@@ -345,26 +517,36 @@ Rostos: {os.path.abspath('data/faces')}"""
     def update_camera_info(self):
         """Atualiza as informações da câmera"""
         try:
-            camera_index = self.settings.get("camera_index", 0)
+            source = self.settings.get("video_source", "") or self.settings.get("camera_index", 0)
+            label = self.source_label(source)
             
-            import cv2
-            cap = cv2.VideoCapture(camera_index)
+            # Fonte em uso pelo vídeo: ler da captura em andamento, sem reabrir o dispositivo
+            reader = self.shared_frame_reader(source)
+            if reader is not None:
+                latest = reader.latest(timeout=1.0)
+                frame = latest.image if latest is not None else None
+                fps, status = reader.fps, "Em uso pelo vídeo"
+            else:
+                video_source = create_source(source, mode=REPLAY_FAST)
+                try:
+                    ret, frame = video_source.read() if video_source.open() else (False, None)
+                    fps, status = video_source.fps, "Disponível"
+                finally:
+                    video_source.release()
+                if not ret:
+                    frame = None
             
-            if cap.isOpened():
-                width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
-                height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
-                fps = cap.get(cv2.CAP_PROP_FPS)
+            if frame is not None:
+                height, width = frame.shape[:2]
                 
-                info_text = f"""Câmera {camera_index}:
-Status: Disponível
-Resolução: {int(width)}x{int(height)}
+                info_text = f"""{label}:
+Status: {status}
+Resolução: {width}x{height}
 FPS: {fps:.1f}"""
-                
-                cap.release()
             else:
-                info_text = f"""Câmera {camera_index}:
+                info_text = f"""{label}:
 Status: Não disponível
-Erro: Não foi possível abrir a câmera"""
+Erro: Não foi possível abrir a fonte"""
             
             self.camera_info_text.configure(state=tk.NORMAL)
             self.camera_info_text.delete(1.0, tk.END)
@@ -386,8 +568,12 @@ Erro: Não foi possível abrir a câmera"""
                 logs_dir = "logs"
                 if os.path.exists(logs_dir):
                     for filename in os.listdir(logs_dir):
-                        if filename.endswith('.log'):
-                            os.remove(os.path.join(logs_dir, filename))
+                        path = os.path.join(logs_dir, filename)
+                        if filename == LOG_FILENAME:
+                            # Arquivo ativo (aberto pela thread de logging): esvaziar, não apagar
+                            open(path, 'w').close()
+                        elif filename.endswith('.log') or filename.startswith(LOG_FILENAME + "."):
+                            os.remove(path)
                 
                 messagebox.showinfo("Sucesso", "Logs limpos com sucesso!")
                 
@@ -397,7 +583,9 @@ Erro: Não foi possível abrir a câmera"""
     def clear_cache(self):
         """Limpa arquivos temporários e cache"""
         try:
-            # Aqui você pode adicionar limpeza de cache específica
+            # Remover cache de codificações faciais (recriado no próximo carregamento)
+            EncodingCache.for_directory("data/faces").clear()
+            self.logger.info("Cache de codificações removido")
             messagebox.showinfo("Sucesso", "Cache limpo com sucesso!")
             
         except Exception as e:
@@ -406,11 +594,20 @@ Erro: Não foi possível abrir a câmera"""
     def load_current_values(self):
         """Carrega os valores atuais nas configurações"""
         self.camera_index_var.set(self.settings.get("camera_index", 0))
+        self.video_source_var.set(self.settings.get("video_source", ""))
+        self.replay_mode_var.set(self.settings.get("replay_mode", "realtime"))
+        self.replay_speed_var.set(self.settings.get("replay_speed", 1.0))
         self.detection_model_var.set(self.settings.get("detection_model", "hog"))
         self.tolerance_var.set(self.settings.get("face_tolerance", 0.6))
         self.auto_save_var.set(self.settings.get("auto_save_captures", True))
         self.log_detections_var.set(self.settings.get("log_detections", True))
         self.detection_interval_var.set(self.settings.get("detection_interval", 30))
+        self.encoding_workers_var.set(self.settings.get("encoding_workers", 0))
+        self.recognition_workers_var.set(self.settings.get("recognition_workers", 0))
+        self.tracking_enabled_var.set(self.settings.get("tracking_enabled", True))
+        self.tracking_interval_var.set(self.settings.get("tracking_interval", 10))
+        self.motion_gate_var.set(self.settings.get("motion_gate_enabled", True))
+        self.motion_threshold_var.set(self.settings.get("motion_threshold", 1.0))
         
         # Atualizar label da tolerância
         self.update_tolerance_label(self.tolerance_var.get())
@@ -440,49 +637,32 @@ Erro: Não foi possível abrir a câmera"""
     def save_current_settings(self):
         """Salva as configurações atuais"""
         self.settings["camera_index"] = self.camera_index_var.get()
+        self.settings["video_source"] = self.video_source_var.get().strip()
+        self.settings["replay_mode"] = self.replay_mode_var.get()
+        self.settings["replay_speed"] = self.replay_speed_var.get()
         self.settings["detection_model"] = self.detection_model_var.get()
         self.settings["face_tolerance"] = self.tolerance_var.get()
         self.settings["auto_save_captures"] = self.auto_save_var.get()
         self.settings["log_detections"] = self.log_detections_var.get()
         self.settings["detection_interval"] = self.detection_interval_var.get()
-        
+        self.settings["encoding_workers"] = self.encoding_workers_var.get()
+        self.settings["recognition_workers"] = self.recognition_workers_var.get()
+        self.settings["tracking_enabled"] = self.tracking_enabled_var.get()
+        self.settings["tracking_interval"] = self.tracking_interval_var.get()
+        self.settings["motion_gate_enabled"] = self.motion_gate_var.get()
+        self.settings["motion_threshold"] = self.motion_threshold_var.get()
+        
+        # A janela principal observa o arquivo e aplica ao detector (um único caminho)
         self.save_settings()
     
     def load_settings(self):
         """Carrega configurações do arquivo"""
-        settings_file = "config/settings.json"
-        
-        try:
-            if os.path.exists(settings_file):
-                with open(settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
-                    
-                # Mesclar com configurações padrão
-                merged_settings = self.default_settings.copy()
-                merged_settings.update(settings)
-                
-                return merged_settings
-            else:
-                return self.default_settings.copy()
-                
-        except Exception as e:
-            self.logger.error(f"Erro ao carregar configurações: {e}")
-            return self.default_settings.copy()
+        return load_settings()
     
     def save_settings(self):
         """Salva configurações no arquivo"""
-        settings_file = "config/settings.json"
-        
         try:
-            # Criar diretório se não existir
-            config_dir = os.path.dirname(settings_file)
-            if not os.path.exists(config_dir):
-                os.makedirs(config_dir)
-            
-            # Salvar configurações
-            with open(settings_file, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=4, ensure_ascii=False)
-                
+            save_settings(self.settings)
             self.logger.info("Configurações salvas")
             
         except Exception as e:
@@ -15,12 +15,13 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from gui.main_window_rpi import MainWindowRPi
 from utils.logger import setup_logger
+from utils.settings import load_runtime_config
 
 def main():
     """Função principal da aplicação"""
     try:
         # Configurar logging
-        logger = setup_logger()
+        logger = setup_logger(**load_runtime_config().log_options)
         logger.info("Iniciando aplicação de reconhecimento facial - Versão Raspberry Pi")
         
         # Criar e configurar janela principal
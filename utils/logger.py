@@ -2,59 +2,224 @@
 # -*- coding: utf-8 -*-
 """
 Módulo de configuração de logging
+
+As chamadas de log só colocam o registro em uma fila (QueueHandler); uma
+thread própria (QueueListener) formata e grava no arquivo e no console. O
+arquivo é rotacionado por tamanho e à meia-noite, os arquivos antigos podem
+ser comprimidos com gzip e o formato pode ser JSON (um objeto por linha).
 """
 
+import atexit
+import glob
+import gzip
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import shutil
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+LOG_FILENAME = "face_recognition.log"
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Configuração ativa (uma por processo)
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Um objeto JSON por linha: instante, nível, logger, mensagem e exceção"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
 
-def setup_logger(log_level=logging.INFO):
+
+class RotatingLogHandler(logging.handlers.BaseRotatingHandler):
+    """
+    Arquivo rotacionado ao passar de `max_bytes` e à meia-noite
+
+    Os arquivos rotacionados recebem o instante da rotação no nome
+    (face_recognition.log.20240131-235959[.gz]); só os `backup_count` mais
+    recentes são mantidos.
+
+    Parâmetros:
+        filename: arquivo de log ativo
+        max_bytes: tamanho máximo antes de rotacionar (0 = sem limite)
+        backup_count: arquivos rotacionados mantidos (0 = todos)
+        daily: rotacionar também à meia-noite
+        compress: comprimir os arquivos rotacionados com gzip
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 14,
+                 daily: bool = True, compress: bool = True):
+        super().__init__(filename, mode='a', encoding='utf-8', delay=False)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.daily = daily
+        self.compress = compress
+        self.rollover_at = self._next_midnight()
+
+    @staticmethod
+    def _next_midnight() -> float:
+        tomorrow = datetime.now().date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.daily and record.created >= self.rollover_at:
+            return True
+        # Verificado antes de gravar: o arquivo passa do limite em no máximo um registro
+        return self.max_bytes > 0 and self.stream is not None and self.stream.tell() >= self.max_bytes
+
+    def doRollover(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        extension = ".gz" if self.compress else ""
+        destination = f"{self.baseFilename}.{stamp}{extension}"
+        counter = 1
+        while os.path.exists(destination):
+            destination = f"{self.baseFilename}.{stamp}-{counter}{extension}"
+            counter += 1
+
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            if self.compress:
+                with open(self.baseFilename, 'rb') as source, gzip.open(destination, 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.baseFilename)
+            else:
+                os.replace(self.baseFilename, destination)
+
+        if self.backup_count > 0:
+            backups = sorted(glob.glob(glob.escape(self.baseFilename) + ".*"), key=os.path.getmtime)
+            for old in backups[:-self.backup_count]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+        self.rollover_at = self._next_midnight()
+        self.stream = self._open()
+
+
+class _LocalQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler sem pré-formatação: na chamada de log só há o put na fila"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A fila é local ao processo: o registro não precisa ser serializável
+        return record
+
+
+def _after_fork_in_child():
+    """Processos criados por fork não herdam a thread de gravação: gravar diretamente"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        if isinstance(handler, RotatingLogHandler):
+            # Só o processo principal rotaciona o arquivo
+            direct = logging.FileHandler(handler.baseFilename, encoding='utf-8')
+            direct.setFormatter(handler.formatter)
+            root.addHandler(direct)
+        else:
+            root.addHandler(handler)
+    _listener = None
+    _queue_handler = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def setup_logger(log_level=logging.INFO, log_dir: str = "logs", max_bytes: int = 10 * 1024 * 1024,
+                 backup_count: int = 14, compress: bool = True, json_format: bool = False):
     """
     Configura o sistema de logging
-    
+
     Args:
         log_level: Nível de log (default: INFO)
-        
+        log_dir: Diretório dos arquivos de log
+        max_bytes: Tamanho do arquivo antes de rotacionar (0 = só à meia-noite)
+        backup_count: Arquivos rotacionados mantidos
+        compress: Comprimir arquivos rotacionados com gzip
+        json_format: Gravar um objeto JSON por linha no arquivo
+
     Returns:
         logging.Logger: Logger configurado
     """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    root.setLevel(log_level)
+
+    # Já configurado neste processo: só o nível muda
+    if _listener is not None:
+        return logging.getLogger("FaceRecognition")
+
     # Criar diretório de logs se não existir
-    log_dir = "logs"
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
-    # Configurar nome do arquivo de log com timestamp
-    timestamp = datetime.now().strftime("%Y%m%d")
-    log_filename = os.path.join(log_dir, f"face_recognition_{timestamp}.log")
-    
-    # Configurar formato de log
-    log_format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    date_format = "%Y-%m-%d %H:%M:%S"
-    
-    # Configurar logging
-    logging.basicConfig(
-        level=log_level,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),
-            logging.StreamHandler()  # Para mostrar no console também
-        ]
+
+    file_handler = RotatingLogHandler(
+        os.path.join(log_dir, LOG_FILENAME), max_bytes=max_bytes,
+        backup_count=backup_count, compress=compress
     )
-    
+    file_handler.setFormatter(JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    # Para mostrar no console também
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _queue_handler = _LocalQueueHandler(log_queue)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    _listener.start()
+    atexit.register(shutdown_logger)
+
     logger = logging.getLogger("FaceRecognition")
     logger.info("Sistema de logging configurado")
-    
+
     return logger
 
+def shutdown_logger():
+    """Grava os registros pendentes e encerra a thread de logging"""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
 def get_logger(name):
     """
     Retorna um logger com o nome especificado
-    
+
     Args:
         name: Nome do logger
-        
+
     Returns:
         logging.Logger: Logger
     """
-    return logging.getLogger(name) 
\ No newline at end of file
+    return logging.getLogger(name)
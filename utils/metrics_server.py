@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Endpoint HTTP de métricas no formato texto do Prometheus
+
+Roda em uma thread própria e só lê o estado do detector quando alguém
+consulta /metrics: o caminho do vídeo apenas incrementa contadores inteiros
+e registra durações nos histogramas de utils.timing, cujos baldes são
+exportados como estão.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.logger import get_logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "facerec"
+
+
+def _escape(value) -> str:
+    """Escapa barras, aspas e quebras de linha em valores de rótulo"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsWriter:
+    """Monta o texto de exposição, uma família de métricas por vez"""
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self._declared = set()
+
+    def _declare(self, name: str, kind: str, help_text: str):
+        if name not in self._declared:
+            self._declared.add(name)
+            self.lines.append(f"# HELP {name} {help_text}")
+            self.lines.append(f"# TYPE {name} {kind}")
+
+    def counter(self, name: str, value: float, help_text: str, labels: Optional[Dict[str, str]] = None):
+        name = f"{PREFIX}_{name}_total"
+        self._declare(name, "counter", help_text)
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def gauge(self, name: str, value: float, help_text: str, labels: Optional[Dict[str, str]] = None):
+        name = f"{PREFIX}_{name}"
+        self._declare(name, "gauge", help_text)
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, buckets: List[Tuple[float, int]], total: float, help_text: str,
+                  labels: Optional[Dict[str, str]] = None):
+        """
+        Histograma com baldes acumulados (limite superior em segundos, contagem)
+
+        Args:
+            name: Nome da família (sem prefixo)
+            buckets: Saída de LatencyHistogram.buckets(), terminando em +Inf
+            total: Soma das durações em segundos
+            help_text: Descrição da métrica
+            labels: Rótulos da série
+        """
+        name = f"{PREFIX}_{name}"
+        self._declare(name, "histogram", help_text)
+        labels = labels or {}
+        for bound, count in buckets:
+            self.lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(bound)})} {count}")
+        self.lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+        self.lines.append(f"{name}_count{_labels(labels)} {buckets[-1][1] if buckets else 0}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def collect_metrics(face_detector, pipeline=None) -> str:
+    """
+    Lê o estado atual do detector (e do pipeline de vídeo, se houver)
+
+    Args:
+        face_detector: FaceDetector ou FaceDetectorRPi
+        pipeline: VideoPipeline em execução ou None
+
+    Returns:
+        str: Métricas no formato texto do Prometheus
+    """
+    writer = MetricsWriter()
+
+    reader = face_detector.frame_reader
+    writer.counter("frames_captured", reader.frames_read if reader is not None else 0,
+                   "Frames lidos pela thread de captura")
+    counters = face_detector.counters
+    writer.counter("frames_processed", counters["frames_processed"], "Frames entregues ao detector")
+
+    drops = pipeline.stats()["drops"] if pipeline is not None else {}
+    if reader is not None:
+        drops.setdefault("capture", reader.dropped)
+    for where, count in sorted(drops.items()):
+        writer.counter("frames_dropped", count, "Frames descartados por fila cheia ou consumidor lento",
+                       {"where": where})
+
+    writer.counter("faces_detected", counters["faces_detected"], "Rostos localizados nas detecções completas")
+    writer.counter("identifications", counters["identified_known"], "Rostos reconhecidos",
+                   {"result": "known"})
+    writer.counter("identifications", counters["identified_unknown"], "Rostos reconhecidos",
+                   {"result": "unknown"})
+
+    writer.gauge("gallery_identities", len(set(face_detector.known_names)), "Identidades na galeria")
+    writer.gauge("model_load_seconds", face_detector.model_load_seconds,
+                 "Duração do último carregamento da galeria ou do modelo")
+    writer.gauge("tracks", len(face_detector.tracker.tracks), "Rostos rastreados no momento")
+
+    encoding_cache = getattr(face_detector, "encoding_cache", None)
+    if encoding_cache is not None:
+        total = encoding_cache.hits + encoding_cache.misses
+        writer.gauge("encoding_cache_hit_ratio", encoding_cache.hits / total if total else 0.0,
+                     "Fração das imagens da galeria lidas do cache no último carregamento")
+    writer.gauge("recognition_cache_hit_ratio", face_detector.recognition_cache.hit_rate,
+                 "Fração dos recortes de rosto servidos pelo cache de reconhecimento")
+    writer.gauge("motion_gate_skip_ratio", face_detector.motion_gate.hit_rate,
+                 "Fração dos frames sem detecção por falta de movimento")
+
+    timings = face_detector.timings
+    for name in sorted(timings.names()):
+        histogram = timings.get(name)
+        writer.histogram("stage_latency_seconds", histogram.buckets(), histogram.total,
+                         "Latência de cada etapa do vídeo", {"stage": name})
+
+    return writer.text()
+
+
+class MetricsServer:
+    """
+    Servidor HTTP de /metrics em uma thread daemon
+
+    Parâmetros:
+        face_detector: detector observado
+        port: porta TCP
+        host: interface de escuta ("0.0.0.0" para ser consultado pela rede)
+        pipeline: devolve o VideoPipeline em execução ou None (a janela
+            recria o pipeline a cada vez que a câmera é ligada)
+    """
+
+    def __init__(self, face_detector, port: int, host: str = "0.0.0.0",
+                 pipeline: Optional[Callable[[], Any]] = None):
+        self.logger = get_logger(__name__)
+        self.face_detector = face_detector
+        self.port = port
+        self.host = host
+        self.pipeline = pipeline or (lambda: None)
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._server is not None
+
+    def render(self) -> str:
+        return collect_metrics(self.face_detector, self.pipeline())
+
+    def start(self) -> "MetricsServer":
+        """Abre a porta e atende em segundo plano (falha só é registrada no log)"""
+        if self._server is not None:
+            return self
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                try:
+                    body = metrics.render().encode("utf-8")
+                except Exception as e:
+                    metrics.logger.error(f"Erro ao coletar métricas: {e}")
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Consultas periódicas não vão para o log da aplicação
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            self.logger.error(f"Não foi possível abrir o endpoint de métricas em {self.host}:{self.port}: {e}")
+            return self
+        self._server.daemon_threads = True
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.logger.info(f"Métricas disponíveis em http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join(timeout=2.0)
+        self._server = None
+        self._thread = None
+        self.logger.info("Endpoint de métricas encerrado")
+
+
+def start_metrics_server(face_detector, port: int, host: str = "0.0.0.0",
+                         pipeline: Optional[Callable[[], Any]] = None) -> Optional[MetricsServer]:
+    """Inicia o endpoint se a porta for > 0; None se desativado ou indisponível"""
+    if port <= 0:
+        return None
+    server = MetricsServer(face_detector, port, host, pipeline).start()
+    return server if server.is_running else None
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Leitura, gravação e recarga das configurações da aplicação
+"""
+
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, fields
+from typing import Callable, Optional, Union
+
+from utils.logger import get_logger
+
+SETTINGS_FILE = "config/settings.json"
+
+
+@dataclass
+class RuntimeConfig:
+    """Configurações consumidas pelos detectores e pelos loops de vídeo"""
+
+    camera_index: int = 0
+    video_source: str = ""  # arquivo de vídeo, pasta de imagens ou gravação (vazio = camera_index)
+    replay_mode: str = "realtime"  # fontes gravadas: realtime, fast ou step
+    replay_speed: float = 1.0  # fator de velocidade no modo realtime
+    detection_model: str = "hog"  # hog ou cnn
+    face_tolerance: float = 0.6
+    lbph_threshold: float = 100.0  # RPi: distância LBPH máxima aceita
+    match_mode: str = "best"  # identidades com vários modelos: best (mais próximo) ou centroid
+    max_templates: int = 10  # modelos mantidos por identidade na poda
+    auto_save_captures: bool = True
+    log_detections: bool = True  # chegada e saída de cada pessoa no log de eventos
+    presence_gap_timeout: float = 5.0  # s sem aparecer até a sessão de presença terminar
+    event_log_lines: int = 500  # linhas mantidas no painel de eventos da janela
+    detection_interval: int = 30  # ms entre frames do loop de vídeo
+    encoding_workers: int = 0  # 0 = um processo por núcleo
+    recognition_workers: int = 0  # processos de detecção/reconhecimento ao vivo (0 = no próprio processo)
+    tracking_enabled: bool = True
+    tracking_interval: int = 10  # frames entre detecções completas
+    reverify_interval: float = 2.0  # s entre reverificações de um rosto já identificado
+    motion_gate_enabled: bool = True
+    motion_threshold: float = 1.0  # % de pixels alterados para rodar a detecção
+    recognition_cache_ttl: float = 10.0  # s de validade do cache de reconhecimento (0 = desativado)
+    ann_enabled: bool = False  # busca aproximada (IVF) para galerias grandes
+    ann_n_lists: int = 0  # partições do índice IVF (0 = automático, 2·sqrt(N))
+    ann_n_probe: int = 8  # partições visitadas por consulta (maior = mais recall, mais lento)
+    ann_min_size: int = 2000  # modelos na galeria a partir dos quais o índice é usado
+    pipeline_queue_size: int = 2  # frames entre etapas do pipeline de vídeo
+    pipeline_drop_policy: str = "drop_oldest"  # drop_oldest ou drop_newest (fila cheia)
+    metrics_port: int = 0  # porta do endpoint Prometheus /metrics (0 = desativado)
+    metrics_host: str = "0.0.0.0"  # interface de escuta do endpoint de métricas
+    event_store_path: str = "data/events.db"  # registro SQLite de detecções (vazio = desativado)
+    event_retention_days: float = 30.0  # apagar detecções mais antigas (0 = manter tudo)
+    event_compact_after_days: float = 7.0  # reduzir a uma por identidade e minuto (0 = não compactar)
+    log_max_mb: float = 10.0  # MB do arquivo de log antes de rotacionar (0 = só à meia-noite)
+    log_backup_count: int = 14  # arquivos de log rotacionados mantidos (0 = todos)
+    log_compress: bool = True  # comprimir os logs rotacionados com gzip
+    log_json: bool = False  # gravar o arquivo de log em JSON, um objeto por linha
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RuntimeConfig":
+        """
+        Constrói a configuração a partir do JSON, convertendo tipos
+
+        Chaves desconhecidas são ignoradas; valores inválidos voltam ao padrão.
+
+        Args:
+            data: Dicionário lido de settings.json
+
+        Returns:
+            RuntimeConfig: Configuração validada
+        """
+        logger = get_logger(__name__)
+        config = cls()
+
+        for field in fields(cls):
+            if field.name not in data:
+                continue
+            value = data[field.name]
+            default = getattr(config, field.name)
+            try:
+                if isinstance(default, bool):
+                    if not isinstance(value, bool):
+                        raise ValueError(value)
+                elif isinstance(default, int):
+                    value = int(value)
+                elif isinstance(default, float):
+                    value = float(value)
+                else:
+                    value = str(value)
+            except (TypeError, ValueError):
+                logger.warning(f"Configuração inválida ignorada: {field.name}={value!r}")
+                continue
+            setattr(config, field.name, value)
+
+        config._validate()
+        return config
+
+    def _validate(self):
+        """Corrige valores fora do intervalo aceito"""
+        if self.detection_model not in ("hog", "cnn"):
+            self.detection_model = "hog"
+        if self.replay_mode not in ("realtime", "fast", "step"):
+            self.replay_mode = "realtime"
+        if self.replay_speed <= 0:
+            self.replay_speed = 1.0
+        self.video_source = self.video_source.strip()
+        if self.pipeline_drop_policy not in ("drop_oldest", "drop_newest"):
+            self.pipeline_drop_policy = "drop_oldest"
+        self.pipeline_queue_size = max(1, self.pipeline_queue_size)
+        self.camera_index = max(0, self.camera_index)
+        self.face_tolerance = min(max(self.face_tolerance, 0.0), 1.0)
+        if self.match_mode not in ("best", "centroid"):
+            self.match_mode = "best"
+        self.max_templates = max(1, self.max_templates)
+        self.detection_interval = max(1, self.detection_interval)
+        self.encoding_workers = max(0, self.encoding_workers)
+        self.recognition_workers = max(0, self.recognition_workers)
+        self.tracking_interval = max(1, self.tracking_interval)
+        self.reverify_interval = max(0.0, self.reverify_interval)
+        self.motion_threshold = max(0.0, self.motion_threshold)
+        self.recognition_cache_ttl = max(0.0, self.recognition_cache_ttl)
+        self.ann_n_lists = max(0, self.ann_n_lists)
+        self.ann_n_probe = max(1, self.ann_n_probe)
+        self.ann_min_size = max(0, self.ann_min_size)
+        self.presence_gap_timeout = max(0.0, self.presence_gap_timeout)
+        self.event_log_lines = max(10, self.event_log_lines)
+        if not 0 <= self.metrics_port <= 65535:
+            self.metrics_port = 0
+        self.metrics_host = self.metrics_host.strip() or "0.0.0.0"
+        self.event_store_path = self.event_store_path.strip()
+        self.event_retention_days = max(0.0, self.event_retention_days)
+        self.event_compact_after_days = max(0.0, self.event_compact_after_days)
+        self.log_max_mb = max(0.0, self.log_max_mb)
+        self.log_backup_count = max(0, self.log_backup_count)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def source(self) -> Union[int, str]:
+        """Fonte de vídeo configurada: arquivo/pasta ou índice da câmera"""
+        return self.video_source or self.camera_index
+
+    @property
+    def source_options(self) -> dict:
+        """Opções de reprodução repassadas a create_source (ignoradas por câmeras)"""
+        return {"mode": self.replay_mode, "speed": self.replay_speed}
+
+    @property
+    def log_options(self) -> dict:
+        """Rotação e formato do arquivo de log, repassados a setup_logger"""
+        return {
+            "max_bytes": int(self.log_max_mb * 1024 * 1024),
+            "backup_count": self.log_backup_count,
+            "compress": self.log_compress,
+            "json_format": self.log_json
+        }
+
+
+# Configurações padrão
+DEFAULT_SETTINGS = RuntimeConfig().to_dict()
+
+def load_settings(settings_file: str = SETTINGS_FILE) -> dict:
+    """
+    Carrega configurações do arquivo, mescladas com os padrões
+
+    Args:
+        settings_file: Caminho do arquivo JSON
+
+    Returns:
+        dict: Configurações
+    """
+    logger = get_logger(__name__)
+
+    try:
+        if os.path.exists(settings_file):
+            with open(settings_file, 'r', encoding='utf-8') as f:
+                settings = json.load(f)
+
+            # Mesclar com configurações padrão
+            merged_settings = DEFAULT_SETTINGS.copy()
+            merged_settings.update(settings)
+
+            return merged_settings
+        else:
+            return DEFAULT_SETTINGS.copy()
+
+    except Exception as e:
+        logger.error(f"Erro ao carregar configurações: {e}")
+        return DEFAULT_SETTINGS.copy()
+
+def load_runtime_config(settings_file: str = SETTINGS_FILE) -> RuntimeConfig:
+    """Carrega as configurações do arquivo como RuntimeConfig"""
+    return RuntimeConfig.from_dict(load_settings(settings_file))
+
+def save_settings(settings: dict, settings_file: str = SETTINGS_FILE):
+    """
+    Salva configurações no arquivo
+
+    Args:
+        settings: Configurações
+        settings_file: Caminho do arquivo JSON
+    """
+    # Criar diretório se não existir
+    config_dir = os.path.dirname(settings_file)
+    if config_dir and not os.path.exists(config_dir):
+        os.makedirs(config_dir)
+
+    # Gravar em arquivo temporário e substituir: o observador nunca lê um JSON pela metade
+    tmp_file = settings_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(settings, f, indent=4, ensure_ascii=False)
+    os.replace(tmp_file, settings_file)
+
+def apply_detector_settings(face_detector, settings: Union[RuntimeConfig, dict]):
+    """
+    Aplica ao detector as configurações que ele consome diretamente
+
+    Pode ser chamado com a câmera ligada: apenas atributos são trocados (e o
+    pool de reconhecimento é redimensionado se o número de processos mudou).
+
+    Args:
+        face_detector: FaceDetector ou FaceDetectorRPi
+        settings: RuntimeConfig ou dicionário de configurações
+    """
+    config = settings if isinstance(settings, RuntimeConfig) else RuntimeConfig.from_dict(settings)
+
+    face_detector.encoding_workers = config.encoding_workers
+    face_detector.detection_model = config.detection_model
+    face_detector.tolerance = config.face_tolerance
+    face_detector.lbph_threshold = config.lbph_threshold
+    face_detector.match_mode = config.match_mode
+    face_detector.max_templates = config.max_templates
+    face_detector.tracking = config.tracking_enabled
+    face_detector.tracker.detection_interval = config.tracking_interval
+    face_detector.tracker.reverify_interval = config.reverify_interval
+    face_detector.motion_gating = config.motion_gate_enabled
+    face_detector.motion_gate.threshold = config.motion_threshold / 100.0
+    face_detector.recognition_cache.ttl = config.recognition_cache_ttl
+
+    # Busca aproximada: só o detector completo tem galeria de codificações
+    if hasattr(face_detector, "enable_ann_index"):
+        index = face_detector.matcher.index
+        n_lists = config.ann_n_lists or None
+        if not config.ann_enabled:
+            if index is not None:
+                face_detector.disable_ann_index()
+        elif index is None or index.n_lists != n_lists or index.min_size != config.ann_min_size:
+            # O treino (k-means na galeria inteira) não pode travar quem aplica (ex.: a interface)
+            face_detector.enable_ann_index(n_lists, config.ann_n_probe, config.ann_min_size,
+                                           face_detector.faces_dir, background=True)
+        else:
+            # n_probe só afeta a consulta: o índice não precisa ser retreinado
+            index.n_probe = config.ann_n_probe
+
+    # O detector do Raspberry Pi reconhece com LBPH no próprio processo
+    if hasattr(face_detector, "set_recognition_workers"):
+        face_detector.set_recognition_workers(config.recognition_workers)
+
+
+class SettingsWatcher:
+    """
+    Observa settings.json e entrega a nova configuração a cada alteração
+
+    A verificação é por data de modificação e tamanho, em uma thread própria;
+    o callback é chamado nessa thread (a GUI deve repassá-lo com root.after).
+    """
+
+    def __init__(self, callback: Callable[[RuntimeConfig], None],
+                 settings_file: str = SETTINGS_FILE, poll_interval: float = 1.0):
+        self.logger = get_logger(__name__)
+        self.callback = callback
+        self.settings_file = settings_file
+        self.poll_interval = poll_interval
+
+        self._stamp = self._file_stamp()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.settings_file)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        """Inicia a observação em segundo plano"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a observação"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def check(self) -> bool:
+        """
+        Verifica o arquivo uma vez
+
+        Returns:
+            bool: True se houve alteração (e o callback foi chamado)
+        """
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return False
+
+        self._stamp = stamp
+        try:
+            self.callback(load_runtime_config(self.settings_file))
+        except Exception as e:
+            self.logger.error(f"Erro ao aplicar configurações recarregadas: {e}")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            if self.check():
+                self.logger.info(f"Configurações recarregadas de {self.settings_file}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentação leve de latência por etapa
+
+Cada etapa acumula as durações em um histograma de baldes com espaçamento
+logarítmico (de 0,1 ms a ~40 s): memória fixa, independente de quantas
+medições foram feitas, e percentis p50/p95/p99 com erro relativo de no
+máximo um balde (~25%). As durações vêm de time.perf_counter (monotônico).
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Limites superiores dos baldes em segundos: 0,1 ms * 1,25^k
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(0.0001 * 1.25 ** k for k in range(58))
+
+
+class LatencyHistogram:
+    """
+    Histograma de durações com baldes fixos
+
+    Parâmetros:
+        bounds: limites superiores dos baldes em segundos (crescentes)
+    """
+
+    def __init__(self, bounds: Tuple[float, ...] = BUCKET_BOUNDS):
+        self.bounds = bounds
+        self._lock = threading.Lock()
+        # Último balde: acima do maior limite
+        self._counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        """Registra uma duração em segundos"""
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """
+        Percentil aproximado (interpolado dentro do balde)
+
+        Args:
+            q: Fração entre 0 e 1 (0.95 = p95)
+
+        Returns:
+            float: Duração em segundos (0 sem medições)
+        """
+        with self._lock:
+            counts = list(self._counts)
+            count, maximum = self.count, self.max
+        if count == 0:
+            return 0.0
+
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else maximum
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, maximum)
+            cumulative += bucket_count
+        return maximum
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Pares (limite superior, contagem acumulada), como nos histogramas Prometheus"""
+        with self._lock:
+            counts = list(self._counts)
+        result, cumulative = [], 0
+        for bound, bucket_count in zip(self.bounds, counts):
+            cumulative += bucket_count
+            result.append((bound, cumulative))
+        result.append((float("inf"), cumulative + counts[-1]))
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.bounds) + 1)
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        """Contagem, média, percentis e máximo em milissegundos"""
+        return {
+            "count": self.count,
+            "mean_ms": 1000.0 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000.0 * self.percentile(0.50),
+            "p95_ms": 1000.0 * self.percentile(0.95),
+            "p99_ms": 1000.0 * self.percentile(0.99),
+            "max_ms": 1000.0 * self.max
+        }
+
+
+class Timings:
+    """Conjunto de histogramas nomeados (um por etapa ou método medido)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        """Histograma da etapa, criado no primeiro uso"""
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def record(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Mede o bloco: `with timings.measure("locate"): ...`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - started)
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._histograms)
+
+    def get(self, name: str) -> Optional[LatencyHistogram]:
+        return self._histograms.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Resumo de todas as etapas medidas"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histogram.snapshot() for name, histogram in histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            histograms = list(self._histograms.values())
+        for histogram in histograms:
+            histogram.reset()